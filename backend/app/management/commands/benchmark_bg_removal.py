@@ -0,0 +1,144 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from .benchmark_images import rss_kb, reset_peak_rss  # noqa: F401 (used by the probe)
+
+
+def _legacy(img, tolerance=20, smooth=True):
+    """Reference copy of the per-channel whole-image implementation the fused engine replaced."""
+    import cv2
+    import numpy as np
+    from PIL import Image
+
+    arr = np.array(img.convert('RGBA'))
+    rgb = arr[:, :, :3]
+    alpha = arr[:, :, 3]
+    thr = max(0, min(255, 255 - int(tolerance or 0)))
+    mask_bg = (rgb[:, :, 0] >= thr) & (rgb[:, :, 1] >= thr) & (rgb[:, :, 2] >= thr)
+    if smooth:
+        kernel = np.ones((3, 3), np.uint8)
+        mask_bg = cv2.morphologyEx(mask_bg.astype(np.uint8) * 255, cv2.MORPH_OPEN, kernel)
+        mask_bg = cv2.GaussianBlur(mask_bg, (3, 3), 0) > 127
+    alpha[mask_bg] = 0
+    arr[:, :, 3] = alpha
+    return Image.fromarray(arr)
+
+
+def _fused(img, tolerance=20, smooth=True):
+    from app.utils.image_tools import whiteish_alpha
+    return whiteish_alpha(img, tolerance, smooth)
+
+
+def _fused_border(img, tolerance=20, smooth=True):
+    from app.utils.image_tools import whiteish_alpha
+    return whiteish_alpha(img, tolerance, smooth, border_only=True)
+
+
+# name -> callable(decoded RGB image); each engine runs in a fresh interpreter
+ENGINES = {
+    'legacy': _legacy,
+    'fused': _fused,
+    'fused-border': _fused_border,
+}
+
+_PROBE = """
+import json, time, django
+django.setup()
+import cv2, numpy
+import app.utils.image_tools
+from PIL import Image
+from app.management.commands.benchmark_bg_removal import ENGINES, reset_peak_rss, rss_kb
+img = Image.open({source!r})
+img.load()
+run = ENGINES[{engine!r}]
+baseline_kb = rss_kb('VmRSS')
+reset_peak_rss()
+timings = []
+for _ in range({repeat}):
+    start = time.perf_counter()
+    out = run(img, smooth={smooth!r})
+    timings.append((time.perf_counter() - start) * 1000.0)
+    del out
+peak_kb = rss_kb('VmHWM')
+print(json.dumps({{'timings_ms': timings, 'baseline_kb': baseline_kb, 'peak_kb': peak_kb}}))
+"""
+
+
+def make_source(path: str, megapixels: float):
+    """Write a product-shot-like JPEG of about ``megapixels``: near-white backdrop, dark subject
+    with a white highlight inside it."""
+    import numpy as np
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    arr = np.full((height, width, 3), 246, dtype=np.uint8)
+    arr[height // 4:height * 3 // 4, width // 4:width * 3 // 4] = (70, 60, 150)
+    arr[height * 7 // 16:height * 9 // 16, width * 7 // 16:width * 9 // 16] = 250
+    Image.fromarray(arr).save(path, 'JPEG', quality=90)
+    return width, height
+
+
+def run_probe(engine: str, source: str, repeat: int, smooth: bool) -> dict:
+    """Run one engine in a fresh interpreter so peak RSS reflects that engine alone."""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'shubrajcom.settings')
+    proc = subprocess.run(
+        [sys.executable, '-c', _PROBE.format(engine=engine, source=source, repeat=repeat, smooth=smooth)],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or ['unknown error']
+        return {'error': last[0]}
+    data = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        'median_ms': round(statistics.median(data['timings_ms']), 1),
+        'peak_rss_mb': round(data['peak_kb'] / 1024.0, 1),
+        'delta_rss_mb': round((data['peak_kb'] - data['baseline_kb']) / 1024.0, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare latency and peak RSS of near-white background removal engines on 1-40 MP images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--megapixels', type=float, nargs='+', default=[1.0, 4.0, 12.0, 24.0, 40.0],
+                            help="Source sizes to generate (default: 1 4 12 24 40)")
+        parser.add_argument('--engine', choices=sorted(ENGINES), action='append', help="Engines to run (default: all)")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per engine; the median latency is reported")
+        parser.add_argument('--no-smooth', action='store_true', help="Skip the opening/blur edge smoothing")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        engines = options['engine'] or list(ENGINES)
+        smooth = not options['no_smooth']
+        rows = []
+        with tempfile.TemporaryDirectory(prefix='bench-') as work_dir:
+            for mp in options['megapixels']:
+                source = os.path.join(work_dir, f'source-{mp:g}mp.jpg')
+                width, height = make_source(source, mp)
+                for engine in engines:
+                    row = {'megapixels': mp, 'source': f'{width}x{height}', 'engine': engine}
+                    row.update(run_probe(engine, source, max(1, options['repeat']), smooth))
+                    rows.append(row)
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        self.stdout.write(f"{'source':<12} {'engine':<13} {'median ms':>10} {'peak RSS MB':>12} {'delta MB':>9}")
+        for row in rows:
+            if 'error' in row:
+                self.stdout.write(f"{row['source']:<12} {row['engine']:<13} failed: {row['error']}")
+                continue
+            self.stdout.write(
+                f"{row['source']:<12} {row['engine']:<13} "
+                f"{row['median_ms']:>10.1f} {row['peak_rss_mb']:>12.1f} {row['delta_rss_mb']:>9.1f}"
+            )
@@ -0,0 +1,159 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def _resize_600(media_dir, source):
+    from app.utils.image_tools import resize_or_crop_image
+    return resize_or_crop_image.uncached(media_dir, source, 600, 600, mode='fit')
+
+
+def _thumbnail_200(media_dir, source):
+    from app.utils.image_tools import resize_or_crop_image
+    return resize_or_crop_image.uncached(media_dir, source, 200, 200, mode='fill')
+
+
+def _dv_photo(media_dir, source):
+    from app.utils.dv_tools import process_dv_image
+    return process_dv_image(media_dir, source)
+
+
+def _watermark_logo(media_dir, source):
+    # A small base photo with the large upload as the logo: only 30% of the base survives
+    from PIL import Image
+    from app.utils.image_tools import add_watermark
+    base = os.path.join(media_dir, 'base.jpg')
+    Image.new('RGB', (1200, 800), (40, 90, 160)).save(base, 'JPEG')
+    return add_watermark.uncached(media_dir, base, watermark_image_path=source)
+
+
+# name -> callable(media_dir, source_path); each run happens in a fresh interpreter
+SCENARIOS = {
+    'resize-600': _resize_600,
+    'thumbnail-200': _thumbnail_200,
+    'dv-photo': _dv_photo,
+    'watermark-logo': _watermark_logo,
+}
+
+# Environment overrides per decode path; "full" is the path before reduced JPEG decoding
+MODES = {
+    'full': {'IMAGE_DRAFT_DECODE': 'false'},
+    'draft': {'IMAGE_DRAFT_DECODE': 'true'},
+}
+
+_PROBE = """
+import json, tempfile, time, django
+django.setup()
+import app.utils.image_tools, app.utils.dv_tools
+from app.management.commands.benchmark_images import SCENARIOS, reset_peak_rss, rss_kb
+run = SCENARIOS[{scenario!r}]
+baseline_kb = rss_kb('VmRSS')
+reset_peak_rss()
+timings = []
+for _ in range({repeat}):
+    with tempfile.TemporaryDirectory() as media_dir:
+        start = time.perf_counter()
+        run(media_dir, {source!r})
+        timings.append((time.perf_counter() - start) * 1000.0)
+peak_kb = rss_kb('VmHWM')
+print(json.dumps({{'timings_ms': timings, 'baseline_kb': baseline_kb, 'peak_kb': peak_kb}}))
+"""
+
+
+def rss_kb(field: str) -> int:
+    """VmRSS/VmHWM of this process in KB. ru_maxrss is not used: it survives exec, so the
+    probe would report this command's own peak."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise RuntimeError(f'{field} not available')
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS so the peak covers only what runs next (Linux 4.0+)."""
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def make_source(path: str, megapixels: float):
+    """Write a photo-like JPEG (smooth gradients plus sensor-style noise) of about ``megapixels``."""
+    import numpy as np
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    arr = np.empty((height, width, 3), dtype=np.uint8)
+    for c, (a, b) in enumerate(((0.7, 0.3), (0.4, 0.6), (0.2, 0.5))):
+        channel = a * x + b * y + rng.normal(0, 6, (height, width)).astype(np.float32)
+        arr[:, :, c] = np.clip(channel, 0, 255)
+    Image.fromarray(arr).save(path, 'JPEG', quality=90)
+    return width, height
+
+
+def run_probe(scenario: str, source: str, mode: str, repeat: int) -> dict:
+    """Run one scenario in a fresh interpreter so peak RSS reflects that scenario alone."""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'shubrajcom.settings')
+    env.update(MODES[mode])
+    proc = subprocess.run(
+        [sys.executable, '-c', _PROBE.format(scenario=scenario, source=source, repeat=repeat)],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or ['unknown error']
+        return {'error': last[0]}
+    data = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        'median_ms': round(statistics.median(data['timings_ms']), 1),
+        'peak_rss_mb': round(data['peak_kb'] / 1024.0, 1),
+        'delta_rss_mb': round((data['peak_kb'] - data['baseline_kb']) / 1024.0, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare latency and peak RSS of image tools on large JPEGs, full decode vs reduced (draft) decode."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--megapixels', type=float, nargs='+', default=[24.0], help="Source sizes to generate (default: 24)")
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append', help="Scenarios to run (default: all)")
+        parser.add_argument('--mode', choices=sorted(MODES), action='append', help="Decode paths to compare (default: all)")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per scenario; the median latency is reported")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or list(SCENARIOS)
+        modes = options['mode'] or list(MODES)
+        rows = []
+        with tempfile.TemporaryDirectory(prefix='bench-') as work_dir:
+            for mp in options['megapixels']:
+                source = os.path.join(work_dir, f'source-{mp:g}mp.jpg')
+                width, height = make_source(source, mp)
+                for scenario in scenarios:
+                    for mode in modes:
+                        row = {'megapixels': mp, 'source': f'{width}x{height}', 'scenario': scenario, 'mode': mode}
+                        row.update(run_probe(scenario, source, mode, max(1, options['repeat'])))
+                        rows.append(row)
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        self.stdout.write(f"{'source':<12} {'scenario':<16} {'mode':<6} {'median ms':>10} {'peak RSS MB':>12} {'delta MB':>9}")
+        for row in rows:
+            if 'error' in row:
+                self.stdout.write(f"{row['source']:<12} {row['scenario']:<16} {row['mode']:<6} failed: {row['error']}")
+                continue
+            self.stdout.write(
+                f"{row['source']:<12} {row['scenario']:<16} {row['mode']:<6} "
+                f"{row['median_ms']:>10.1f} {row['peak_rss_mb']:>12.1f} {row['delta_rss_mb']:>9.1f}"
+            )
@@ -0,0 +1,101 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.utils.lazy_imports import HEAVY_MODULES
+
+
+STARTUP_MODULE = 'app.urls'
+LIGHT_MODULES = ['requests', 'whois', 'dns.resolver', 'jwt', 'certifi']
+
+_PROBE = """
+import json, sys, django
+django.setup()
+import {module}
+if {check_heavy}:
+    print(json.dumps([m for m in {heavy!r} if m in sys.modules]))
+"""
+
+
+def _run_probe(module: str, check_heavy: bool = False):
+    """Import ``module`` in a fresh interpreter with -X importtime.
+
+    Django is set up before the import so its own cost is not attributed to the module.
+    Returns (cumulative_ms, self_ms, heavy_loaded, error).
+    """
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'shubrajcom.settings')
+    code = _PROBE.format(module=module, check_heavy=check_heavy, heavy=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or ['unknown error']
+        return None, None, None, last[0]
+
+    cumulative_us = self_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or parts[2].strip() != module:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue
+
+    heavy_loaded = None
+    if check_heavy:
+        out = proc.stdout.strip().splitlines()
+        heavy_loaded = json.loads(out[-1]) if out else []
+    return cumulative_us / 1000.0, self_us / 1000.0, heavy_loaded, None
+
+
+class Command(BaseCommand):
+    help = "Report per-module import cost (cold, in a fresh interpreter) to measure worker start-up time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help="Modules to measure (default: start-up module plus known heavy/light modules)")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or [STARTUP_MODULE] + HEAVY_MODULES + LIGHT_MODULES
+
+        rows = []
+        startup_heavy = None
+        for module in modules:
+            check_heavy = module == STARTUP_MODULE
+            cumulative_ms, self_ms, heavy_loaded, error = _run_probe(module, check_heavy=check_heavy)
+            if check_heavy:
+                startup_heavy = heavy_loaded
+            rows.append({
+                'module': module,
+                'cumulative_ms': round(cumulative_ms, 1) if cumulative_ms is not None else None,
+                'self_ms': round(self_ms, 1) if self_ms is not None else None,
+                'error': error,
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps({'modules': rows, 'heavy_loaded_at_startup': startup_heavy}, indent=2))
+            return
+
+        self.stdout.write(f"{'module':<32} {'cumulative ms':>14} {'self ms':>10}")
+        for row in sorted(rows, key=lambda r: r['cumulative_ms'] or 0, reverse=True):
+            if row['error']:
+                self.stdout.write(f"{row['module']:<32} {'failed':>14}  {row['error']}")
+            else:
+                self.stdout.write(f"{row['module']:<32} {row['cumulative_ms']:>14.1f} {row['self_ms']:>10.1f}")
+
+        if startup_heavy is not None:
+            if startup_heavy:
+                self.stdout.write(self.style.WARNING(
+                    f"Heavy modules loaded when importing {STARTUP_MODULE}: {', '.join(startup_heavy)}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"No heavy modules loaded when importing {STARTUP_MODULE}."))
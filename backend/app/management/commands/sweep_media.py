@@ -0,0 +1,45 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.utils.media_store import sweep
+
+
+def _fmt_bytes(n: int) -> str:
+    size = float(n)
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class Command(BaseCommand):
+    help = "Delete generated media files past their TTL and report disk usage and reclaimed bytes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting")
+        parser.add_argument('--interval', type=int, default=0, help="Keep running, sweeping every N seconds")
+        parser.add_argument('--json', action='store_true', help="Print each report as JSON")
+
+    def handle(self, *args, **options):
+        while True:
+            report = sweep(dry_run=options['dry_run'])
+            if options['json']:
+                self.stdout.write(json.dumps(report))
+            else:
+                verb = "Would delete" if report['dry_run'] else "Deleted"
+                self.stdout.write(
+                    f"{verb} {report['deleted_files']} files ({_fmt_bytes(report['reclaimed_bytes'])}); "
+                    f"{report['remaining_files']} files remain ({_fmt_bytes(report['remaining_bytes'])})"
+                )
+                if 'volume_free_bytes' in report:
+                    self.stdout.write(
+                        f"Media volume: {_fmt_bytes(report['volume_free_bytes'])} free of {_fmt_bytes(report['volume_total_bytes'])}"
+                    )
+                if not report['registry_available']:
+                    self.stdout.write(self.style.WARNING("Expiry registry unavailable; used file mtimes only."))
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
@@ -36,11 +36,11 @@ class ToolsSitemap(Sitemap):
     
     def items(self):
         tool_patterns = []
-        # Include all named app routes except static/utility pages
+        # Include all named app routes except static/utility pages and JSON APIs
         exclude = {'privacy_policy', 'terms', 'home', 'sitemap', 'robots.txt'}
         for pattern in urlpatterns:
             if isinstance(pattern, URLPattern) and pattern.name:
-                if pattern.name not in exclude:
+                if pattern.name not in exclude and not pattern.name.startswith('api_'):
                     tool_patterns.append(f"{app_name}:{pattern.name}")
         return tool_patterns
 
@@ -1,3 +1,218 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from PIL import Image, ImageCms
+
+from .utils import checker_cache
+from .utils.batch import stream_batch_zip
+from .utils.checker_cache import cached_checker
+from .utils.metadata import read_exif_block, strip_jpeg, strip_png, strip_webp
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+XMP = (b'<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+       b'<rdf:Description xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmp:CreatorTool="tests"/>'
+       b'</rdf:RDF></x:xmpmeta>')
+
+
+def _exif_bytes() -> bytes:
+    exif = Image.Exif()
+    exif[0x010F] = 'Test Camera'  # Make
+    exif[0x0131] = 'tests'  # Software
+    return exif.tobytes()
+
+
+def _icc_bytes() -> bytes:
+    return ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+
+
+def _sample_image(fmt: str) -> bytes:
+    """A small gradient saved as ``fmt`` with EXIF, XMP and an ICC profile."""
+    x = np.arange(64, dtype=np.uint8)
+    pixels = np.dstack([np.tile(x * 4, (48, 1)), np.tile(x[:48, None] * 5, (1, 64)), np.full((48, 64), 90, np.uint8)])
+    img = Image.fromarray(pixels, 'RGB')
+    buf = io.BytesIO()
+    kwargs = {'exif': _exif_bytes(), 'icc_profile': _icc_bytes()}
+    if fmt == 'PNG':
+        from PIL.PngImagePlugin import PngInfo
+        info = PngInfo()
+        info.add_itxt('XML:com.adobe.xmp', XMP.decode())
+        info.add_text('Comment', 'a text chunk')
+        kwargs['pnginfo'] = info
+    elif fmt == 'WEBP':
+        kwargs.update(xmp=XMP, lossless=True)
+    else:
+        kwargs.update(xmp=XMP, quality=90)
+    img.save(buf, fmt, **kwargs)
+    return buf.getvalue()
+
+
+class MetadataStripTests(SimpleTestCase):
+    cases = (('JPEG', strip_jpeg, {'EXIF', 'XMP'}), ('PNG', strip_png, {'eXIf', 'iTXt', 'tEXt'}),
+             ('WEBP', strip_webp, {'EXIF', 'XMP'}))
+
+    def test_strip_removes_metadata_and_keeps_pixels(self):
+        for fmt, strip, expected in self.cases:
+            with self.subTest(fmt=fmt):
+                original = _sample_image(fmt)
+                out = io.BytesIO()
+                removed = strip(io.BytesIO(original), out)
+                stripped = out.getvalue()
+
+                self.assertEqual(set(removed), expected)
+                self.assertNotIn(b'Exif\x00\x00', stripped)
+                self.assertNotIn(b'http://ns.adobe.com/xap/1.0/', stripped)
+                self.assertNotIn(b'a text chunk', stripped)
+                self.assertIsNone(read_exif_block(io.BytesIO(stripped)))
+
+                with Image.open(io.BytesIO(original)) as before, Image.open(io.BytesIO(stripped)) as after:
+                    self.assertEqual(after.format, fmt)
+                    self.assertFalse(after.getexif())
+                    self.assertNotIn('xmp', after.info)
+                    # The colour profile affects decoding and is kept
+                    self.assertEqual(after.info.get('icc_profile'), _icc_bytes())
+                    np.testing.assert_array_equal(np.asarray(after), np.asarray(before))
+
+    def test_read_exif_block_returns_the_original_exif(self):
+        # Pillow's EXIF bytes carry the 'Exif\0\0' header that JPEG and WebP store; PNG's eXIf does not
+        tiff = _exif_bytes()[6:]
+        for fmt, _, _ in self.cases:
+            with self.subTest(fmt=fmt):
+                self.assertEqual(read_exif_block(io.BytesIO(_sample_image(fmt))), tiff)
+
+    def test_stripped_output_is_unchanged_without_metadata(self):
+        buf = io.BytesIO()
+        Image.new('RGB', (8, 8), (10, 20, 30)).save(buf, 'PNG')
+        out = io.BytesIO()
+        self.assertEqual(strip_png(io.BytesIO(buf.getvalue()), out), [])
+        self.assertEqual(out.getvalue(), buf.getvalue())
+
+
+class BatchZipStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        settings = override_settings(BATCH_WORKERS=0, MEDIA_ROOT=self.media_root, CACHES=LOCMEM_CACHES,
+                                     RESULT_CACHE_ENABLED=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.files = []
+        for name, data in (('first.png', self._png((200, 0, 0))), ('broken.png', b'not an image'),
+                           ('third.png', self._png((0, 0, 200)))):
+            path = os.path.join(self.upload_dir, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.files.append({'name': name, 'path': path})
+
+    @staticmethod
+    def _png(color) -> bytes:
+        buf = io.BytesIO()
+        Image.new('RGB', (32, 24), color).save(buf, 'PNG')
+        return buf.getvalue()
+
+    def test_archive_entries_and_manifest(self):
+        stream = stream_batch_zip('compress', self.files, {'quality': 70, 'output_format': 'jpg'},
+                                  cleanup=[self.upload_dir])
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(stream)))
+
+        self.assertEqual(archive.namelist(), ['0001-first.jpg', '0003-third.jpg', 'manifest.json'])
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual((manifest['count'], manifest['succeeded'], manifest['failed']), (3, 2, 1))
+        self.assertEqual([(e['index'], e['name'], e['ok']) for e in manifest['files']],
+                         [(1, 'first.png', True), (2, 'broken.png', False), (3, 'third.png', True)])
+        self.assertEqual([e.get('file') for e in manifest['files']], ['0001-first.jpg', None, '0003-third.jpg'])
+        self.assertTrue(manifest['files'][1]['errors'])
+        self.assertNotIn('errors', manifest['files'][0])
+        with Image.open(io.BytesIO(archive.read('0003-third.jpg'))) as img:
+            self.assertEqual((img.format, img.size), ('JPEG', (32, 24)))
+        self.assertFalse(os.path.exists(self.upload_dir))
+
+    def test_close_without_iterating_removes_cleanup_dirs(self):
+        stream = stream_batch_zip('compress', self.files, {'quality': 70}, cleanup=[self.upload_dir])
+        stream.close()
+        self.assertFalse(os.path.exists(self.upload_dir))
+        # Nothing was processed
+        self.assertEqual(os.listdir(self.media_root), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CHECKER_CACHE_ENABLED=True, CHECKER_CACHE_TTLS={'test': 60})
+class CheckerCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # A clock the tests can move forward; the locmem cache expires entries by it too
+        self.offset = 0.0
+        real_time = time.time
+        patcher = mock.patch('time.time', lambda: real_time() + self.offset)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = 0
+        self.release = threading.Event()
+
+    def _checker(self, results):
+        @cached_checker('test')
+        def check(domain):
+            self.calls += 1
+            self.release.wait(5)
+            return results[min(self.calls, len(results)) - 1]
+        return check
+
+    def _wait_for_refresh(self):
+        deadline = time.monotonic() + 5
+        while checker_cache._in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_concurrent_misses_make_one_upstream_call(self):
+        check = self._checker([{'status': 'ok'}])
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(check('example.com'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'status': 'ok'}] * 8)
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        check = self._checker([{'version': 1}, {'version': 2}])
+        self.release.set()
+        self.assertEqual(check('example.com'), {'version': 1})
+
+        self.offset = 61
+        self.release.clear()
+        started = time.monotonic()
+        self.assertEqual(check('example.com'), {'version': 1})
+        self.assertLess(time.monotonic() - started, 1)
+
+        self.release.set()
+        self._wait_for_refresh()
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(check('example.com'), {'version': 2})
+        self.assertEqual(self.calls, 2)
+
+    def test_error_results_expire_after_error_ttl(self):
+        check = self._checker([{'status': 'error', 'error': 'timed out'}, {'status': 'ok'}])
+        self.release.set()
+        self.assertEqual(check('example.com')['error'], 'timed out')
+        self.offset = checker_cache.ERROR_TTL - 1
+        self.assertEqual(check('example.com')['error'], 'timed out')
+        self.assertEqual(self.calls, 1)
+
+        self.offset = checker_cache.ERROR_TTL + 1
+        self.assertEqual(check('example.com'), {'status': 'ok'})
+        self.assertEqual(self.calls, 2)
@@ -4,7 +4,7 @@ from .views import (
     Base64Encoder,BcryptGenerator,CloudflareEmailDecoder,ColorConverter,CSSBeautifier,
     EmailChecker,ImageColorPicker,IPaddressLookup,JSONBeautifier,MarkdownEditor,
     MD5Generator,RandomPasswordGenerator,SHAGenerator,SVGtoJPG,SVGtoPNG,
-    WhatIsMyHeaders,WordCounter,PrivacyPolicy,TermsAndConditions,DVPhotoTool,ImageCompressor,ImageResizer,URLEncoderDecoder,JWTDecoder,UUIDULIDGenerator,UnixTimestampConverter,RegexTester,TextDiffChecker,QRCodeGenerator,MarkdownHtmlConverter,ImageBackgroundRemover,ImageWatermarker,CSVJSONConverter,CaseConverter,PasswordEntropy,QRCodeScanner,BarcodeGenerator,SubnetCalculator,ExifTool,JWTGenerator,ASCIIArtGenerator,SSLCertificateChecker,HashIdentifier,HSTSChecker,SecurityHeadersChecker,RedirectChainAnalyzer,MorseCodeEncoderDecoder,LeetSpeakConverter,DomainAgeChecker,PDFtoImages
+    WhatIsMyHeaders,WordCounter,PrivacyPolicy,TermsAndConditions,DVPhotoTool,ImageCompressor,ImageResizer,URLEncoderDecoder,JWTDecoder,UUIDULIDGenerator,UnixTimestampConverter,RegexTester,TextDiffChecker,QRCodeGenerator,MarkdownHtmlConverter,ImageBackgroundRemover,ImageWatermarker,CSVJSONConverter,CaseConverter,PasswordEntropy,QRCodeScanner,BarcodeGenerator,SubnetCalculator,ExifTool,JWTGenerator,ASCIIArtGenerator,SSLCertificateChecker,HashIdentifier,HSTSChecker,SecurityHeadersChecker,RedirectChainAnalyzer,MorseCodeEncoderDecoder,LeetSpeakConverter,DomainAgeChecker,PDFtoImages,ImagePipelineAPI,ExifAPI,BatchCompressAPI,BatchResizeAPI,BatchWatermarkAPI,SecurityScanAPI,SiteAuditAPI,RuntimeMetrics,JobStatus
 )
 
 app_name = "app_app"
@@ -64,5 +64,14 @@ urlpatterns = [
     path("base64-decoder/",Base64Decoder.as_view(),name="base64_decoder"),
     path("base64-encode-image/",Base64EncodeImage.as_view(),name="base64_encode_image"),
     path("base64-decode-image/",Base64DecodeImage.as_view(),name="base64_decode_image"),
+    path("api/image-pipeline/",ImagePipelineAPI.as_view(),name="api_image_pipeline"),
+    path("api/exif/",ExifAPI.as_view(),name="api_exif"),
+    path("api/batch/compress/",BatchCompressAPI.as_view(),name="api_batch_compress"),
+    path("api/batch/resize/",BatchResizeAPI.as_view(),name="api_batch_resize"),
+    path("api/batch/watermark/",BatchWatermarkAPI.as_view(),name="api_batch_watermark"),
+    path("api/security-scan/",SecurityScanAPI.as_view(),name="api_security_scan"),
+    path("api/site-audit/",SiteAuditAPI.as_view(),name="api_site_audit"),
+    path("api/metrics/",RuntimeMetrics.as_view(),name="api_metrics"),
+    path("api/jobs/<str:job_id>/",JobStatus.as_view(),name="api_job_status"),
     path("",HomePageView.as_view(),name="home"),
 ]
\ No newline at end of file
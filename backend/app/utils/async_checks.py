@@ -0,0 +1,252 @@
+import asyncio
+import ssl
+import socket
+import time
+from typing import Dict, Optional
+
+import certifi
+import httpx
+import requests
+from django.conf import settings
+
+from . import hsts_checker, security_headers_checker
+from .checker_cache import cached_checker
+from .domain_age_checker import get_domain_age as get_domain_age_sync
+from .http_client import (DRAIN_LIMIT, HeaderResponse, NoCookies, final_response, redirect_location,
+                          request_error)
+from .redirect_analyzer import (REDIRECT_STATUSES, analyze_redirect_chain as analyze_redirect_chain_sync,
+                                redirect_target)
+from .ssl_checker import parse_certificate
+
+# Async twins of the network checkers for the ASGI deployment: one event loop waits on
+# hundreds of slow remote sites instead of one worker thread per check. Each function has
+# the same name, signature, cache key and result shape as its sync checker, and feeds the
+# same analyze_*/parse_* helpers, so results are interchangeable.
+
+def new_client() -> httpx.AsyncClient:
+    """AsyncClient for one check (no cookies, keep-alive between its requests).
+
+    Use it as ``async with new_client() as client`` so its connections are closed with the
+    check: they are bound to the running loop, and under WSGI (or a stale refresh via
+    asyncio.run) every check runs in a loop of its own.
+    """
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(getattr(settings, 'ASYNC_HTTP_MAX_CONNECTIONS', 200)),
+            max_keepalive_connections=int(getattr(settings, 'HTTP_POOL_CONNECTIONS', 64)),
+        ),
+    )
+    client.cookies.jar.set_policy(NoCookies())
+    return client
+
+
+def as_requests_error(exc: httpx.HTTPError) -> requests.exceptions.RequestException:
+    """The requests exception the sync checkers would have seen for an httpx failure."""
+    cause = exc
+    while cause is not None:
+        if isinstance(cause, ssl.SSLError):
+            return requests.exceptions.SSLError(str(exc))
+        cause = cause.__cause__
+    if isinstance(exc, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(str(exc))
+    if isinstance(exc, httpx.TimeoutException):
+        return requests.exceptions.ReadTimeout(str(exc))
+    if isinstance(exc, (httpx.NetworkError, httpx.RemoteProtocolError)):
+        return requests.exceptions.ConnectionError(str(exc))
+    if isinstance(exc, httpx.TooManyRedirects):
+        return requests.exceptions.TooManyRedirects(str(exc))
+    return requests.exceptions.RequestException(str(exc))
+
+
+async def head(client: httpx.AsyncClient, url: str, user_agent: str, timeout: int) -> HeaderResponse:
+    """One HEAD request on ``client``, not following redirects; failures are raised as requests exceptions."""
+    try:
+        response = await client.head(url, headers={'User-Agent': user_agent}, timeout=timeout,
+                                     follow_redirects=False)
+    except httpx.HTTPError as e:
+        raise as_requests_error(e) from e
+    return HeaderResponse(response.status_code, str(response.url), response.headers.multi_items())
+
+
+async def fetch_headers(url: str, user_agent: str, timeout: float = 10, max_redirects: int = 30) -> HeaderResponse:
+    """Async http_client.fetch_headers with httpx (proxies and CA bundle from the environment).
+
+    Same hops, body limit, timings and errors. settings.HEADER_FETCH_DEADLINE bounds the
+    whole walk here, including a server that drips its headers. A hop's ttfb_ms runs from
+    sending the request to its headers; httpx's response.elapsed also counts the body read.
+    """
+    started = time.perf_counter()
+    hops = []
+    current = url
+    try:
+        async with asyncio.timeout(float(getattr(settings, 'HEADER_FETCH_DEADLINE', 15))), new_client() as client:
+            for _ in range(max_redirects + 1):
+                status, header_items, hop = await _fetch_hop(client, current, user_agent, timeout)
+                hops.append(hop)
+                next_url = redirect_location(current, status, header_items)
+                if next_url is None:
+                    return final_response(current, status, header_items, hops, started)
+                current = next_url
+    except TimeoutError:
+        raise requests.exceptions.ReadTimeout(f'Fetching {url} exceeded the time limit')
+    except httpx.HTTPError as e:
+        raise as_requests_error(e) from e
+    raise requests.exceptions.TooManyRedirects(f'Exceeded {max_redirects} redirects.')
+
+
+async def _fetch_hop(client: httpx.AsyncClient, url: str, user_agent: str, timeout: float):
+    mark = time.perf_counter()
+    async with client.stream('GET', url, headers={'User-Agent': user_agent, 'Accept-Encoding': 'identity'},
+                             timeout=timeout, follow_redirects=False) as response:
+        hop = {'url': url, 'status_code': response.status_code,
+               'ttfb_ms': round((time.perf_counter() - mark) * 1000.0, 1)}
+        stream = response.extensions.get('network_stream')
+        ssl_object = stream.get_extra_info('ssl_object') if stream is not None else None
+        if ssl_object is not None:
+            hop['tls_version'] = ssl_object.version()
+        header_items = response.headers.multi_items()
+        # As the sync fetch: a short body is read to keep the connection, a longer one is dropped
+        read = 0
+        async for chunk in response.aiter_raw():
+            read += len(chunk)
+            if read > DRAIN_LIMIT:
+                break
+    return response.status_code, header_items, hop
+
+
+async def tls_handshake(host: str, port: int, timeout: float, context: ssl.SSLContext) -> Dict:
+    """Peer certificate, protocol and cipher from a TLS handshake made on asyncio streams."""
+    _, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port, ssl=context, server_hostname=host), timeout)
+    try:
+        ssl_object = writer.get_extra_info('ssl_object')
+        return {'cert': ssl_object.getpeercert(), 'version': ssl_object.version(), 'cipher': ssl_object.cipher()}
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+def _clean_domain(domain: str) -> str:
+    return domain.replace('https://', '').replace('http://', '').strip().strip('/')
+
+
+@cached_checker('ssl')
+async def get_ssl_certificate_info(domain: str, port: int = 443, timeout: int = 10) -> Dict:
+    """Async ssl_checker.get_ssl_certificate_info."""
+    domain = _clean_domain(domain)
+    if not domain:
+        return {'error': 'Domain is required', 'status': 'error'}
+    try:
+        context = ssl.create_default_context(cafile=certifi.where())
+        tls = await tls_handshake(domain, port, timeout, context)
+        return parse_certificate(domain, tls['cert'])
+    except socket.gaierror as e:
+        return {'error': f'Could not resolve domain: {str(e)}', 'status': 'error'}
+    except TimeoutError:
+        return {'error': 'Connection timeout. The domain may be unreachable.', 'status': 'error'}
+    except ssl.SSLError as e:
+        return {'error': f'SSL error: {str(e)}', 'status': 'error'}
+    except Exception as e:
+        return {'error': f'Error checking certificate: {str(e)}', 'status': 'error'}
+
+
+async def check_tls_version(domain: str) -> Optional[Dict]:
+    """Async security_headers_checker.check_tls_version."""
+    try:
+        tls = await tls_handshake(domain, 443, 5, ssl.create_default_context())
+        return security_headers_checker.describe_tls_version(tls['version'])
+    except Exception:
+        return None
+
+
+@cached_checker('hsts')
+async def check_hsts(domain: str, timeout: int = 10) -> Dict:
+    """Async hsts_checker.check_hsts."""
+    domain = _clean_domain(domain)
+    if not domain:
+        return {'error': 'Domain is required', 'status': 'error'}
+    result = hsts_checker.empty_result(domain)
+    try:
+        response = await fetch_headers(f'https://{domain}', 'Mozilla/5.0 (compatible; HSTS-Checker/1.0)', timeout)
+        hsts_checker.analyze_hsts(result, response)
+        result['timings'] = response.timings
+    except requests.exceptions.RequestException as e:
+        result['status'], result['error'] = request_error(e)
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f'Unexpected error: {str(e)}'
+    return result
+
+
+@cached_checker('headers')
+async def check_security_headers(domain: str, timeout: int = 10) -> Dict:
+    """Async security_headers_checker.check_security_headers."""
+    domain = _clean_domain(domain)
+    if not domain:
+        return {'error': 'Domain is required', 'status': 'error'}
+    result = security_headers_checker.empty_result(domain)
+    try:
+        response = await fetch_headers(f'https://{domain}', 'Mozilla/5.0 (compatible; Security-Headers-Checker/1.0)',
+                                       timeout)
+        tls_info = (security_headers_checker.describe_tls_version(response.tls_version) if response.tls_version
+                    else await check_tls_version(domain))
+        security_headers_checker.analyze_security_headers(result, response, tls_info)
+        result['timings'] = response.timings
+    except requests.exceptions.RequestException as e:
+        result['status'], result['error'] = request_error(e)
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f'Unexpected error: {str(e)}'
+    return result
+
+
+@cached_checker('redirects')
+async def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10) -> Dict:
+    """Async redirect_analyzer.analyze_redirect_chain.
+
+    The hops are fetched here (HEAD, no redirect following) and then replayed through the
+    sync analyzer, so the chain, loop detection and warnings come out exactly the same.
+    """
+    url = (url or '').strip()
+    if url and not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+
+    hops: Dict[str, object] = {}
+    current_url: Optional[str] = url
+    user_agent = 'Mozilla/5.0 (compatible; Redirect-Chain-Analyzer/1.0)'
+    async with new_client() as client:
+        for _ in range(max_redirects + 1):
+            if not current_url or current_url in hops:
+                break
+            try:
+                response = await head(client, current_url, user_agent, timeout)
+            except requests.exceptions.RequestException as e:
+                hops[current_url] = e
+                break
+            hops[current_url] = response
+            location = response.headers.get('Location')
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                break
+            current_url = redirect_target(current_url, location)
+
+    def replay(target: str):
+        hop = hops[target]
+        if isinstance(hop, Exception):
+            raise hop
+        return hop
+
+    return analyze_redirect_chain_sync.uncached(url, max_redirects=max_redirects, timeout=timeout, fetch=replay)
+
+
+@cached_checker('whois')
+async def get_domain_age(domain: str, timeout: int = 10) -> Dict:
+    """Async domain_age_checker.get_domain_age.
+
+    python-whois only has a blocking client, so the lookup runs on the default executor;
+    the event loop stays free for the other checks meanwhile.
+    """
+    return await asyncio.to_thread(get_domain_age_sync.uncached, domain, timeout)
+
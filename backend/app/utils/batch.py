@@ -0,0 +1,228 @@
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Batch operation name -> (module, function); each takes (media_dir, image_path, **params)
+# and returns (result, success) with result['output_name'] relative to media_dir
+OPERATIONS = {
+    'compress': ('app.utils.image_tools', 'compress_image_to_target'),
+    'resize': ('app.utils.image_tools', 'resize_or_crop_image'),
+    'watermark': ('app.utils.image_tools', 'add_watermark'),
+}
+
+# Bytes copied into the archive per read, so a response never buffers a whole image
+ZIP_CHUNK = 256 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """Pool process initializer: the utils read Django settings and the cache."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shubrajcom.settings')
+    import django
+    django.setup()
+
+
+def batch_workers() -> int:
+    """Processes in the batch pool (settings.BATCH_WORKERS); 0 processes files in the request thread."""
+    return max(0, min(int(getattr(settings, 'BATCH_WORKERS', 2)), os.cpu_count() or 1))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Request and job threads are running in this process, so do not fork it directly
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _pool = ProcessPoolExecutor(max_workers=batch_workers(), mp_context=multiprocessing.get_context(method),
+                                            initializer=_init_worker)
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next batch starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_operation(operation: str, image_path: str, params: Dict) -> tuple:
+    """Run one batch operation on one file (in a pool process or inline)."""
+    from .lazy_imports import load_module
+
+    module_name, func_name = OPERATIONS[operation]
+    func = getattr(load_module(module_name), func_name)
+    return func(Path(settings.MEDIA_ROOT).resolve(), image_path, **params)
+
+
+def _results(operation: str, paths: List[str], params: Dict) -> Iterator[tuple]:
+    """Yield (index, result, success) as files finish, with at most 2 x workers files in flight."""
+    workers = batch_workers()
+    if workers == 0:
+        for index, path in enumerate(paths):
+            try:
+                result, success = run_operation(operation, path, params)
+            except Exception as e:
+                result, success = {'errors': [f'Processing failed: {e}']}, False
+            yield index, result, success
+        return
+
+    pool = _get_pool()
+    pending = {}
+    queue = iter(enumerate(paths))
+    try:
+        while True:
+            while len(pending) < workers * 2:
+                item = next(queue, None)
+                if item is None:
+                    break
+                index, path = item
+                try:
+                    pending[pool.submit(run_operation, operation, path, params)] = index
+                except BrokenProcessPool:
+                    _discard_pool(pool)
+                    pool = _get_pool()
+                    pending[pool.submit(run_operation, operation, path, params)] = index
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    result, success = future.result()
+                except BrokenProcessPool as e:
+                    _discard_pool(pool)
+                    result, success = {'errors': [f'Worker process died: {e}']}, False
+                except Exception as e:
+                    logger.exception("Batch %s failed on %s", operation, paths[index])
+                    result, success = {'errors': [f'Processing failed: {e}']}, False
+                yield index, result, success
+    finally:
+        # Client went away or the generator was closed: do not leave queued work behind
+        for future in pending:
+            future.cancel()
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable stream collecting zip output until it is drained into the response."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arcname(index: int, source_name: str, output_name: str) -> str:
+    stem = Path(source_name).stem or 'image'
+    return f"{index + 1:04d}-{stem}{Path(output_name).suffix}"
+
+
+class BatchZipStream:
+    """Iterator over a batch archive's chunks that owns the batch's temporary upload directories.
+
+    They are removed when iteration ends or close() is called. StreamingHttpResponse calls
+    close() when the response is done, including a response that was never iterated (a
+    generator's own finally does not run in that case).
+    """
+
+    def __init__(self, chunks: Iterator[bytes], cleanup: Optional[List[str]] = None):
+        self._chunks = chunks
+        self._cleanup = list(cleanup or ())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        import shutil
+
+        try:
+            self._chunks.close()
+        finally:
+            cleanup, self._cleanup = self._cleanup, []
+            for path in cleanup:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _zip_chunks(operation: str, files: List[Dict], params: Dict) -> Iterator[bytes]:
+    media_dir = Path(settings.MEDIA_ROOT).resolve()
+    start = time.perf_counter()
+    sink = _ZipSink()
+    manifest = [None] * len(files)
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for index, result, success in _results(operation, [f['path'] for f in files], params):
+            entry = {'index': index + 1, 'name': files[index]['name'], 'ok': success}
+            if success:
+                arcname = _arcname(index, files[index]['name'], result['output_name'])
+                with open(media_dir / result['output_name'], 'rb') as src, archive.open(arcname, 'w') as dst:
+                    for chunk in iter(lambda: src.read(ZIP_CHUNK), b''):
+                        dst.write(chunk)
+                        yield sink.drain()
+                entry['file'] = arcname
+                entry.update({k: v for k, v in result.items() if k not in ('output_name', 'errors')})
+            else:
+                entry['errors'] = result.get('errors', ['Processing failed.'])
+            manifest[index] = entry
+            yield sink.drain()
+
+        succeeded = sum(1 for entry in manifest if entry and entry['ok'])
+        archive.writestr('manifest.json', json.dumps({
+            'operation': operation,
+            'params': {k: v for k, v in params.items() if not k.endswith('_path')},
+            'count': len(files),
+            'succeeded': succeeded,
+            'failed': len(files) - succeeded,
+            'total_ms': round((time.perf_counter() - start) * 1000.0, 2),
+            'files': manifest,
+        }, indent=2, default=str), compress_type=zipfile.ZIP_DEFLATED)
+    yield sink.drain()
+
+
+def stream_batch_zip(operation: str, files: List[Dict], params: Dict, cleanup: Optional[List[str]] = None) -> BatchZipStream:
+    """Process ``files`` ([{"name", "path"}]) and yield a ZIP archive of the outputs as it is built.
+
+    Outputs are added in completion order, copied from media in ZIP_CHUNK pieces; images are
+    stored (they are already compressed). manifest.json, written last, lists every input in
+    upload order with its archive entry and result, or its errors.
+    Directories in ``cleanup`` are removed when the stream ends or is closed, iterated or not.
+    """
+    return BatchZipStream(_zip_chunks(operation, files, params), cleanup)
@@ -0,0 +1,277 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Bump when a checker's result shape changes so old entries are not served
+CACHE_VERSION = 2
+KEY_PREFIX = 'checker'
+
+# Seconds a result is fresh, per checker; overridden by settings.CHECKER_CACHE_TTLS
+DEFAULT_TTLS = {
+    'ssl': 6 * 60 * 60,
+    'hsts': 60 * 60,
+    'headers': 15 * 60,
+    'redirects': 15 * 60,
+    'whois': 24 * 60 * 60,
+    'audit': 15 * 60,
+}
+
+# Results with an 'error' key (timeouts, DNS failures) are kept this long and never served stale
+ERROR_TTL = 60
+
+# How long a refresh may hold the cross-process lock, and how long other processes wait on it
+LOCK_TTL = 30
+LOCK_WAIT = 10.0
+LOCK_POLL = 0.1
+
+_lock = threading.Lock()
+_in_flight: Dict[str, threading.Event] = {}
+_metrics: Dict[str, Dict[str, int]] = {}
+_refresher = None
+
+
+def _count(checker: str, event: str):
+    with _lock:
+        counters = _metrics.setdefault(checker, {'hits': 0, 'stale': 0, 'misses': 0, 'coalesced': 0,
+                                                 'refreshes': 0, 'errors': 0})
+        counters[event] += 1
+
+
+def checker_cache_metrics() -> Dict[str, Dict]:
+    """Hit/stale/miss counters per checker in this process, with the hit ratio."""
+    with _lock:
+        out = {}
+        for name, counters in _metrics.items():
+            item = dict(counters)
+            lookups = item['hits'] + item['stale'] + item['misses'] + item['coalesced']
+            item['hit_ratio'] = round((lookups - item['misses']) / lookups, 4) if lookups else None
+            out[name] = item
+        return out
+
+
+def _get_refresher() -> ThreadPoolExecutor:
+    global _refresher
+    if _refresher is None:
+        with _lock:
+            if _refresher is None:
+                workers = max(1, int(getattr(settings, 'CHECKER_REFRESH_WORKERS', 4)))
+                _refresher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='app-checker-refresh')
+    return _refresher
+
+
+def checker_ttl(checker: str) -> int:
+    return int(getattr(settings, 'CHECKER_CACHE_TTLS', {}).get(checker, DEFAULT_TTLS.get(checker, 15 * 60)))
+
+
+def make_key(checker: str, arguments: dict, ignore: Iterable[str]) -> str:
+    payload = {}
+    for name, value in arguments.items():
+        if name in ignore:
+            continue
+        if isinstance(value, str):
+            # Checkers strip the scheme and slashes themselves; normalize the same way here
+            value = value.strip().lower().replace('https://', '').replace('http://', '').strip('/')
+        payload[name] = value
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{KEY_PREFIX}:{CACHE_VERSION}:{checker}:{digest}"
+
+
+def _entry(checker: str, result) -> Tuple[Dict, int]:
+    """Cache entry for a checker result and its cache timeout."""
+    if isinstance(result, dict) and 'error' in result:
+        _count(checker, 'errors')
+        return {'result': result, 'fresh_until': time.time() + ERROR_TTL, 'error': True}, ERROR_TTL
+    ttl = checker_ttl(checker)
+    return {'result': result, 'fresh_until': time.time() + ttl}, 2 * ttl
+
+
+def cached_checker(checker: str, ignore: Iterable[str] = ()):
+    """Cache a network checker's result dict in the shared cache, per normalized arguments.
+
+    - Fresh for checker_ttl(checker) seconds, then served stale for as long again while one
+      background refresh runs (stale-while-revalidate).
+    - Concurrent misses for the same key make one upstream call: threads in this process
+      wait for the leader, other processes wait on a cache lock and read its result.
+    - Results with an 'error' key are kept for ERROR_TTL only.
+
+    Coroutine functions are wrapped with an async wrapper over the same keys, so an async
+    checker and its sync twin (same name and signature) share entries. Async misses join
+    the same in-flight events and cache lock as sync ones, so they coalesce across threads,
+    event loops and processes; stale refreshes run on the refresher threads like sync ones.
+
+    Hits are returned unchanged (the result dicts are JSON-like); counters are in
+    checker_cache_metrics(). ``func.uncached`` bypasses the cache.
+    """
+    ignore = tuple(ignore)
+
+    def decorator(func):
+        sig = inspect.signature(func)
+        is_async = inspect.iscoroutinefunction(func)
+
+        def call(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs)) if is_async else func(*args, **kwargs)
+
+        def fetch_and_store(key: str, args, kwargs) -> Dict:
+            result = call(*args, **kwargs)
+            entry, timeout = _entry(checker, result)
+            cache.set(key, entry, timeout=timeout)
+            return result
+
+        def lead(key: str, args, kwargs, event: threading.Event) -> Dict:
+            """Fetch as this process's leader for key, coordinating with other processes via the cache."""
+            lock_key = f"{key}:lock"
+            try:
+                acquired = cache.add(lock_key, 1, timeout=LOCK_TTL)
+                if acquired is False:
+                    # Another process is fetching: wait for its entry rather than calling upstream too
+                    deadline = time.monotonic() + LOCK_WAIT
+                    while time.monotonic() < deadline:
+                        time.sleep(LOCK_POLL)
+                        entry = cache.get(key)
+                        if entry and entry['fresh_until'] > time.time():
+                            _count(checker, 'coalesced')
+                            return entry['result']
+                try:
+                    return fetch_and_store(key, args, kwargs)
+                finally:
+                    if acquired:
+                        cache.delete(lock_key)
+            finally:
+                with _lock:
+                    _in_flight.pop(key, None)
+                event.set()
+
+        def refresh(key: str, args, kwargs, event: threading.Event):
+            try:
+                lead(key, args, kwargs, event)
+            except Exception:
+                logger.exception("Background refresh of %s failed", checker)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not getattr(settings, 'CHECKER_CACHE_ENABLED', True):
+                return func(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = make_key(checker, bound.arguments, ignore)
+
+            entry = cache.get(key)
+            if entry and entry['fresh_until'] > time.time():
+                _count(checker, 'hits')
+                return entry['result']
+
+            with _lock:
+                event = _in_flight.get(key)
+                leader = event is None
+                if leader:
+                    event = _in_flight[key] = threading.Event()
+
+            if entry and not entry.get('error'):
+                # Stale: answer now, refresh once in the background
+                _count(checker, 'stale')
+                if leader:
+                    _count(checker, 'refreshes')
+                    _get_refresher().submit(refresh, key, args, kwargs, event)
+                return entry['result']
+
+            if not leader:
+                event.wait(LOCK_TTL)
+                entry = cache.get(key)
+                if entry:
+                    _count(checker, 'coalesced')
+                    return entry['result']
+                # The leader failed or the cache is unavailable: fetch directly
+                return func(*args, **kwargs)
+
+            _count(checker, 'misses')
+            return lead(key, args, kwargs, event)
+
+        async def fetch_and_store_async(key: str, args, kwargs) -> Dict:
+            result = await func(*args, **kwargs)
+            entry, timeout = _entry(checker, result)
+            await cache.aset(key, entry, timeout=timeout)
+            return result
+
+        async def alead(key: str, args, kwargs, event: threading.Event) -> Dict:
+            """lead() for coroutines: same in-flight event and cache lock, awaited on the running loop."""
+            lock_key = f"{key}:lock"
+            try:
+                acquired = await cache.aadd(lock_key, 1, timeout=LOCK_TTL)
+                if acquired is False:
+                    deadline = time.monotonic() + LOCK_WAIT
+                    while time.monotonic() < deadline:
+                        await asyncio.sleep(LOCK_POLL)
+                        entry = await cache.aget(key)
+                        if entry and entry['fresh_until'] > time.time():
+                            _count(checker, 'coalesced')
+                            return entry['result']
+                try:
+                    return await fetch_and_store_async(key, args, kwargs)
+                finally:
+                    if acquired:
+                        await cache.adelete(lock_key)
+            finally:
+                with _lock:
+                    _in_flight.pop(key, None)
+                event.set()
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not getattr(settings, 'CHECKER_CACHE_ENABLED', True):
+                return await func(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = make_key(checker, bound.arguments, ignore)
+
+            entry = await cache.aget(key)
+            if entry and entry['fresh_until'] > time.time():
+                _count(checker, 'hits')
+                return entry['result']
+
+            with _lock:
+                event = _in_flight.get(key)
+                leader = event is None
+                if leader:
+                    event = _in_flight[key] = threading.Event()
+
+            if entry and not entry.get('error'):
+                # Stale: refresh on a thread with its own loop, so the refresh survives this one
+                _count(checker, 'stale')
+                if leader:
+                    _count(checker, 'refreshes')
+                    _get_refresher().submit(refresh, key, args, kwargs, event)
+                return entry['result']
+
+            if not leader:
+                # The leader may be a sync caller or a request on another loop: poll its event
+                deadline = time.monotonic() + LOCK_TTL
+                while not event.is_set() and time.monotonic() < deadline:
+                    await asyncio.sleep(LOCK_POLL)
+                entry = await cache.aget(key)
+                if entry:
+                    _count(checker, 'coalesced')
+                    return entry['result']
+                return await func(*args, **kwargs)
+
+            _count(checker, 'misses')
+            return await alead(key, args, kwargs, event)
+
+        if is_async:
+            async_wrapper.uncached = func
+            return async_wrapper
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
@@ -3,8 +3,10 @@ import socket
 from datetime import datetime
 from typing import Dict, Optional
 import re
+from .checker_cache import cached_checker
 
 
+@cached_checker('whois')
 def get_domain_age(domain: str, timeout: int = 10) -> Dict:
     """
     Get domain registration date and calculate age.
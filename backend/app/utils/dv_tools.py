@@ -1,45 +1,115 @@
 from PIL import Image
 import cv2
+import io
 import numpy as np
-import os
 import time
-from pathlib import Path
+from .media_store import allocate_output, register_output
+from .uploads import open_image, source_stem
+from .image_tools import REDUCING_GAP, draft_for_size
+from .tiling import TilingError, check_budget
+from .face_detection import detect_eyes, detect_faces
+
+DV_SIZE = (600, 600)
+DV_MAX_KB = 240
+DV_QUALITY = 85
+# Lowest JPEG quality tried when the photo at DV_QUALITY is over DV_MAX_KB
+DV_MIN_QUALITY = 50
+
+
+def _encode_within_limit(rgb, max_bytes):
+    """JPEG-encode into memory at DV_QUALITY, or the highest lower quality that fits max_bytes.
+
+    Returns (buffer, quality, fits, size_at_default_quality).
+    """
+    img = Image.fromarray(rgb)
+
+    def encode(quality):
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=quality)
+        return buf
+
+    buf = encode(DV_QUALITY)
+    first_size = buf.getbuffer().nbytes
+    if first_size <= max_bytes:
+        return buf, DV_QUALITY, True, first_size
+
+    best = None
+    lo, hi = DV_MIN_QUALITY, DV_QUALITY - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = encode(mid)
+        if candidate.getbuffer().nbytes <= max_bytes:
+            best = (candidate, mid)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    if best is None:
+        return buf, DV_QUALITY, False, first_size
+    return best[0], best[1], True, first_size
+
+
+def process_dv_image(media_dir,image_path,timings=None):
+    """Check and fix a DV lottery photo.
+
+    The photo is decoded once into an RGB array; detection, cropping and the checks work on
+    that buffer, and the result is encoded in memory (lowering the quality if needed to meet
+    the 240 KB limit) and written to disk once, only when it passes.
+
+    timings, if given, is filled with milliseconds per stage: decode, detect, crop, encode.
+    """
+    if timings is None:
+        timings = {}
+    stage_start = time.perf_counter()
+
+    def mark(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = round(timings.get(stage, 0.0) + (now - stage_start) * 1000.0, 2)
+        stage_start = now
 
-def process_dv_image(media_dir,image_path):
     errors = []  # List to accumulate all errors
     errors_fixed = []
     # Load the image
-    img = Image.open(image_path)
-    filename = Path(img.filename).stem
-    output_image_name = f"app-shubraj-com-{filename}-{time.time_ns()}-converted.jpg"
-    output_path = media_dir / output_image_name
+    img = open_image(image_path)
+    # The photo ends up 600x600; let libjpeg skip most of a large upload's pixels
+    draft_for_size(img, *DV_SIZE, "stretch")
+    try:
+        # Nothing is decoded yet; the reduced decode may still need an RGB copy of itself
+        check_budget(img, 'DV photo processing', 4)
+    except TilingError as e:
+        return [str(e)], False
+    filename = source_stem(image_path)
+    is_jpeg = img.format == "JPEG"
+    # A converted upload is written without DPI information, so only JPEG uploads are checked for it
+    dpi = img.info.get("dpi", (300, 300)) if is_jpeg else (300, 300)
 
     # Check format
-    if img.format != "JPEG":
-        img = img.convert("RGB")
-        img.save(output_path, "JPEG")
-        img = Image.open(output_path)
+    if not is_jpeg:
         errors.append("Image is not in JPEG format.")
         errors_fixed.append("Image is not in JPEG format. Image Converted to JPG.")
+    if img.mode != "RGB":
+        img = img.convert("RGB")
 
     # Check size and resize to 600x600 pixels if needed
-    if img.size != (600, 600):
-        img = img.resize((600, 600), Image.LANCZOS)
+    if img.size != DV_SIZE:
+        img = img.resize(DV_SIZE, Image.LANCZOS, reducing_gap=REDUCING_GAP)
         errors.append("Image not in size 600 x 600 px.")
         errors_fixed.append("Image not in size 600 x 600 px. Image Converted to 600 x 600 px.")
 
     # Additional checks for scanned photos
-    if img.size != (600, 600):
-        errors.append("For scanned images, please provide an image with 2x2 inches (51x51 mm) dimensions.")
-    elif img.info.get("dpi", (300, 300))[0] != 300:
+    if dpi[0] != 300:
         errors.append("Scanned image does not have a resolution of 300 DPI.")
 
-    # Convert to OpenCV format for further checks
-    img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    # One RGB buffer (and its grayscale) for all further checks
+    rgb = np.asarray(img)
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    mark("decode")
 
-    # Face detection with OpenCV
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    faces = face_cascade.detectMultiScale(img_cv, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100))
+    # Face detection (Haar cascades or YuNet, see settings.FACE_DETECTOR)
+    faces = detect_faces(rgb, min_size=100, gray=gray)
+    mark("detect")
+
+    output = None
     # Ensure there is exactly one face detected
     if len(faces) == 0:
         errors.append("No face detected in the image. Please ensure the face is visible.")
@@ -47,11 +117,9 @@ def process_dv_image(media_dir,image_path):
         errors.append("Multiple faces detected. Please ensure only one face is visible in the image.")
     else:
         # Check for glasses and masks
-        eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-        face = faces[0]
-        x, y, w, h = face
-        roi_gray = cv2.cvtColor(img_cv[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
-        eyes = eye_cascade.detectMultiScale(roi_gray)
+        x, y, w, h = faces[0]
+        eyes = detect_eyes(gray[y:y+h, x:x+w])
+        mark("detect")
 
         if len(eyes) < 2:  # If less than two eyes detected, may indicate glasses or mask
             errors.append("The detected face may be wearing glasses or a mask. Please ensure the face is unobstructed.")
@@ -61,46 +129,53 @@ def process_dv_image(media_dir,image_path):
 
         # Define crop region (from above the head to below the shoulders, estimated for a head-centered crop)
         top = max(0, y - int(h * 0.5))
-        bottom = min(img_cv.shape[0], face_center_y + int(h * 1.2))
+        bottom = min(rgb.shape[0], face_center_y + int(h * 1.2))
 
         # Crop image for upper body composition
-        img_cv_cropped = img_cv[top:bottom, :]
-        img_cropped = Image.fromarray(cv2.cvtColor(img_cv_cropped, cv2.COLOR_BGR2RGB)).resize((600, 600), Image.LANCZOS)
+        cropped = cv2.resize(rgb[top:bottom, :], DV_SIZE, interpolation=cv2.INTER_LANCZOS4)
 
         # Check lighting on cropped image
-        gray = cv2.cvtColor(np.array(img_cropped), cv2.COLOR_RGB2GRAY)
-        brightness = np.mean(gray)
+        brightness = cv2.cvtColor(cropped, cv2.COLOR_RGB2GRAY).mean()
         brightness_threshold = 80  # Adjust if needed
         if brightness < brightness_threshold:
             errors.append("Image is too dark. Ensure the face is well-lit.")
 
         # Enhanced Background Detection
-        img_np = np.array(img_cropped)
         white_threshold = 230  # Lowered to be more inclusive of near-white tones
 
         # Define smaller region around the face as non-background
         margin = 20  # Slight margin around face bounding box
-        background_mask = np.ones(img_np.shape[:2], dtype=np.uint8)
-        background_mask[y-margin: y+h+margin, x-margin: x+w+margin] = 0  # Mask the face area
+        background_mask = np.ones(cropped.shape[:2], dtype=bool)
+        background_mask[max(0, y-margin): y+h+margin, max(0, x-margin): x+w+margin] = False  # Mask the face area
 
         # Calculate white pixel coverage outside the face area
-        white_pixels = (img_np[:, :, :3] > white_threshold).all(axis=2) & (background_mask == 1)
-        white_coverage = np.sum(white_pixels) / np.sum(background_mask == 1) if np.sum(background_mask == 1) > 0 else 0  # Avoid division by zero
+        white_pixels = (cropped > white_threshold).all(axis=2) & background_mask
+        background_count = np.count_nonzero(background_mask)
+        white_coverage = np.count_nonzero(white_pixels) / background_count if background_count > 0 else 0  # Avoid division by zero
 
         required_white_coverage = 0.45  # Require 45% white pixels in background
         if white_coverage < required_white_coverage:
             errors.append("Background is not sufficiently white. Ensure a plain white or off-white background.")
-
-        # Save image if all conditions are met and check file size
-        img_cropped.save(output_path, "JPEG", quality=85)
-        file_size_kb = os.path.getsize(output_path) / 1024  # File size in KB
-
-        if file_size_kb > 240:
-            os.remove(output_path)  # Delete the file if size exceeds the limit
-            errors.append(f"Image file size is {file_size_kb:.2f} KB, which exceeds the 240 KB limit.")
+        mark("crop")
+
+        # Encode in memory and enforce the file size limit before anything touches disk
+        output, quality, fits, first_size = _encode_within_limit(cropped, DV_MAX_KB * 1024)
+        if first_size > DV_MAX_KB * 1024:
+            errors.append(f"Image file size is {first_size / 1024:.2f} KB, which exceeds the {DV_MAX_KB} KB limit.")
+            if fits:
+                errors_fixed.append(
+                    f"Image file size exceeded {DV_MAX_KB} KB. Image Converted at JPEG quality {quality} "
+                    f"({output.getbuffer().nbytes / 1024:.2f} KB)."
+                )
+        mark("encode")
 
     if errors and len(errors_fixed) != len(errors):
         errors = errors + errors_fixed
         return errors,False
-    return (errors_fixed,output_image_name), True
 
+    output_image_name, output_path = allocate_output(media_dir, f"app-shubraj-com-{filename}-{time.time_ns()}-converted.jpg")
+    with open(output_path, "wb") as f:
+        f.write(output.getbuffer())
+    mark("encode")
+    register_output(output_image_name)
+    return (errors_fixed,output_image_name), True
@@ -1,9 +1,15 @@
+import asyncio
+import dns.asyncresolver
 import dns.resolver
 import smtplib
 import socket
+import ssl
 import re
 from django.contrib import messages
 
+SMTP_TIMEOUT = 10
+_local_hostname = None
+
 class EmailValidationError(Exception):
     """Base class for exceptions in this module."""
     pass
@@ -45,14 +51,29 @@ class EmailValidator:
             # Query MX records for the domain
             mx_records = dns.resolver.resolve(domain, 'MX')
             return True, [str(record.exchange) for record in mx_records]
-        except dns.resolver.NoAnswer:
-            raise NoMXRecordsFound("No MX records found for the domain.")
-        except dns.resolver.NXDOMAIN:
-            raise DomainDoesNotExist("The domain does not exist.")
-        except (dns.resolver.Timeout, dns.resolver.NoNameservers):
-            raise SMTPConnectionError("DNS lookup timed out or no nameservers available.")
         except Exception as e:
-            raise EmailValidationError(f"An unexpected error occurred while checking the domain: {str(e)}")
+            raise self._dns_error(e)
+
+    async def adomain_exists(self):
+        """Async domain_exists, resolving MX records on the event loop."""
+        domain = self.email.split('@')[-1]
+
+        try:
+            mx_records = await dns.asyncresolver.resolve(domain, 'MX')
+            return True, [str(record.exchange) for record in mx_records]
+        except Exception as e:
+            raise self._dns_error(e)
+
+    @staticmethod
+    def _dns_error(e):
+        """The EmailValidationError to raise for a failed MX lookup."""
+        if isinstance(e, dns.resolver.NoAnswer):
+            return NoMXRecordsFound("No MX records found for the domain.")
+        if isinstance(e, dns.resolver.NXDOMAIN):
+            return DomainDoesNotExist("The domain does not exist.")
+        if isinstance(e, (dns.resolver.Timeout, dns.resolver.NoNameservers)):
+            return SMTPConnectionError("DNS lookup timed out or no nameservers available.")
+        return EmailValidationError(f"An unexpected error occurred while checking the domain: {str(e)}")
 
     def ping_mx_server(self, mx_record):
         """Ping the MX server to verify the email address."""
@@ -92,6 +113,60 @@ class EmailValidator:
         except Exception as e:
             raise EmailValidationError(f"An unexpected error occurred while pinging the MX server: {str(e)}")
 
+    async def aping_mx_server(self, mx_record):
+        """Async ping_mx_server: the same SMTP dialog (EHLO, STARTTLS, MAIL, RCPT) on asyncio streams."""
+        global _local_hostname
+        if _local_hostname is None:
+            _local_hostname = await asyncio.to_thread(socket.getfqdn)
+
+        writer = None
+        try:
+            async with asyncio.timeout(SMTP_TIMEOUT):
+                reader, writer = await asyncio.open_connection(mx_record, 25)
+                code, _ = await _smtp_reply(reader)
+                if code != 220:
+                    raise SMTPConnectionError("Could not connect to the SMTP server.")
+
+                code, extensions = await _smtp_command(reader, writer, f"EHLO {_local_hostname}")
+                if code != 250:
+                    raise SMTPConnectionError("The server refused our EHLO/HELO message.")
+                if 'starttls' not in extensions.lower():
+                    raise SMTPConnectionError("Network error occurred: STARTTLS extension not supported by server.")
+                code, message = await _smtp_command(reader, writer, "STARTTLS")
+                if code != 220:
+                    raise EmailValidationError(f"Unexpected response from server: {message}")
+                # Like smtplib.starttls(): encrypt, but do not verify the MX certificate
+                context = ssl.create_default_context()
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+                await writer.start_tls(context, server_hostname=mx_record.rstrip('.'))
+
+                code, _ = await _smtp_command(reader, writer, f"EHLO {_local_hostname}")
+                if code != 250:
+                    raise SMTPConnectionError("The server refused our EHLO/HELO message.")
+                code, _ = await _smtp_command(reader, writer, "MAIL FROM:<test@example.com>")
+                if code != 250:
+                    raise SMTPConnectionError("The server refused the sender address.")
+
+                # Check if the email address exists on the server
+                code, message = await _smtp_command(reader, writer, f"RCPT TO:<{self.email}>")
+                await _smtp_command(reader, writer, "QUIT")
+        except EmailValidationError:
+            raise
+        except (TimeoutError, OSError) as e:
+            raise SMTPConnectionError(f"Network error occurred: {str(e)}")
+        except Exception as e:
+            raise EmailValidationError(f"An unexpected error occurred while pinging the MX server: {str(e)}")
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if code == 250:
+            return True, f"The email '{self.email}' exists on the server."
+        if code == 550:
+            raise EmailNotFound(f"The email '{self.email}' does not exist.")
+        raise EmailValidationError(f"Unexpected response from server: {message}")
+
     def validate(self):
         """Run full validation on the email."""
         # Check for valid syntax
@@ -110,6 +185,39 @@ class EmailValidator:
         
         return False, "Failed to validate the email on all available MX servers."
 
+    async def avalidate(self):
+        """Async validate: the DNS lookup and SMTP dialog wait on the event loop, not a thread."""
+        if not self.is_valid_syntax():
+            raise InvalidEmailSyntax(f"Invalid email syntax for '{self.email}'. Please ensure it follows the standard format (e.g., username@domain.com).")
+
+        domain_exists, domain_message = await self.adomain_exists()
+        if not domain_exists:
+            return False, domain_message
+
+        exists, message = await self.aping_mx_server(domain_message[0])
+        if exists:
+            return True, f"The email '{self.email}' is valid."
+
+        return False, "Failed to validate the email on all available MX servers."
+
+
+async def _smtp_reply(reader):
+    """Read one (possibly multi-line) SMTP reply: (code, text)."""
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise SMTPConnectionError("Could not connect to the SMTP server.")
+        lines.append(line[4:].strip().decode(errors='replace'))
+        if line[3:4] != b'-':
+            return int(line[:3]), '\n'.join(lines)
+
+
+async def _smtp_command(reader, writer, command):
+    writer.write(f"{command}\r\n".encode())
+    await writer.drain()
+    return await _smtp_reply(reader)
+
 if __name__ == "__main__":
     try:
         status, message = EmailValidator("shuvraj1234@gmail.com").validate()
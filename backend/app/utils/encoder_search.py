@@ -0,0 +1,205 @@
+import io
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+try:
+    import pillow_avif  # noqa: F401 (registers the AVIF plugin on Pillow builds without it)
+except ImportError:
+    pass
+
+# Quality search bounds for the lossy encoders
+AUTO_MIN_QUALITY = 30
+AUTO_MAX_QUALITY = 95
+
+# Speed/ratio trade-off for format="auto". proxy_edge bounds the side of the proxy the
+# candidates are scored on (see make_proxy); the encoder effort settings also apply to the final encode.
+ENCODER_PROFILES = {
+    'fast': {
+        'formats': ('jpg', 'webp'),
+        'proxy_edge': 384,
+        'jpeg': {'optimize': False},
+        'webp': {'method': 2},
+        'avif': {'speed': 9},
+    },
+    'balanced': {
+        'formats': ('jpg', 'webp', 'avif', 'png'),
+        'proxy_edge': 640,
+        'jpeg': {'optimize': True},
+        'webp': {'method': 4},
+        'avif': {'speed': 7},
+    },
+    'max': {
+        'formats': ('jpg', 'webp', 'avif', 'png'),
+        'proxy_edge': 1024,
+        'jpeg': {'optimize': True, 'progressive': True},
+        'webp': {'method': 6},
+        'avif': {'speed': 4},
+    },
+}
+
+# The proxy is PROXY_GRID x PROXY_GRID tiles, on the 16 px JPEG/WebP macroblock grid
+PROXY_GRID = 4
+PROXY_ALIGN = 16
+
+_EXTENSIONS = {'jpg': 'jpg', 'webp': 'webp', 'avif': 'avif', 'png': 'png'}
+
+
+def avif_available() -> bool:
+    """Whether this Pillow build (or pillow-avif-plugin) can write AVIF."""
+    Image.init()
+    return 'AVIF' in Image.SAVE
+
+
+def encoder_kwargs(fmt: str, quality: int, profile: str = 'balanced') -> dict:
+    """Pillow save() arguments for one candidate encoder under a profile."""
+    settings_for = ENCODER_PROFILES[profile]
+    if fmt == 'webp':
+        return dict(settings_for['webp'], format='WEBP', quality=quality)
+    if fmt == 'avif':
+        return dict(settings_for['avif'], format='AVIF', quality=quality)
+    if fmt == 'png':
+        return {'format': 'PNG', 'optimize': True, 'compress_level': 9}
+    return dict(settings_for['jpeg'], format='JPEG', quality=quality)
+
+
+def _luma(img: Image.Image) -> np.ndarray:
+    """Luma as float32; transparency is composited onto white first (what a viewer sees)."""
+    if img.mode == 'RGBA':
+        img = Image.alpha_composite(Image.new('RGBA', img.size, (255, 255, 255, 255)), img)
+    return np.asarray(img.convert('L'), dtype=np.float32)
+
+
+def ssim(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Mean SSIM of two luma arrays (Gaussian window 11, sigma 1.5, as in Wang et al.)."""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def blur(a):
+        return cv2.GaussianBlur(a, (11, 11), 1.5)
+
+    mu_x, mu_y = blur(reference), blur(candidate)
+    mu_xx, mu_yy, mu_xy = mu_x * mu_x, mu_y * mu_y, mu_x * mu_y
+    var_x = blur(reference * reference) - mu_xx
+    var_y = blur(candidate * candidate) - mu_yy
+    cov = blur(reference * candidate) - mu_xy
+    ssim_map = ((2 * mu_xy + c1) * (2 * cov + c2)) / ((mu_xx + mu_yy + c1) * (var_x + var_y + c2))
+    return float(ssim_map.mean())
+
+
+def psnr(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Peak signal-to-noise ratio in dB (capped at 100 for identical inputs)."""
+    mse = float(np.mean((reference - candidate) ** 2))
+    return 100.0 if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def _tile_offsets(length: int, edge: int):
+    """Tile size and PROXY_GRID evenly spread offsets along one axis (whole axis if it fits)."""
+    if length <= edge:
+        return length, [0]
+    tile = max(PROXY_ALIGN, (edge // PROXY_GRID) // PROXY_ALIGN * PROXY_ALIGN)
+    span = length - tile
+    return tile, sorted({round(span * i / (PROXY_GRID - 1)) // PROXY_ALIGN * PROXY_ALIGN for i in range(PROXY_GRID)})
+
+
+def make_proxy(img: Image.Image, edge: int) -> Image.Image:
+    """Stand-in for img of at most edge x edge pixels, in RGB (RGBA when it has transparency).
+
+    Tiles are sampled across the image at native resolution and block-aligned, rather than
+    the image being downscaled: downscaling averages away exactly the blocking, ringing and
+    noise loss the candidates are being scored on.
+    """
+    mode = 'RGBA' if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info else 'RGB'
+    tile_w, xs = _tile_offsets(img.width, edge)
+    tile_h, ys = _tile_offsets(img.height, edge)
+    if len(xs) == 1 and len(ys) == 1:
+        return img if img.mode == mode else img.convert(mode)
+    proxy = Image.new(mode, (tile_w * len(xs), tile_h * len(ys)))
+    for row, y in enumerate(ys):
+        for col, x in enumerate(xs):
+            tile = img.crop((x, y, x + tile_w, y + tile_h))
+            proxy.paste(tile if tile.mode == mode else tile.convert(mode), (col * tile_w, row * tile_h))
+    return proxy
+
+
+def _score(proxy: Image.Image, reference: np.ndarray, fmt: str, quality: int, profile: str) -> Dict:
+    buf = io.BytesIO()
+    src = proxy if fmt != 'jpg' else proxy.convert('RGB')
+    src.save(buf, **encoder_kwargs(fmt, quality, profile))
+    size = buf.getbuffer().nbytes
+    buf.seek(0)
+    decoded = Image.open(buf)
+    decoded.load()
+    if proxy.mode == 'RGBA' and decoded.mode != 'RGBA':
+        decoded = decoded.convert('RGBA')
+    luma = _luma(decoded)
+    return {'format': fmt, 'quality': quality, 'bytes': size,
+            'ssim': round(ssim(reference, luma), 5), 'psnr': round(psnr(reference, luma), 2)}
+
+
+def choose_encoder(img: Image.Image, profile: Optional[str] = None, min_ssim: Optional[float] = None) -> Dict:
+    """Pick the format and quality giving the smallest file whose SSIM stays above ``min_ssim``.
+
+    Every candidate is encoded on a proxy (tiles sampled from img) and scored against it: for each lossy
+    format the lowest quality meeting the floor is binary-searched, and PNG (lossless) is
+    encoded once. JPEG is skipped for images with transparency, AVIF when no encoder is
+    available. Returns format, quality, save_kwargs (for the full-size encode), ssim, psnr,
+    proxy_bytes, profile, min_ssim, candidates (the best per format), iterations and search_ms.
+    """
+    start = time.perf_counter()
+    profile = profile or getattr(settings, 'COMPRESS_AUTO_PROFILE', 'balanced')
+    if profile not in ENCODER_PROFILES:
+        profile = 'balanced'
+    if min_ssim is None:
+        min_ssim = float(getattr(settings, 'COMPRESS_AUTO_MIN_SSIM', 0.95))
+    spec = ENCODER_PROFILES[profile]
+
+    proxy = make_proxy(img, spec['proxy_edge'])
+    has_alpha = proxy.mode == 'RGBA'
+    reference = _luma(proxy)
+
+    formats = [f for f in spec['formats'] if not (f == 'jpg' and has_alpha) and (f != 'avif' or avif_available())]
+    candidates: List[Dict] = []
+    iterations = 0
+    for fmt in formats:
+        if fmt == 'png':
+            candidates.append(_score(proxy, reference, fmt, 100, profile))
+            iterations += 1
+            continue
+        best = None
+        lo, hi = AUTO_MIN_QUALITY, AUTO_MAX_QUALITY
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            scored = _score(proxy, reference, fmt, mid, profile)
+            iterations += 1
+            if scored['ssim'] >= min_ssim:
+                best = scored
+                hi = mid - 1
+            else:
+                lo = mid + 1
+        if best is None:
+            # Even the top quality misses the floor: keep it as this format's best effort
+            best = _score(proxy, reference, fmt, AUTO_MAX_QUALITY, profile)
+            iterations += 1
+        candidates.append(best)
+
+    passing = [c for c in candidates if c['ssim'] >= min_ssim]
+    chosen = min(passing, key=lambda c: c['bytes']) if passing else max(candidates, key=lambda c: c['ssim'])
+    return {
+        'format': chosen['format'],
+        'extension': _EXTENSIONS[chosen['format']],
+        'quality': chosen['quality'],
+        'save_kwargs': encoder_kwargs(chosen['format'], chosen['quality'], profile),
+        'ssim': chosen['ssim'],
+        'psnr': chosen['psnr'],
+        'proxy_bytes': chosen['bytes'],
+        'met_floor': bool(passing),
+        'profile': profile,
+        'min_ssim': min_ssim,
+        'candidates': candidates,
+        'iterations': iterations,
+        'search_ms': (time.perf_counter() - start) * 1000.0,
+    }
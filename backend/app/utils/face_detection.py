@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+EYE_CASCADE = 'haarcascade_eye.xml'
+
+# Cascade XML is read from disk once per process; each thread parses its own classifier
+# from the cached text because CascadeClassifier.detectMultiScale is not thread-safe.
+_xml_cache: Dict[str, str] = {}
+_xml_lock = threading.Lock()
+_local = threading.local()
+_fallback_warned = False
+
+
+def _cascade_xml(name: str) -> str:
+    xml = _xml_cache.get(name)
+    if xml is None:
+        with _xml_lock:
+            xml = _xml_cache.get(name)
+            if xml is None:
+                with open(os.path.join(cv2.data.haarcascades, name)) as f:
+                    xml = f.read()
+                _xml_cache[name] = xml
+    return xml
+
+
+def get_cascade(name: str) -> cv2.CascadeClassifier:
+    """This thread's CascadeClassifier for one of OpenCV's bundled Haar cascades."""
+    cascades = getattr(_local, 'cascades', None)
+    if cascades is None:
+        cascades = _local.cascades = {}
+    classifier = cascades.get(name)
+    if classifier is None:
+        storage = cv2.FileStorage(_cascade_xml(name), cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+        classifier = cv2.CascadeClassifier()
+        if not classifier.read(storage.getFirstTopLevelNode()):
+            # Old-format cascades can only be loaded from a path
+            classifier = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, name))
+        storage.release()
+        cascades[name] = classifier
+    return classifier
+
+
+class HaarFaceDetector:
+    """OpenCV Haar cascade face detector (the original DV checker behaviour)."""
+    name = 'haar'
+
+    def detect(self, img_rgb: np.ndarray, min_size: int = 100, gray: Optional[np.ndarray] = None) -> List[tuple]:
+        # The cascade runs on grayscale; reuse the caller's conversion when there is one
+        if gray is None:
+            gray = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY)
+        faces = get_cascade(FACE_CASCADE).detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size))
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+class YuNetFaceDetector:
+    """OpenCV DNN face detector (YuNet ONNX model); faster and more robust to pose than Haar."""
+    name = 'yunet'
+
+    def __init__(self, model_path: str, score_threshold: float = 0.8):
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+
+    def _net(self, width: int, height: int):
+        net = getattr(_local, 'yunet', None)
+        if net is None:
+            net = _local.yunet = cv2.FaceDetectorYN.create(self.model_path, '', (width, height), self.score_threshold, 0.3, 50)
+        net.setInputSize((width, height))
+        return net
+
+    def detect(self, img_rgb: np.ndarray, min_size: int = 100, gray: Optional[np.ndarray] = None) -> List[tuple]:
+        height, width = img_rgb.shape[:2]
+        _, faces = self._net(width, height).detect(cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        boxes = []
+        for face in faces:
+            x, y, w, h = (int(round(v)) for v in face[:4])
+            if w >= min_size and h >= min_size:
+                x, y = max(0, x), max(0, y)
+                boxes.append((x, y, min(w, width - x), min(h, height - y)))
+        return boxes
+
+
+def get_face_detector(backend: Optional[str] = None):
+    """Face detector selected by settings.FACE_DETECTOR ('haar' or 'yunet').
+
+    YuNet needs the ONNX model at settings.FACE_DETECTOR_MODEL; when it is missing or cannot
+    be loaded the Haar detector is used instead.
+    """
+    global _fallback_warned
+    backend = (backend or getattr(settings, 'FACE_DETECTOR', 'haar')).lower()
+    if backend == 'yunet':
+        model_path = str(getattr(settings, 'FACE_DETECTOR_MODEL', ''))
+        if model_path and os.path.exists(model_path) and hasattr(cv2, 'FaceDetectorYN'):
+            return YuNetFaceDetector(model_path)
+        if not _fallback_warned:
+            if hasattr(cv2, 'FaceDetectorYN'):
+                logger.warning("FACE_DETECTOR=yunet but no model at FACE_DETECTOR_MODEL=%r; using Haar cascades",
+                               model_path)
+            else:
+                logger.warning("FACE_DETECTOR=yunet but this OpenCV has no FaceDetectorYN; using Haar cascades")
+            _fallback_warned = True
+    return HaarFaceDetector()
+
+
+def detect_faces(img_rgb: np.ndarray, min_size: int = 100, backend: Optional[str] = None,
+                 gray: Optional[np.ndarray] = None) -> List[tuple]:
+    """(x, y, w, h) boxes of faces at least min_size pixels wide and high in an RGB array.
+
+    gray is an optional precomputed grayscale of img_rgb, used by the Haar backend.
+    """
+    detector = get_face_detector(backend)
+    try:
+        return detector.detect(img_rgb, min_size=min_size, gray=gray)
+    except cv2.error as e:
+        if detector.name == 'haar':
+            raise
+        logger.warning("%s face detection failed, retrying with Haar cascades: %s", detector.name, e)
+        return HaarFaceDetector().detect(img_rgb, min_size=min_size, gray=gray)
+
+
+def detect_eyes(gray_roi: np.ndarray) -> List[tuple]:
+    return [tuple(int(v) for v in eye) for eye in get_cascade(EYE_CASCADE).detectMultiScale(gray_roi)]
+
@@ -0,0 +1,171 @@
+import http.cookiejar
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+import urllib3
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Body bytes read before a response is released: a fully read body returns its connection
+# to the pool, a larger one closes it
+DRAIN_LIMIT = 64 * 1024
+DRAIN_CHUNK = 16 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class NoCookies(http.cookiejar.DefaultCookiePolicy):
+    """Never store cookies: the session is shared by every checker, request and scanned site."""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+def get_session() -> requests.Session:
+    """Process-wide requests.Session for the network checkers, with keep-alive connection pools.
+
+    Connections to a host are reused across checks and requests (pool sizes from
+    settings.HTTP_POOL_CONNECTIONS / HTTP_POOL_MAXSIZE). Cookies are never stored, so one
+    site's or one check's cookies cannot leak into another; callers pass their own
+    User-Agent and timeout per request.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.cookies.set_policy(NoCookies())
+                adapter = HTTPAdapter(
+                    pool_connections=int(getattr(settings, 'HTTP_POOL_CONNECTIONS', 64)),
+                    pool_maxsize=int(getattr(settings, 'HTTP_POOL_MAXSIZE', 16)),
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def request_error(exc: requests.exceptions.RequestException) -> Tuple[str, str]:
+    """(status, error) the checkers report for a failed HTTPS fetch of a domain."""
+    # SSLError and ConnectTimeout are also ConnectionErrors, so the order matters
+    if isinstance(exc, requests.exceptions.SSLError):
+        return 'ssl_error', 'SSL/TLS error - domain may not support HTTPS or has certificate issues'
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return 'connection_error', 'Could not connect to the domain'
+    if isinstance(exc, requests.exceptions.Timeout):
+        return 'timeout', 'Connection timeout'
+    return 'error', f'Request failed: {str(exc)}'
+
+
+class HeaderResponse:
+    """The parts of a requests.Response the header analyzers read, for a response whose body was not read.
+
+    status_code, url (after redirects), headers (case-insensitive, repeated fields joined with
+    ", " as requests does) and raw.headers['Set-Cookie'] as a list. fetch_headers also sets
+    tls_version (of the first hop reporting one) and timings.
+    """
+
+    def __init__(self, status_code: int, url: str, header_items: Iterable[Tuple[str, str]],
+                 tls_version: Optional[str] = None, timings: Optional[Dict] = None):
+        header_items = list(header_items)
+        self.status_code = status_code
+        self.url = url
+        self.headers = CaseInsensitiveDict()
+        for name, value in header_items:
+            self.headers[name] = f"{self.headers[name]}, {value}" if name in self.headers else value
+        cookies = [value for name, value in header_items if name.lower() == 'set-cookie']
+        self.raw = SimpleNamespace(headers={'Set-Cookie': cookies} if cookies else {})
+        self.tls_version = tls_version
+        self.timings = timings or {}
+
+
+def release_response(response: requests.Response, limit: int = DRAIN_LIMIT, expires: Optional[float] = None):
+    """Read at most ``limit`` body bytes of a streamed response, then close it.
+
+    A body read to the end returns its connection to the session's pool for the next
+    request; a larger one, or one still arriving at ``expires`` (time.monotonic()), closes
+    the connection instead of downloading it. Each read returns what has arrived, so a
+    dripping body is checked against ``expires`` between reads.
+    """
+    read = 0
+    try:
+        while read <= limit and (expires is None or time.monotonic() < expires):
+            chunk = response.raw.read1(DRAIN_CHUNK, decode_content=False)
+            if not chunk:
+                break
+            read += len(chunk)
+    except (requests.exceptions.RequestException, OSError, urllib3.exceptions.HTTPError):
+        pass
+    finally:
+        response.close()
+
+
+def fetch_headers(url: str, user_agent: str, timeout: float = 10, max_redirects: int = 30,
+                  deadline: Optional[float] = None) -> HeaderResponse:
+    """GET url on the shared session, following redirects, reading only status lines and headers.
+
+    Each hop is streamed without following redirects; once its headers are in, at most
+    DRAIN_LIMIT body bytes are read so a small body leaves the connection alive for the next
+    hop, and a slow or huge page is cut off. requests handles proxies, IDNA and URL quoting.
+    deadline (seconds, default settings.HEADER_FETCH_DEADLINE) bounds the whole walk: no hop
+    starts after it, each connect/read waits at most min(timeout, time left), and body reads
+    stop at it. Failures raise the requests exceptions request_error() understands.
+
+    timings has ttfb_ms of the final hop (response.elapsed: request sent, including any new
+    connection, to headers parsed), total_ms, redirects, and per hop in hops its url,
+    status_code, ttfb_ms and, when the response still held its TLS connection, tls_version.
+    """
+    started = time.perf_counter()
+    expires = time.monotonic() + (deadline or float(getattr(settings, 'HEADER_FETCH_DEADLINE', 15)))
+    hops: List[Dict] = []
+    current = url
+    for _ in range(max_redirects + 1):
+        status, header_items, hop = _fetch_hop(current, user_agent, timeout, expires)
+        hops.append(hop)
+        next_url = redirect_location(current, status, header_items)
+        if next_url is None:
+            return final_response(current, status, header_items, hops, started)
+        current = next_url
+    raise requests.exceptions.TooManyRedirects(f'Exceeded {max_redirects} redirects.')
+
+
+def redirect_location(url: str, status: int, header_items: List[Tuple[str, str]]) -> Optional[str]:
+    """Absolute URL a response redirects to, or None if it is final."""
+    location = next((value for name, value in header_items if name.lower() == 'location'), None)
+    if status in (301, 302, 303, 307, 308) and location:
+        return urljoin(url, location)
+    return None
+
+
+def final_response(url: str, status: int, header_items: List[Tuple[str, str]], hops: List[Dict],
+                   started: float) -> HeaderResponse:
+    """HeaderResponse for the last hop of a header fetch, with the walk's timings."""
+    timings = {'ttfb_ms': hops[-1]['ttfb_ms'], 'total_ms': round((time.perf_counter() - started) * 1000.0, 1),
+               'redirects': len(hops) - 1, 'hops': hops}
+    # A hop with an empty body hands its connection back before its TLS version can be read
+    tls_version = next((hop['tls_version'] for hop in hops if hop.get('tls_version')), None)
+    return HeaderResponse(status, url, header_items, tls_version=tls_version, timings=timings)
+
+
+def _fetch_hop(url: str, user_agent: str, timeout: float, expires: float) -> Tuple[int, List, Dict]:
+    left = expires - time.monotonic()
+    if left <= 0:
+        raise requests.exceptions.ReadTimeout(f'Fetching {url} exceeded the time limit')
+    response = get_session().get(url, headers={'User-Agent': user_agent, 'Accept-Encoding': 'identity'},
+                                 timeout=min(timeout, left), allow_redirects=False, stream=True)
+    try:
+        hop = {'url': url, 'status_code': response.status_code,
+               'ttfb_ms': round(response.elapsed.total_seconds() * 1000.0, 1)}
+        # The streamed response still holds its connection; a TLS socket reports its protocol
+        sock = getattr(response.raw.connection, 'sock', None)
+        if hasattr(sock, 'version'):
+            hop['tls_version'] = sock.version()
+        return response.status_code, list(response.raw.headers.items()), hop
+    finally:
+        release_response(response, expires=expires)
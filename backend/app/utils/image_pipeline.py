@@ -0,0 +1,226 @@
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image
+
+from .image_tools import (
+    draft_for_size,
+    draw_watermark,
+    fit_image,
+    flatten_on_white,
+    normalize_output_format,
+    save_kwargs_for,
+    whiteish_alpha,
+)
+from .media_store import allocate_output, register_output
+from .result_cache import content_cached
+from .tiling import TilingError, check_budget
+from .uploads import open_image, source_stem
+
+OPERATIONS = ('resize', 'watermark', 'bg_remove', 'exif_strip', 'format')
+MAX_STEPS = 10
+POSITIONS = ('top-left', 'top-right', 'bottom-left', 'bottom-right', 'center')
+
+
+def _parse_color(value) -> tuple:
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        return tuple(max(0, min(255, int(v))) for v in value)
+    text = str(value or '#ffffff').strip().lstrip('#')
+    return tuple(int(text[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def validate_steps(steps) -> tuple:
+    """
+    Check and normalize a pipeline definition.
+
+    Each step is a dict with an ``op`` from OPERATIONS plus that operation's parameters:
+        resize:     width, height, mode ('fit' | 'fill')
+        watermark:  text, image (bool, use the uploaded watermark image), position, opacity, font_size, text_color
+        bg_remove:  method ('ai' | 'whiteish'), tolerance, smooth, border_only, model
+        exif_strip: no parameters
+        format:     format ('jpg' | 'png' | 'webp'), quality
+
+    Returns:
+        Tuple of (normalized_steps, errors)
+    """
+    if not isinstance(steps, list) or not steps:
+        return [], ['Pipeline must be a non-empty list of steps.']
+    if len(steps) > MAX_STEPS:
+        return [], [f'Pipeline has {len(steps)} steps, but maximum allowed is {MAX_STEPS}.']
+
+    normalized = []
+    errors = []
+    for i, step in enumerate(steps, start=1):
+        if not isinstance(step, dict) or step.get('op') not in OPERATIONS:
+            errors.append(f"Step {i}: 'op' must be one of {', '.join(OPERATIONS)}.")
+            continue
+        op = step['op']
+        try:
+            if op == 'resize':
+                width, height = int(step.get('width', 0)), int(step.get('height', 0))
+                if width <= 0 or height <= 0:
+                    raise ValueError('width and height must be positive integers')
+                mode = step.get('mode', 'fit')
+                normalized.append({'op': op, 'width': width, 'height': height, 'mode': 'fill' if mode == 'fill' else 'fit'})
+            elif op == 'watermark':
+                text = str(step.get('text') or '').strip()
+                if not text and not step.get('image'):
+                    raise ValueError('provide text or set image to use the uploaded watermark image')
+                position = str(step.get('position', 'bottom-right')).lower()
+                normalized.append({
+                    'op': op,
+                    'text': text,
+                    'image': bool(step.get('image')),
+                    'position': position if position in POSITIONS else 'bottom-right',
+                    'opacity': max(0.0, min(1.0, float(step.get('opacity', 0.7)))),
+                    'font_size': max(6, min(400, int(step.get('font_size', 36)))),
+                    'text_color': _parse_color(step.get('text_color', '#ffffff')),
+                })
+            elif op == 'bg_remove':
+                method = step.get('method', 'ai')
+                normalized.append({
+                    'op': op,
+                    'method': 'whiteish' if method == 'whiteish' else 'ai',
+                    'tolerance': max(0, min(255, int(step.get('tolerance', 20)))),
+                    'smooth': bool(step.get('smooth', True)),
+                    'border_only': bool(step.get('border_only', False)),
+                    'model': step.get('model'),
+                })
+            elif op == 'exif_strip':
+                normalized.append({'op': op})
+            elif op == 'format':
+                fmt, _ = normalize_output_format(step.get('format', 'jpg'))
+                normalized.append({'op': op, 'format': fmt, 'quality': max(10, min(100, int(step.get('quality', 85))))})
+        except (TypeError, ValueError) as e:
+            errors.append(f'Step {i} ({op}): {e}')
+    return normalized, errors
+
+
+def _remove_background(img: Image.Image, step: Dict, warnings: List[str]) -> Image.Image:
+    if step['method'] == 'ai':
+        try:
+            # rembg pulls in onnxruntime/pymatting; only load it when AI removal is requested
+            from .model_sessions import remove_background
+            out, _, _ = remove_background(img, step['model'])
+            return out
+        except Exception as e:
+            warnings.append(f'AI background removal unavailable, used near-white removal: {e}')
+    return whiteish_alpha(img, step['tolerance'], step['smooth'], border_only=step['border_only'])
+
+
+@content_cached('pipeline', file_params=('image_path', 'watermark_image_path'), ignore=('media_dir', 'progress'))
+def run_pipeline(media_dir: Path, image_path: str, steps: List[Dict], watermark_image_path: str = None,
+                 progress: Optional[Callable[[int, int], None]] = None) -> tuple:
+    """
+    Apply a chain of image operations with a single decode and a single encode.
+
+    The image stays in memory between steps; only the final result is written to media_dir.
+    Without a ``format`` step the output is PNG when the result has transparency, else JPEG (quality 85).
+    EXIF from the source is carried to the output unless the chain contains ``exif_strip``.
+
+    Args:
+        media_dir: Directory to save the output image
+        image_path: Path or file-like source image
+        steps: Pipeline definition, see validate_steps
+        watermark_image_path: Optional path or file-like image used by watermark steps with ``image`` set
+        progress: Optional callback called as progress(steps_done, total_steps)
+
+    Returns:
+        Tuple of (result_dict, success_bool)
+    """
+    steps, errors = validate_steps(steps)
+    if errors:
+        return {'errors': errors}, False
+
+    start = time.perf_counter()
+    try:
+        img = open_image(image_path)
+        # Geometry of the full-resolution image, used by a leading resize after a reduced JPEG decode
+        src_size = img.size
+        if steps[0]['op'] == 'resize':
+            draft_for_size(img, steps[0]['width'], steps[0]['height'], steps[0]['mode'])
+        # Steps hand full-size RGBA copies to each other, so a chain cannot be tiled; refuse
+        # images that would not fit the memory ceiling with an input and an output copy alive
+        check_budget(img, 'The image pipeline', 8)
+        img.load()
+    except TilingError as e:
+        return {'errors': [str(e)]}, False
+    except Exception as e:
+        return {'errors': [f'Failed to open image: {e}']}, False
+
+    exif = img.info.get('exif')
+    watermark_img = None
+    if any(s['op'] == 'watermark' and s['image'] for s in steps):
+        if not watermark_image_path:
+            return {'errors': ['A watermark step uses an image, but no watermark image was uploaded.']}, False
+        try:
+            watermark_img = open_image(watermark_image_path)
+            watermark_img.load()
+        except Exception as e:
+            return {'errors': [f'Failed to open watermark image: {e}']}, False
+    decode_ms = (time.perf_counter() - start) * 1000.0
+
+    fmt, quality = None, 85
+    warnings = []
+    timings = []
+    for i, step in enumerate(steps, start=1):
+        step_start = time.perf_counter()
+        op = step['op']
+        try:
+            if op == 'resize':
+                img = fit_image(img, step['width'], step['height'], step['mode'], src_size=src_size if i == 1 else None)
+            elif op == 'watermark':
+                img = draw_watermark(img, step['text'] or None, watermark_img if step['image'] else None,
+                                     position=step['position'], opacity=step['opacity'],
+                                     font_size=step['font_size'], text_color=step['text_color'])
+            elif op == 'bg_remove':
+                img = _remove_background(img, step, warnings)
+            elif op == 'exif_strip':
+                exif = None
+                img.info = {}
+            elif op == 'format':
+                fmt, quality = step['format'], step['quality']
+        except Exception as e:
+            return {'errors': [f'Step {i} ({op}) failed: {e}']}, False
+        timings.append({'op': op, 'ms': round((time.perf_counter() - step_start) * 1000.0, 2)})
+        if progress:
+            progress(i, len(steps))
+
+    has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+    if fmt is None:
+        fmt = 'png' if has_alpha else 'jpg'
+    fmt, ext = normalize_output_format(fmt)
+    if fmt in ('jpg', 'jpeg'):
+        img = flatten_on_white(img)
+    elif img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+
+    save_kwargs = save_kwargs_for(fmt, quality)
+    if exif:
+        save_kwargs['exif'] = exif
+
+    encode_start = time.perf_counter()
+    output_name, output_path = allocate_output(media_dir, f"app-shubraj-com-{source_stem(image_path)}-{time.time_ns()}-pipeline.{ext}")
+    try:
+        img.save(output_path, **save_kwargs)
+    except Exception as e:
+        return {'errors': [f'Failed to save result: {e}']}, False
+    encode_ms = (time.perf_counter() - encode_start) * 1000.0
+    register_output(output_name)
+
+    result = {
+        'output_name': output_name,
+        'size_kb': os.path.getsize(output_path) / 1024.0,
+        'width': img.width,
+        'height': img.height,
+        'format': fmt,
+        'steps': timings,
+        'decode_ms': round(decode_ms, 2),
+        'encode_ms': round(encode_ms, 2),
+        'total_ms': round((time.perf_counter() - start) * 1000.0, 2),
+    }
+    if warnings:
+        result['warnings'] = warnings
+    return result, True
@@ -1,80 +1,638 @@
 from PIL import Image
 from pathlib import Path
+import functools
+import io
+import math
 import os
+import threading
 import time
+from collections import OrderedDict
 import numpy as np
 import cv2
-from rembg import remove
-import piexif
-from PIL.ExifTags import TAGS
+from django.conf import settings
+from .result_cache import content_cached, hash_file
+from .media_store import allocate_output, register_output
+from .encoder_search import choose_encoder
+from .metadata import EXTENSIONS as METADATA_EXTENSIONS, MetadataError, detect_format, strip_metadata
+from .uploads import open_binary, open_image, read_source_bytes, source_size, source_stem
+from .tiling import (
+    PngStripWriter,
+    TilingError,
+    check_budget,
+    convert_strips,
+    flatten_on_white_strips,
+    iter_strips,
+    png_mode_for,
+    should_tile,
+)
+
+
+def normalize_output_format(output_format: str):
+    """Normalize a requested format to (fmt, ext); unknown formats fall back to jpg."""
+    fmt = (output_format or "jpg").lower()
+    if fmt not in ("jpg", "jpeg", "webp", "png"):
+        fmt = "jpg"
+    ext = 'webp' if fmt == 'webp' else ('png' if fmt == 'png' else 'jpg')
+    return fmt, ext
+
+
+def save_kwargs_for(fmt: str, quality: int) -> dict:
+    """Pillow save() arguments shared by the tools for jpg/webp/png output."""
+    if fmt == 'webp':
+        return {"format": "WEBP", "quality": quality, "method": 6}
+    if fmt == 'avif':
+        return {"format": "AVIF", "quality": quality}
+    if fmt in ("jpg", "jpeg"):
+        return {"format": "JPEG", "quality": quality, "optimize": True}
+    # PNG uses lossless compression; Pillow uses quality-like via optimize and compress_level (0-9)
+    # Map quality 10-100 to compress_level 9-0 (higher quality -> lower compression level)
+    compress_level = max(0, min(9, 9 - round((quality - 10) / 90 * 9)))
+    return {"format": "PNG", "optimize": True, "compress_level": compress_level}
+
+
+def flatten_on_white(img: Image.Image) -> Image.Image:
+    """RGB copy of img with any transparency composited onto white."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        bg = Image.new('RGB', img.size, (255, 255, 255))
+        bg.paste(img, mask=img.split()[-1])
+        return bg
+    return img.convert('RGB') if img.mode != 'RGB' else img
+
+
+# Decode/reduce to at least this multiple of the output size before the final LANCZOS pass
+REDUCING_GAP = 2.0
+
+
+def draft_for_size(img: Image.Image, width: int, height: int, mode: str = "fit") -> bool:
+    """Let libjpeg decode at 1/2, 1/4 or 1/8 scale when the output is much smaller than the source.
+
+    Must be called before the image is loaded. The decoded image stays at least REDUCING_GAP
+    times the output size, so the final LANCZOS resample keeps full quality. mode is 'fit',
+    'fill' or 'stretch' (exactly width x height). Returns True when a reduced decode was set up.
+    """
+    if not getattr(settings, 'IMAGE_DRAFT_DECODE', True) or img.format != 'JPEG' or width <= 0 or height <= 0:
+        return False
+    src_w, src_h = img.size
+    if mode == 'stretch':
+        need_w, need_h = width, height
+    else:
+        scale = max(width / src_w, height / src_h) if mode == 'fill' else min(width / src_w, height / src_h)
+        need_w, need_h = src_w * scale, src_h * scale
+    need = (math.ceil(need_w * REDUCING_GAP), math.ceil(need_h * REDUCING_GAP))
+    if need[0] * 2 > src_w or need[1] * 2 > src_h:
+        return False
+    return img.draft(img.mode if img.mode in ('RGB', 'L') else None, need) is not None
+
+
+def fit_image(img: Image.Image, width: int, height: int, mode: str = "fit", src_size: tuple = None) -> Image.Image:
+    """Resize in memory: 'fit' contains within width x height, 'fill' covers and center-crops.
+
+    src_size is the size before a draft (reduced) decode, so the output geometry matches a
+    full-resolution resize.
+    """
+    src_w, src_h = src_size or img.size
+    if mode == "fill":
+        # cover: scale to fill then center crop
+        scale = max(width / src_w, height / src_h)
+        new_w, new_h = int(round(src_w * scale)), int(round(src_h * scale))
+        img_resized = img.resize((new_w, new_h), Image.LANCZOS, reducing_gap=REDUCING_GAP)
+        left = max(0, (new_w - width) // 2)
+        top = max(0, (new_h - height) // 2)
+        return img_resized.crop((left, top, left + width, top + height))
+    # fit: contain within box, preserve aspect; pad not applied, just smaller side
+    scale = min(width / src_w, height / src_h)
+    new_w, new_h = int(round(src_w * scale)), int(round(src_h * scale))
+    return img.resize((new_w, new_h), Image.LANCZOS, reducing_gap=REDUCING_GAP)
+
+
+# Near-white removal works on horizontal strips of about this many pixels, so its
+# temporary arrays stay bounded however large the image is
+WHITEISH_STRIP_PIXELS = 4_000_000
+# Rows of context above/below a strip so the 3x3 opening (2 rows) and blur (1 row) match a
+# whole-image pass
+WHITEISH_HALO = 3
+
+
+def _whiteish_mask(pixels: np.ndarray, thr: int, smooth: bool) -> np.ndarray:
+    """uint8 mask (255 = near-white) of an RGB/RGBA strip, from one fused per-pixel comparison."""
+    lower = (thr,) * 3 + (0,) * (pixels.shape[2] - 3)
+    mask = cv2.inRange(pixels, lower, (255,) * pixels.shape[2])
+    if smooth:
+        kernel = np.ones((3, 3), np.uint8)
+        cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, dst=mask)
+        cv2.GaussianBlur(mask, (3, 3), 0, dst=mask)
+        cv2.threshold(mask, 127, 255, cv2.THRESH_BINARY, dst=mask)
+    return mask
+
+
+def _strips(height: int, width: int, strip_pixels: int):
+    rows = max(16, strip_pixels // max(1, width))
+    for top in range(0, height, rows):
+        yield top, min(height, top + rows)
+
+
+def iter_whiteish_strips(img: Image.Image, tolerance: int = 20, smooth: bool = True, border_only: bool = False,
+                         strip_pixels: int = None, out: np.ndarray = None):
+    """Yield (top, rgba_rows) for img with near-white pixels made transparent, strip by strip.
+
+    Strips are written into ``out`` (a (height, width, 4) uint8 array) when given, otherwise
+    into one reused strip buffer, so each yielded array is only valid until the next one.
+    """
+    strip_pixels = strip_pixels or WHITEISH_STRIP_PIXELS
+    thr = max(0, min(255, 255 - int(tolerance or 0)))
+    width, height = img.size
+    halo = WHITEISH_HALO if smooth else 0
+
+    def strip_pixels_of(top, bottom):
+        """RGB/RGBA pixels for rows [top - halo, bottom + halo) plus the offset of row ``top``."""
+        lo, hi = max(0, top - halo), min(height, bottom + halo)
+        region = img.crop((0, lo, width, hi))
+        if region.mode not in ('RGB', 'RGBA'):
+            region = region.convert('RGBA')
+        return np.asarray(region), top - lo
+
+    full_mask = None
+    if border_only:
+        # Connectivity is global: build the whole mask (1 byte/pixel), then flood-fill it from a
+        # 1px white frame so every near-white region touching the border becomes 128
+        full_mask = np.zeros((height + 2, width + 2), np.uint8)
+        full_mask[0, :] = full_mask[-1, :] = 255
+        full_mask[:, 0] = full_mask[:, -1] = 255
+        for top, bottom in _strips(height, width, strip_pixels):
+            pixels, offset = strip_pixels_of(top, bottom)
+            full_mask[top + 1:bottom + 1, 1:-1] = _whiteish_mask(pixels, thr, smooth)[offset:offset + bottom - top]
+        cv2.floodFill(full_mask, None, (0, 0), 128, 0, 0, 4)
+
+    buffer = None
+    for top, bottom in _strips(height, width, strip_pixels):
+        pixels, offset = strip_pixels_of(top, bottom)
+        if full_mask is not None:
+            keep = cv2.compare(full_mask[top + 1:bottom + 1, 1:-1], 128, cv2.CMP_NE)
+        else:
+            keep = cv2.bitwise_not(_whiteish_mask(pixels, thr, smooth)[offset:offset + bottom - top])
+        core = pixels[offset:offset + bottom - top]
+        if out is not None:
+            dst = out[top:bottom]
+        else:
+            if buffer is None:
+                buffer = np.empty((bottom - top, width, 4), np.uint8)
+            dst = buffer[:bottom - top]
+        alpha = dst[:, :, 3]
+        if core.shape[2] == 3:
+            cv2.cvtColor(core, cv2.COLOR_RGB2RGBA, dst=dst)
+            alpha[...] = keep
+        else:
+            dst[...] = core
+            # Set transparent for background: alpha &= keep-mask, in place
+            np.bitwise_and(alpha, keep, out=alpha)
+        yield top, dst
+
+
+def whiteish_alpha(img: Image.Image, tolerance: int = 20, smooth: bool = True, border_only: bool = False,
+                   strip_pixels: int = None) -> Image.Image:
+    """RGBA copy of img with near-white pixels made transparent.
+
+    With border_only, only near-white regions connected to the image border are removed, so
+    white areas inside the subject (eyes, text, highlights) are kept.
+    The image is processed in horizontal strips (with a small halo so smoothing is seamless);
+    each strip costs one fused comparison on uint8 buffers and is written straight into the
+    output array, so the only full-size allocation is the result itself.
+    """
+    out = np.empty((img.height, img.width, 4), np.uint8)
+    for _ in iter_whiteish_strips(img, tolerance, smooth, border_only, strip_pixels, out=out):
+        pass
+    return Image.fromarray(out, 'RGBA')
+
+
+def _anchor(position: str, img_w: int, img_h: int, w: int, h: int):
+    position = position.lower()
+    if 'right' in position:
+        pos_x = img_w - w - 10
+    elif 'center' in position:
+        pos_x = (img_w - w) // 2
+    else:
+        pos_x = 10
+
+    if 'bottom' in position:
+        pos_y = img_h - h - 10
+    elif 'center' in position:
+        pos_y = (img_h - h) // 2
+    else:
+        pos_y = 10
+    return pos_x, pos_y
+
+
+# Fonts tried for text watermarks, in order; Pillow's built-in font is the last resort
+WATERMARK_FONT_PATHS = (
+    '/System/Library/Fonts/Supplemental/Arial.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
+)
+# Pre-rendered text and logo sprites kept per process, bounded by their pixel memory
+WATERMARK_SPRITE_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class _SpriteCache:
+    """Thread-safe LRU of read-only RGBA sprites, evicting by total pixel bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def put(self, key, entry, sprite: Image.Image):
+        size = sprite.width * sprite.height * 4
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = (entry, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+_sprite_cache = _SpriteCache(WATERMARK_SPRITE_CACHE_BYTES)
+
+
+@functools.lru_cache(maxsize=1)
+def _watermark_font_path():
+    return next((fp for fp in WATERMARK_FONT_PATHS if os.path.exists(fp)), None)
+
+
+@functools.lru_cache(maxsize=64)
+def load_font(path: str, size: int):
+    """ImageFont for (path, size), loaded once per process; None path gives the default font."""
+    from PIL import ImageFont
+
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=128)
+def _opacity_lut(opacity: float) -> tuple:
+    """Lookup table scaling an 8-bit alpha channel by opacity (Image.point runs it in C)."""
+    return tuple(int(p * opacity) for p in range(256))
+
+
+def text_sprite(text: str, font_size: int, text_color: tuple, opacity: float) -> tuple:
+    """(sprite, text_w, text_h) for a text watermark, rendered once and cached.
+
+    The sprite is an RGBA image just large enough to hold the drawn text; callers must not modify it.
+    """
+    from PIL import ImageDraw
+
+    key = ('text', text, font_size, tuple(text_color), opacity)
+    cached = _sprite_cache.get(key)
+    if cached is not None:
+        return cached[0]
+    font = load_font(_watermark_font_path(), font_size)
+    # Calculate text bounding box
+    bbox = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), text, font=font)
+    # Draw text with semi-transparency on a layer just large enough to hold it
+    sprite = Image.new('RGBA', (max(1, bbox[2]), max(1, bbox[3])), (255, 255, 255, 0))
+    ImageDraw.Draw(sprite).text((0, 0), text, fill=(*text_color, int(255 * opacity)), font=font)
+    entry = (sprite, bbox[2] - bbox[0], bbox[3] - bbox[1])
+    _sprite_cache.put(key, entry, sprite)
+    return entry
+
+
+def logo_sprite(watermark_img, base_size: tuple, opacity: float, key: str = None):
+    """The logo resized to at most 30% of base_size with opacity applied, or None.
+
+    watermark_img is a PIL image, or a zero-argument callable returning one; with a ``key``
+    (e.g. the logo file's hash) the result is cached and the callable is only called on a miss.
+    Callers must not modify the returned sprite.
+    """
+    max_w = int(base_size[0] * 0.3)
+    max_h = int(base_size[1] * 0.3)
+    cache_key = ('logo', key, max_w, max_h, opacity) if key else None
+    if cache_key:
+        cached = _sprite_cache.get(cache_key)
+        if cached is not None:
+            return cached[0]
+    if callable(watermark_img):
+        watermark_img = watermark_img()
+    if watermark_img is None:
+        return None
+
+    sprite = watermark_img.convert('RGBA') if watermark_img.mode != 'RGBA' else watermark_img.copy()
+    # Resize watermark if too large (max 30% of base image)
+    w_w, w_h = sprite.size
+    if w_w > max_w or w_h > max_h:
+        scale = min(max_w / w_w, max_h / w_h)
+        sprite = sprite.resize((int(w_w * scale), int(w_h * scale)), Image.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    # Apply opacity
+    sprite.putalpha(sprite.getchannel('A').point(_opacity_lut(opacity)))
+    if cache_key:
+        _sprite_cache.put(cache_key, sprite, sprite)
+    return sprite
+
+
+def watermark_sprites(base_size: tuple, watermark_text: str = None, watermark_img=None,
+                      position: str = "bottom-right", opacity: float = 0.7, font_size: int = 36,
+                      text_color: tuple = (255, 255, 255), watermark_key: str = None) -> list:
+    """The watermark pieces for a base image of base_size, as (sprite, (x, y), blend) tuples.
+
+    Each sprite is an RGBA image covering only the watermark's own box. blend is 'composite'
+    (alpha_composite, used for text) or 'paste' (paste with the sprite as mask, used for logos).
+    watermark_img and watermark_key are as for logo_sprite.
+    """
+    img_w, img_h = base_size
+    sprites = []
+
+    # Text watermark
+    if watermark_text:
+        sprite, text_w, text_h = text_sprite(watermark_text, font_size, text_color, opacity)
+        sprites.append((sprite, _anchor(position, img_w, img_h, text_w, text_h), 'composite'))
+
+    # Image watermark
+    if watermark_img is not None or watermark_key:
+        sprite = logo_sprite(watermark_img, base_size, opacity, key=watermark_key)
+        if sprite is not None:
+            sprites.append((sprite, _anchor(position, img_w, img_h, *sprite.size), 'paste'))
+
+    return sprites
+
+
+def draw_watermark(base_img: Image.Image, watermark_text: str = None, watermark_img: Image.Image = None,
+                   position: str = "bottom-right", opacity: float = 0.7, font_size: int = 36,
+                   text_color: tuple = (255, 255, 255), watermark_key: str = None) -> Image.Image:
+    """Composite a text and/or image watermark onto base_img in memory and return the result (RGBA).
+
+    Only the watermark boxes are composited; no full-size layer is allocated.
+    """
+    sprites = watermark_sprites(base_img.size, watermark_text, watermark_img, position, opacity, font_size,
+                                text_color, watermark_key=watermark_key)
+    if not sprites:
+        return base_img
+    if base_img.mode != 'RGBA':
+        base_img = base_img.convert('RGBA')
+    return draw_watermark_in_place(base_img, sprites)
+
+
+def draw_watermark_in_place(base_img: Image.Image, sprites: list) -> Image.Image:
+    """Apply watermark_sprites to an RGB/RGBA base_img in place, touching only the sprites' boxes.
+
+    Pixels outside the sprites are never copied, so a large base costs no extra full-size buffer.
+    """
+    img_w, img_h = base_img.size
+    for sprite, (pos_x, pos_y), blend in sprites:
+        box = (max(0, pos_x), max(0, pos_y), min(img_w, pos_x + sprite.width), min(img_h, pos_y + sprite.height))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            continue
+        piece = sprite.crop((box[0] - pos_x, box[1] - pos_y, box[2] - pos_x, box[3] - pos_y))
+        region = base_img.crop(box)
+        if region.mode != 'RGBA':
+            region = region.convert('RGBA')
+        if blend == 'composite':
+            region = Image.alpha_composite(region, piece)
+        else:
+            region.paste(piece, (0, 0), piece)
+        base_img.paste(region if base_img.mode == 'RGBA' else region.convert(base_img.mode), box[:2])
+    return base_img
+
+
+# Target-size search bounds: quality is searched in [TARGET_MIN_QUALITY, TARGET_MAX_QUALITY];
+# with scaling allowed, quality does not go below TARGET_SCALE_QUALITY before the image is shrunk.
+TARGET_MIN_QUALITY = 10
+TARGET_MAX_QUALITY = 95
+TARGET_SCALE_QUALITY = 50
+TARGET_MIN_SCALE = 0.1
+TARGET_SCALE_STEPS = 7
 
 
-def compress_image_to_target(media_dir: Path, image_path: str, quality: int = 75, output_format: str = "jpg"):
+def _encode(img: Image.Image, fmt: str, quality: int) -> io.BytesIO:
+    buf = io.BytesIO()
+    img.save(buf, **save_kwargs_for(fmt, quality))
+    return buf
+
+
+def search_target_size(img: Image.Image, fmt: str, target_bytes: int, allow_scale: bool = False,
+                       quality: int = 75) -> dict:
+    """Find the highest quality (then, if allowed, the largest scale) whose encoding fits target_bytes.
+
+    Every candidate is encoded into memory. Returns a dict with buffer, quality, scale,
+    met_target and iterations. When nothing fits, the smallest candidate is returned with
+    met_target False.
+    """
+    iterations = 0
+    best = None
+    smallest = None
+
+    def consider(candidate):
+        nonlocal smallest
+        if smallest is None or candidate['buffer'].getbuffer().nbytes < smallest['buffer'].getbuffer().nbytes:
+            smallest = candidate
+
+    lossy = fmt in ('jpg', 'jpeg', 'webp', 'avif')
+    floor = TARGET_SCALE_QUALITY if allow_scale else TARGET_MIN_QUALITY
+    if lossy:
+        # Binary search for the highest quality that fits
+        lo, hi = floor, TARGET_MAX_QUALITY
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            buf = _encode(img, fmt, mid)
+            iterations += 1
+            candidate = {'buffer': buf, 'quality': mid, 'scale': 1.0}
+            consider(candidate)
+            if buf.getbuffer().nbytes <= target_bytes:
+                best = candidate
+                lo = mid + 1
+            else:
+                hi = mid - 1
+    else:
+        # PNG is lossless: quality only changes the zlib level, so only scaling can reach a budget
+        buf = _encode(img, fmt, quality)
+        iterations += 1
+        candidate = {'buffer': buf, 'quality': quality, 'scale': 1.0}
+        consider(candidate)
+        if buf.getbuffer().nbytes <= target_bytes:
+            best = candidate
+
+    if best is None and allow_scale:
+        scale_quality = floor if lossy else quality
+        lo, hi = TARGET_MIN_SCALE, 1.0
+        for _ in range(TARGET_SCALE_STEPS):
+            mid = (lo + hi) / 2
+            size = (max(1, round(img.width * mid)), max(1, round(img.height * mid)))
+            buf = _encode(img.resize(size, Image.LANCZOS), fmt, scale_quality)
+            iterations += 1
+            candidate = {'buffer': buf, 'quality': scale_quality, 'scale': round(mid, 3)}
+            consider(candidate)
+            if buf.getbuffer().nbytes <= target_bytes:
+                if best is None or mid > best['scale']:
+                    best = candidate
+                lo = mid
+            else:
+                hi = mid
+
+    chosen = best or smallest
+    return dict(chosen, met_target=best is not None, iterations=iterations)
+
+
+@content_cached('compress')
+def compress_image_to_target(media_dir: Path, image_path: str, quality: int = 75, output_format: str = "jpg",
+                             target_kb: float = None, allow_scale: bool = False, profile: str = None,
+                             min_ssim: float = None):
     """Compress an image server-side.
 
+    With target_kb set, quality (and the scale, if allow_scale) is searched in memory for the
+    best result no larger than target_kb, and only that candidate is written; ``quality`` then
+    only applies to PNG output.
+
+    With output_format "auto", the encoder (format, quality, effort) is chosen by
+    encoder_search.choose_encoder on a small proxy of sampled tiles: the smallest candidate whose SSIM is at
+    least ``min_ssim``, searched with the speed/ratio ``profile``. The full image is then encoded
+    once with it, or, with target_kb, searched in the chosen format.
+
     Returns (result: dict, success: bool)
     result keys on success: original_size_kb, compressed_size_kb, saved_percent, output_name
+    plus, in target mode: target_kb, met_target, quality, scale, iterations, search_ms
+    plus, in auto mode: format, quality, auto (profile, min_ssim, met_floor, ssim, psnr,
+    candidates, iterations, search_ms)
     On failure: {"errors": [..]}
     """
     errors = []
     try:
-        img = Image.open(image_path)
+        img = open_image(image_path)
     except Exception as e:
         return {"errors": [f"Failed to open image: {e}"]}, False
 
+    auto = (output_format or "").lower() == "auto"
+    if auto:
+        # The encoder is chosen below; only an RGB image is sure to be saved without a converted copy
+        keeps_mode = img.mode == 'RGB'
+    else:
+        fmt, ext = normalize_output_format(output_format)
+        keeps_mode = fmt == 'png' or img.mode == 'RGB' or (fmt in ('webp', 'avif') and img.mode == 'RGBA')
+    try:
+        if target_kb:
+            # The search keeps the converted image and a scaled candidate of up to the same size
+            check_budget(img, 'Compression to a target size', 4 if keeps_mode else 8)
+        else:
+            check_budget(img, 'format', 0 if keeps_mode else 4)
+    except TilingError as e:
+        return {"errors": [str(e)]}, False
+
+    choice = None
+    if auto:
+        try:
+            choice = choose_encoder(img, profile=profile, min_ssim=min_ssim)
+        except Exception as e:
+            return {"errors": [f"Failed to choose an encoder: {e}"]}, False
+        fmt, ext = choice['format'], choice['extension']
+
     # Derive output name
-    stem = Path(getattr(img, 'filename', image_path)).stem
-    fmt = (output_format or "jpg").lower()
-    if fmt not in ("jpg", "jpeg", "webp", "png"):
-        fmt = "jpg"
-    ext = 'webp' if fmt == 'webp' else ('png' if fmt == 'png' else 'jpg')
-    output_name = f"app-shubraj-com-{stem}-{time.time_ns()}-compressed.{ext}"
-    output_path = media_dir / output_name
+    stem = source_stem(image_path)
+    output_name, output_path = allocate_output(media_dir, f"app-shubraj-com-{stem}-{time.time_ns()}-compressed.{ext}")
+
+    # Large images without a size target are converted strip by strip (PNG is streamed out)
+    tiled = not target_kb and should_tile(img)
 
     # Determine mode
     # Prepare image according to output format
     if fmt in ("jpg", "jpeg"):
-        img_for_save = img.convert('RGB') if img.mode != 'RGB' else img
-    elif fmt == 'webp':
-        # WebP supports alpha; keep mode
+        if img.mode == 'RGB':
+            img_for_save = img
+        else:
+            img_for_save = convert_strips(img, 'RGB') if tiled else img.convert('RGB')
+    elif tiled and fmt in ('webp', 'avif') and img.mode not in ('RGB', 'RGBA'):
+        img_for_save = convert_strips(img, png_mode_for(img))
+    elif fmt in ('webp', 'avif'):
+        # WebP and AVIF support alpha; keep mode
         img_for_save = img
     else:  # png
         img_for_save = img  # keep as-is to preserve alpha
 
     # Original size (KB)
     try:
-        original_size_kb = os.path.getsize(image_path) / 1024.0
+        original_size_kb = source_size(image_path) / 1024.0
     except Exception:
         original_size_kb = 0.0
 
-    # Save compressed
-    save_kwargs = {}
-    if fmt == 'webp':
-        save_kwargs.update({"format": "WEBP", "quality": quality, "method": 6})
-    elif fmt in ("jpg", "jpeg"):
-        save_kwargs.update({"format": "JPEG", "quality": quality, "optimize": True})
-    else:  # png
-        # PNG uses lossless compression; Pillow uses quality-like via optimize and compress_level (0-9)
-        # Map quality 10-100 to compress_level 9-0 (higher quality -> lower compression level)
-        compress_level = max(0, min(9, 9 - round((quality - 10) / 90 * 9)))
-        save_kwargs.update({"format": "PNG", "optimize": True, "compress_level": compress_level})
+    search = None
+    if target_kb:
+        if target_kb <= 0:
+            return {"errors": ["Target size must be a positive number of KB."]}, False
+        start = time.perf_counter()
+        try:
+            img_for_save.load()
+            search = search_target_size(img_for_save, fmt, int(target_kb * 1024), allow_scale=allow_scale, quality=quality)
+        except Exception as e:
+            return {"errors": [f"Failed to compress image: {e}"]}, False
+        search_ms = (time.perf_counter() - start) * 1000.0
+        try:
+            with open(output_path, 'wb') as f:
+                f.write(search['buffer'].getbuffer())
+        except Exception as e:
+            return {"errors": [f"Failed to save compressed image: {e}"]}, False
+    else:
+        # Save compressed
+        save_kwargs = choice['save_kwargs'] if choice else save_kwargs_for(fmt, quality)
 
-    try:
-        img_for_save.save(output_path, **save_kwargs)
-    except Exception as e:
-        return {"errors": [f"Failed to save compressed image: {e}"]}, False
+        try:
+            if tiled and fmt == 'png':
+                mode = png_mode_for(img_for_save)
+                with PngStripWriter(output_path, img_for_save.size, mode, save_kwargs['compress_level']) as png:
+                    for _, rows in iter_strips(img_for_save, mode):
+                        png.write(rows)
+            else:
+                img_for_save.save(output_path, **save_kwargs)
+        except Exception as e:
+            return {"errors": [f"Failed to save compressed image: {e}"]}, False
 
     compressed_size_kb = os.path.getsize(output_path) / 1024.0
     saved_percent = max(0.0, (1 - (compressed_size_kb / original_size_kb)) * 100) if original_size_kb else 0.0
+    register_output(output_name)
 
-    return ({
+    result = {
         "original_size_kb": original_size_kb,
         "compressed_size_kb": compressed_size_kb,
         "saved_percent": saved_percent,
         "output_name": output_name,
-    }, True)
-
-
+    }
+    if choice is not None:
+        result.update({
+            "format": fmt,
+            "quality": choice['quality'],
+            "auto": {k: v for k, v in choice.items() if k not in ('format', 'extension', 'quality', 'save_kwargs')},
+        })
+    if search is not None:
+        result.update({
+            "target_kb": target_kb,
+            "met_target": search['met_target'],
+            "quality": search['quality'],
+            "scale": search['scale'],
+            "iterations": search['iterations'],
+            "search_ms": search_ms,
+        })
+    return (result, True)
+
+
+@content_cached('resize')
 def resize_or_crop_image(media_dir: Path, image_path: str, width: int, height: int, mode: str = "fit", output_format: str = "jpg", quality: int = 85):
     """Resize or crop image.
 
@@ -84,49 +642,32 @@ def resize_or_crop_image(media_dir: Path, image_path: str, width: int, height: i
     """
     errors = []
     try:
-        img = Image.open(image_path)
+        img = open_image(image_path)
     except Exception as e:
         return {"errors": [f"Failed to open image: {e}"]}, False
 
     if width <= 0 or height <= 0:
         return {"errors": ["Width and height must be positive integers."]}, False
 
-    fmt = (output_format or "jpg").lower()
-    if fmt not in ("jpg", "jpeg", "webp", "png"):
-        fmt = "jpg"
+    fmt, ext = normalize_output_format(output_format)
 
-    # Compute resize
-    src_w, src_h = img.size
-    if mode == "fill":
-        # cover: scale to fill then center crop
-        scale = max(width / src_w, height / src_h)
-        new_w, new_h = int(round(src_w * scale)), int(round(src_h * scale))
-        img_resized = img.resize((new_w, new_h), Image.LANCZOS)
-        left = max(0, (new_w - width) // 2)
-        top = max(0, (new_h - height) // 2)
-        img_out = img_resized.crop((left, top, left + width, top + height))
-    else:
-        # fit: contain within box, preserve aspect; pad not applied, just smaller side
-        scale = min(width / src_w, height / src_h)
-        new_w, new_h = int(round(src_w * scale)), int(round(src_h * scale))
-        img_out = img.resize((new_w, new_h), Image.LANCZOS)
+    src_size = img.size
+    draft_for_size(img, width, height, "fill" if mode == "fill" else "fit")
+    try:
+        # Checked on the reduced decode the draft set up; the output is one RGBA copy of width x height
+        check_budget(img, 'Resizing', 4 * width * height / (img.width * img.height))
+    except TilingError as e:
+        return {"errors": [str(e)]}, False
+    img_out = fit_image(img, width, height, mode, src_size=src_size)
 
     # Build output
-    stem = Path(getattr(img, 'filename', image_path)).stem
-    ext = 'webp' if fmt == 'webp' else ('png' if fmt == 'png' else 'jpg')
-    output_name = f"app-shubraj-com-{stem}-{time.time_ns()}-{width}x{height}-{mode}.{ext}"
-    output_path = media_dir / output_name
+    stem = source_stem(image_path)
+    output_name, output_path = allocate_output(media_dir, f"app-shubraj-com-{stem}-{time.time_ns()}-{width}x{height}-{mode}.{ext}")
 
     # Prepare save
-    save_kwargs = {}
-    if fmt == 'webp':
-        save_kwargs.update({"format": "WEBP", "quality": quality, "method": 6})
-    elif fmt in ("jpg", "jpeg"):
+    if fmt in ("jpg", "jpeg"):
         img_out = img_out.convert('RGB') if img_out.mode != 'RGB' else img_out
-        save_kwargs.update({"format": "JPEG", "quality": quality, "optimize": True})
-    else:
-        compress_level = max(0, min(9, 9 - round((quality - 10) / 90 * 9)))
-        save_kwargs.update({"format": "PNG", "optimize": True, "compress_level": compress_level})
+    save_kwargs = save_kwargs_for(fmt, quality)
 
     try:
         img_out.save(output_path, **save_kwargs)
@@ -137,6 +678,7 @@ def resize_or_crop_image(media_dir: Path, image_path: str, width: int, height: i
         out_kb = os.path.getsize(output_path) / 1024.0
     except Exception:
         out_kb = 0.0
+    register_output(output_name)
 
     return ({
         "output_name": output_name,
@@ -148,39 +690,35 @@ def resize_or_crop_image(media_dir: Path, image_path: str, width: int, height: i
     }, True)
 
 
-def remove_background_whiteish(media_dir: Path, image_path: str, tolerance: int = 20, smooth: bool = True):
+@content_cached('bg-whiteish')
+def remove_background_whiteish(media_dir: Path, image_path: str, tolerance: int = 20, smooth: bool = True,
+                               border_only: bool = False):
     """Remove near-white background by making those pixels transparent.
 
     tolerance: 0-255; higher removes more background.
+    border_only: only remove near-white regions connected to the image border.
     Returns (result: dict, success: bool)
     """
     try:
-        img = Image.open(image_path).convert('RGBA')
+        img = open_image(image_path)
+        # Large results are streamed to PNG strip by strip; only the border-only flood fill then
+        # keeps a full-size (1 byte/pixel) mask. Smaller ones are built as one RGBA array.
+        tiled = should_tile(img)
+        check_budget(img, 'bg_remove', (1 if border_only else 0) + (0 if tiled else 4))
+        img.load()
+    except TilingError as e:
+        return {"errors": [str(e)]}, False
     except Exception as e:
         return {"errors": [f"Failed to open image: {e}"]}, False
 
-    arr = np.array(img)
-    rgb = arr[:, :, :3]
-    alpha = arr[:, :, 3]
-
-    # Threshold for near-white
-    thr = max(0, min(255, 255 - int(tolerance or 0)))
-    mask_bg = (rgb[:, :, 0] >= thr) & (rgb[:, :, 1] >= thr) & (rgb[:, :, 2] >= thr)
-
-    if smooth:
-        kernel = np.ones((3, 3), np.uint8)
-        mask_bg = cv2.morphologyEx(mask_bg.astype(np.uint8) * 255, cv2.MORPH_OPEN, kernel)
-        mask_bg = cv2.GaussianBlur(mask_bg, (3, 3), 0) > 127
-
-    # Set transparent for background
-    alpha[mask_bg] = 0
-    arr[:, :, 3] = alpha
-
-    out_img = Image.fromarray(arr)
-    name = f"app-shubraj-com-bgrm-{time.time_ns()}.png"
-    out_path = media_dir / name
+    name, out_path = allocate_output(media_dir, f"app-shubraj-com-bgrm-{time.time_ns()}.png")
     try:
-        out_img.save(out_path, format='PNG')
+        if tiled:
+            with PngStripWriter(out_path, img.size, 'RGBA') as png:
+                for _, rows in iter_whiteish_strips(img, tolerance, smooth, border_only=border_only):
+                    png.write(rows)
+        else:
+            whiteish_alpha(img, tolerance, smooth, border_only=border_only).save(out_path, format='PNG')
     except Exception as e:
         return {"errors": [f"Failed to save result: {e}"]}, False
 
@@ -188,22 +726,34 @@ def remove_background_whiteish(media_dir: Path, image_path: str, tolerance: int
         out_kb = os.path.getsize(out_path) / 1024.0
     except Exception:
         out_kb = 0.0
+    register_output(name)
 
     return ({"output_name": name, "size_kb": out_kb}, True)
 
 
-def remove_background_ai(media_dir: Path, image_path: str):
-    """High-quality background removal using rembg (U2Net). Returns PNG with alpha."""
+def remove_background_ai(media_dir: Path, image_path: str, model_name: str = None):
+    """High-quality background removal using rembg (U2Net). Returns PNG with alpha.
+
+    The ONNX session is shared per process (see model_sessions); model_name defaults to settings.REMBG_MODEL.
+    """
+    # rembg pulls in onnxruntime/pymatting; only load it when AI removal is requested
+    from .model_sessions import remove_background
+
+    try:
+        # rembg decodes the whole image and keeps RGBA copies and a mask alongside it
+        check_budget(open_image(image_path), 'AI background removal', 9)
+    except TilingError as e:
+        return {"errors": [str(e)]}, False
+    except Exception as e:
+        return {"errors": [f"Failed to open image: {e}"]}, False
 
     try:
-        with open(image_path, 'rb') as f:
-            inp = f.read()
-        out_bytes = remove(inp)
+        inp = read_source_bytes(image_path)
+        out_bytes, model_used, inference_s = remove_background(inp, model_name)
     except Exception as e:
         return {"errors": [f"AI removal failed: {e}"]}, False
 
-    name = f"app-shubraj-com-bgrm-ai-{time.time_ns()}.png"
-    out_path = media_dir / name
+    name, out_path = allocate_output(media_dir, f"app-shubraj-com-bgrm-ai-{time.time_ns()}.png")
     try:
         with open(out_path, 'wb') as f:
             f.write(out_bytes)
@@ -214,83 +764,71 @@ def remove_background_ai(media_dir: Path, image_path: str):
         out_kb = os.path.getsize(out_path) / 1024.0
     except Exception:
         out_kb = 0.0
+    register_output(name)
 
-    return ({"output_name": name, "size_kb": out_kb}, True)
-
-
-def extract_exif(image_path: str):
-    """Extract EXIF metadata as a dict of tag -> value (strings where possible)."""
-    try:
-        img = Image.open(image_path)
-        exif = getattr(img, "_getexif", lambda: None)()
-        if not exif:
-            return ({"exif": {}}, True)
-        # Best-effort stringify with binary handling
-        out = {}
-        for tag, value in exif.items():
-            try:
-                name = TAGS.get(tag, str(tag))
-            except Exception:
-                name = str(tag)
-            try:
-                if isinstance(value, bytes):
-                    if name == 'ComponentsConfiguration' and len(value) == 4:
-                        comp_map = {0: 'None', 1: 'Y', 2: 'Cb', 3: 'Cr', 4: 'R', 5: 'G', 6: 'B'}
-                        out[name] = ' '.join(comp_map.get(b, str(b)) for b in value)
-                    elif name in ('ExifVersion', 'FlashPixVersion') and len(value) == 4:
-                        # Versions are ASCII digits like b'0100' → '1.00'
-                        try:
-                            s = value.decode('ascii', errors='ignore')
-                            if s.isdigit() and len(s) == 4:
-                                out[name] = f"{s[0]}.{s[1:]}"
-                            else:
-                                out[name] = s or f"bytes[{len(value)}]"
-                        except Exception:
-                            out[name] = f"bytes[{len(value)}]: {value.hex()}"
-                    else:
-                        # If all printable ASCII, show as string; otherwise compact hex
-                        if all(32 <= b < 127 for b in value):
-                            out[name] = value.decode('ascii', errors='replace')
-                        else:
-                            out[name] = f"bytes[{len(value)}]: {value.hex()}"
-                elif isinstance(value, (list, tuple)):
-                    out[name] = ', '.join(str(v) for v in value)
-                else:
-                    out[name] = str(value)
-            except Exception:
-                out[name] = repr(value)
-        return ({"exif": out}, True)
-    except Exception as e:
-        return ({"errors": [f"Failed to read EXIF: {e}"]}, False)
+    return ({"output_name": name, "size_kb": out_kb, "model": model_used, "inference_ms": inference_s * 1000.0}, True)
 
 
+@content_cached('noexif')
 def remove_exif(media_dir: Path, image_path: str):
-    """Remove EXIF metadata and save a new image (prefer PNG to avoid residual metadata)."""
+    """Remove EXIF and other metadata and save a new image.
+
+    JPEG, PNG and WebP keep their format: only the metadata segments are dropped from the
+    container (see metadata.strip_metadata), so the image data is copied byte for byte and
+    nothing is decoded. Other formats are re-encoded as PNG without metadata.
+    Returns (result: dict, success: bool); result has output_name, format, removed (segment
+    names), reencoded and size_kb.
+    """
     try:
-        img = Image.open(image_path)
-        stem = Path(image_path).stem
-        out_name = f"app-shubraj-com-noexif-{time.time_ns()}.png"
-        out_path = media_dir / out_name
-        if piexif and img.format == 'JPEG':
-            try:
-                piexif.remove(image_path)
-                # After removal, reopen and save as PNG to be consistent
-                img2 = Image.open(image_path)
-                img2.save(out_path, format='PNG')
-                return ({"output_name": out_name}, True)
-            except Exception:
-                pass
-        # Generic approach: drop info/exif and save as PNG
-        data = list(img.getdata())
-        mode = img.mode
-        img_clean = Image.new(mode, img.size)
-        img_clean.putdata(data)
-        img_clean.save(out_path, format='PNG')
-        return ({"output_name": out_name}, True)
+        with open_binary(image_path) as src:
+            fmt = detect_format(src.read(12))
+            src.seek(0)
+            if fmt:
+                out_name, out_path = allocate_output(media_dir, f"app-shubraj-com-noexif-{time.time_ns()}.{METADATA_EXTENSIONS[fmt]}")
+                try:
+                    with open(out_path, 'wb') as dst:
+                        info = strip_metadata(src, dst)
+                    register_output(out_name)
+                    return ({
+                        "output_name": out_name,
+                        "format": fmt,
+                        "removed": info["removed"],
+                        "reencoded": False,
+                        "size_kb": os.path.getsize(out_path) / 1024.0,
+                    }, True)
+                except MetadataError:
+                    # Damaged container: fall back to decoding whatever Pillow can read
+                    os.unlink(out_path)
+
+        img = open_image(image_path)
+        check_budget(img, 'exif_strip')
+        out_name, out_path = allocate_output(media_dir, f"app-shubraj-com-noexif-{time.time_ns()}.png")
+        if should_tile(img):
+            # Stream the pixels into a fresh PNG; the writer emits no metadata chunks at all
+            mode = png_mode_for(img)
+            with PngStripWriter(out_path, img.size, mode) as png:
+                for _, rows in iter_strips(img, mode):
+                    png.write(rows)
+        else:
+            # Generic approach: drop info/exif and save as PNG (PNG only writes EXIF passed to save())
+            img.load()
+            img.info = {k: v for k, v in img.info.items() if k == 'transparency'}
+            img.save(out_path, format='PNG')
+        register_output(out_name)
+        return ({
+            "output_name": out_name,
+            "format": "png",
+            "removed": [],
+            "reencoded": True,
+            "size_kb": os.path.getsize(out_path) / 1024.0,
+        }, True)
+    except TilingError as e:
+        return ({"errors": [str(e)]}, False)
     except Exception as e:
         return ({"errors": [f"Failed to remove EXIF: {e}"]}, False)
 
 
+@content_cached('watermark', file_params=('image_path', 'watermark_image_path'))
 def add_watermark(media_dir: Path, image_path: str, watermark_text: str = None, watermark_image_path: str = None,
                  position: str = "bottom-right", opacity: float = 0.7, font_size: int = 36,
                  text_color: tuple = (255, 255, 255), output_format: str = "jpg", quality: int = 85):
@@ -308,155 +846,58 @@ def add_watermark(media_dir: Path, image_path: str, watermark_text: str = None,
         return {"errors": ["Either watermark text or watermark image must be provided."]}, False
     
     try:
-        base_img = Image.open(image_path)
+        base_img = open_image(image_path)
+        jpg_out = output_format.lower() not in ('png', 'webp')
+        keeps_mode = base_img.mode == 'RGB' or (base_img.mode == 'RGBA' and not jpg_out)
+        check_budget(base_img, 'watermark', 0 if keeps_mode else 4)
+        # Mode conversions of large images are done strip by strip
+        tiled = should_tile(base_img)
         # Convert to RGB if needed (for JPG output)
         if output_format.lower() in ('jpg', 'jpeg') and base_img.mode in ('RGBA', 'LA', 'P'):
-            # Create white background
-            bg = Image.new('RGB', base_img.size, (255, 255, 255))
-            if base_img.mode == 'P':
-                base_img = base_img.convert('RGBA')
-            bg.paste(base_img, mask=base_img.split()[-1] if base_img.mode in ('RGBA', 'LA') else None)
-            base_img = bg
-        elif base_img.mode != 'RGB' and output_format.lower() not in ('png', 'webp'):
-            base_img = base_img.convert('RGB')
+            base_img = flatten_on_white_strips(base_img) if tiled else flatten_on_white(base_img)
+        elif base_img.mode != 'RGB' and jpg_out:
+            base_img = convert_strips(base_img, 'RGB') if tiled else base_img.convert('RGB')
+        elif tiled and base_img.mode not in ('RGB', 'RGBA'):
+            base_img = convert_strips(base_img, 'RGBA')
+    except TilingError as e:
+        return {"errors": [str(e)]}, False
     except Exception as e:
         return {"errors": [f"Failed to open base image: {e}"]}, False
     
     try:
-        from PIL import ImageDraw, ImageFont
-        import os
-        
-        # Calculate position
-        img_w, img_h = base_img.size
-        positions = {
-            'top-left': (10, 10),
-            'top-right': (img_w - 100, 10),
-            'bottom-left': (10, img_h - 50),
-            'bottom-right': (img_w - 100, img_h - 50),
-            'center': (img_w // 2 - 50, img_h // 2 - 25),
-        }
-        pos_x, pos_y = positions.get(position.lower(), positions['bottom-right'])
-        
-        # Add text watermark
-        if watermark_text:
-            # Create a transparent layer for the watermark
-            watermark_layer = Image.new('RGBA', base_img.size, (255, 255, 255, 0))
-            draw = ImageDraw.Draw(watermark_layer)
-            
-            # Try to load a font, fallback to default
-            try:
-                # Try to use a larger default font
-                font_paths = [
-                    '/System/Library/Fonts/Supplemental/Arial.ttf',
-                    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
-                    '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
-                ]
-                font = None
-                for fp in font_paths:
-                    if os.path.exists(fp):
-                        try:
-                            font = ImageFont.truetype(fp, font_size)
-                            break
-                        except:
-                            continue
-                if not font:
-                    font = ImageFont.load_default()
-            except:
-                font = ImageFont.load_default()
-            
-            # Calculate text bounding box
-            bbox = draw.textbbox((0, 0), watermark_text, font=font)
-            text_w = bbox[2] - bbox[0]
-            text_h = bbox[3] - bbox[1]
-            
-            # Adjust position based on text size
-            if 'right' in position.lower():
-                pos_x = img_w - text_w - 10
-            elif 'center' in position.lower():
-                pos_x = (img_w - text_w) // 2
-            else:
-                pos_x = 10
-            
-            if 'bottom' in position.lower():
-                pos_y = img_h - text_h - 10
-            elif 'center' in position.lower():
-                pos_y = (img_h - text_h) // 2
-            else:
-                pos_y = 10
-            
-            # Draw text with semi-transparency
-            draw.text((pos_x, pos_y), watermark_text, fill=(*text_color, int(255 * opacity)), font=font)
-            
-            # Composite watermark onto base image
-            if base_img.mode == 'RGB':
-                base_img = base_img.convert('RGBA')
-            base_img = Image.alpha_composite(base_img, watermark_layer)
-        
-        # Add image watermark
+        load_logo = None
+        watermark_key = None
         if watermark_image_path:
-            try:
-                watermark_img = Image.open(watermark_image_path)
-                if watermark_img.mode != 'RGBA':
-                    watermark_img = watermark_img.convert('RGBA')
-                
-                # Resize watermark if too large (max 30% of base image)
-                max_w = int(img_w * 0.3)
-                max_h = int(img_h * 0.3)
-                w_w, w_h = watermark_img.size
-                if w_w > max_w or w_h > max_h:
-                    scale = min(max_w / w_w, max_h / w_h)
-                    new_w = int(w_w * scale)
-                    new_h = int(w_h * scale)
-                    watermark_img = watermark_img.resize((new_w, new_h), Image.LANCZOS)
-                
-                # Apply opacity
-                alpha = watermark_img.split()[3]
-                alpha = alpha.point(lambda p: int(p * opacity))
-                watermark_img.putalpha(alpha)
-                
-                # Calculate position for image watermark
-                w_w, w_h = watermark_img.size
-                if 'right' in position.lower():
-                    pos_x = img_w - w_w - 10
-                elif 'center' in position.lower():
-                    pos_x = (img_w - w_w) // 2
-                else:
-                    pos_x = 10
-                
-                if 'bottom' in position.lower():
-                    pos_y = img_h - w_h - 10
-                elif 'center' in position.lower():
-                    pos_y = (img_h - w_h) // 2
-                else:
-                    pos_y = 10
-                
-                # Composite watermark image
-                if base_img.mode != 'RGBA':
-                    base_img = base_img.convert('RGBA')
-                base_img.paste(watermark_img, (pos_x, pos_y), watermark_img)
-            except Exception as e:
-                errors.append(f"Failed to add image watermark: {e}")
+            def load_logo():
+                try:
+                    logo = open_image(watermark_image_path)
+                    # The logo is shrunk to at most 30% of the base image; decode it no larger than needed
+                    draft_for_size(logo, int(base_img.width * 0.3), int(base_img.height * 0.3))
+                    logo.load()
+                    return logo
+                except Exception as e:
+                    errors.append(f"Failed to add image watermark: {e}")
+                    return None
+
+            # Logo sprites are cached by file content, so a repeated logo is not decoded again
+            watermark_key = hash_file(watermark_image_path)
+
+        # Composite in place: only the watermark boxes are copied, whatever the image size
+        if base_img.mode not in ('RGB', 'RGBA'):
+            base_img = base_img.convert('RGBA')
+        base_img = draw_watermark_in_place(base_img, watermark_sprites(
+            base_img.size, watermark_text, load_logo, position=position, opacity=opacity,
+            font_size=font_size, text_color=text_color, watermark_key=watermark_key))
         
         # Save result
-        stem = Path(getattr(base_img, 'filename', image_path)).stem
-        fmt = (output_format or "jpg").lower()
-        if fmt not in ("jpg", "jpeg", "webp", "png"):
-            fmt = "jpg"
-        ext = 'webp' if fmt == 'webp' else ('png' if fmt == 'png' else 'jpg')
-        output_name = f"app-shubraj-com-{stem}-{time.time_ns()}-watermarked.{ext}"
-        output_path = media_dir / output_name
+        stem = source_stem(image_path)
+        fmt, ext = normalize_output_format(output_format)
+        output_name, output_path = allocate_output(media_dir, f"app-shubraj-com-{stem}-{time.time_ns()}-watermarked.{ext}")
         
         # Prepare save
-        save_kwargs = {}
-        if fmt == 'webp':
-            save_kwargs.update({"format": "WEBP", "quality": quality, "method": 6})
-        elif fmt in ("jpg", "jpeg"):
-            if base_img.mode != 'RGB':
-                base_img = base_img.convert('RGB')
-            save_kwargs.update({"format": "JPEG", "quality": quality, "optimize": True})
-        else:
-            compress_level = max(0, min(9, 9 - round((quality - 10) / 90 * 9)))
-            save_kwargs.update({"format": "PNG", "optimize": True, "compress_level": compress_level})
+        if fmt in ("jpg", "jpeg") and base_img.mode != 'RGB':
+            base_img = base_img.convert('RGB')
+        save_kwargs = save_kwargs_for(fmt, quality)
         
         try:
             base_img.save(output_path, **save_kwargs)
@@ -467,6 +908,7 @@ def add_watermark(media_dir: Path, image_path: str, watermark_text: str = None,
             out_kb = os.path.getsize(output_path) / 1024.0
         except Exception:
             out_kb = 0.0
+        register_output(output_name)
         
         if errors:
             return ({"output_name": output_name, "size_kb": out_kb, "warnings": errors}, True)
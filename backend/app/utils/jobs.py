@@ -0,0 +1,92 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY = 'job_{}'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, int(getattr(settings, 'JOB_WORKERS', 2)))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='app-job')
+    return _executor
+
+
+def _save(state: Dict):
+    state['updated_at'] = time.time()
+    cache.set(JOB_KEY.format(state['id']), state, timeout=getattr(settings, 'JOB_RESULT_TTL', 3600))
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """Return the stored job state, or None if unknown/expired."""
+    return cache.get(JOB_KEY.format(job_id))
+
+
+def submit_job(kind: str, func: Callable, *args, cleanup: Iterable[str] = (), **kwargs) -> str:
+    """Queue ``func(*args, progress=..., **kwargs)`` on the local worker pool and return the job id.
+
+    ``func`` follows the utils convention and returns (result: dict, success: bool).
+    Its state (queued/running/done/failed, progress 0-100, result or errors) is kept
+    in the cache so any worker process can answer a status poll.
+    Paths (files or directories) in ``cleanup`` are deleted once the job finishes.
+    """
+    job_id = uuid.uuid4().hex
+    state = {
+        'id': job_id,
+        'kind': kind,
+        'status': 'queued',
+        'progress': 0,
+        'created_at': time.time(),
+    }
+    _save(state)
+    _get_executor().submit(_run, state, func, args, kwargs, list(cleanup))
+    return job_id
+
+
+def _run(state: Dict, func: Callable, args, kwargs, cleanup):
+    state.update({'status': 'running', 'started_at': time.time()})
+    _save(state)
+
+    def progress(done: int, total: int):
+        if total:
+            state['progress'] = int(min(done, total) * 100 / total)
+            _save(state)
+
+    try:
+        result, success = func(*args, progress=progress, **kwargs)
+    except Exception as e:
+        logger.exception("Job %s (%s) crashed", state['id'], state['kind'])
+        result, success = {'errors': [f'Processing failed: {e}']}, False
+    finally:
+        for path in cleanup:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    state['finished_at'] = time.time()
+    state['elapsed_seconds'] = round(state['finished_at'] - state['started_at'], 3)
+    if success:
+        state.update({'status': 'done', 'progress': 100, 'result': result})
+    else:
+        state.update({'status': 'failed', 'errors': result.get('errors', ['Processing failed.'])})
+    _save(state)
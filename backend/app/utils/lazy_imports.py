@@ -0,0 +1,75 @@
+import importlib
+import sys
+import threading
+import time
+from typing import Dict
+
+
+# Modules that are expensive to import (ML/CV stacks and the utils built on them).
+# Views reach these through LazyCallable so worker boot does not pay for them.
+HEAVY_MODULES = [
+    'app.utils.image_tools',
+    'app.utils.dv_tools',
+    'app.utils.qr_tools',
+    'app.utils.pdf_tools',
+    'rembg',
+    'onnxruntime',
+    'cv2',
+    'numpy',
+    'pdf2image',
+    'qrcode',
+    'barcode',
+]
+
+_import_lock = threading.Lock()
+_import_times: Dict[str, float] = {}
+
+
+def load_module(module_name: str):
+    """Import a module on first use and record how long the import took (seconds)."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with _import_lock:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            return module
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        _import_times[module_name] = time.perf_counter() - start
+    return module
+
+
+def import_times() -> Dict[str, float]:
+    """Return the import cost of every module loaded through load_module in this process."""
+    return dict(_import_times)
+
+
+class LazyCallable:
+    """Stand-in for a function defined in a heavy module.
+
+    The module is imported on the first call, so only the views that actually
+    use rembg/OpenCV/pdf2image pay for loading them.
+    """
+
+    def __init__(self, module_name: str, attr: str):
+        self.module_name = module_name
+        self.attr = attr
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            self._target = getattr(load_module(self.module_name), self.attr)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        state = 'loaded' if self._target is not None else 'not loaded'
+        return f"<LazyCallable {self.module_name}.{self.attr} ({state})>"
+
+
+def lazy_callable(module_name: str, attr: str) -> LazyCallable:
+    """Return a proxy that imports ``module_name`` and calls ``attr`` on first use."""
+    return LazyCallable(module_name, attr)
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Generated files live under MEDIA_ROOT/out/<aa>/<bb>/ so no directory grows without bound
+OUTPUT_ROOT = 'out'
+# Flat files written to MEDIA_ROOT before sharding was introduced
+LEGACY_PREFIX = 'app-shubraj-com-'
+EXPIRY_KEY = 'media:expiry'
+
+
+def allocate_output(media_dir: Path, filename: str) -> Tuple[str, Path]:
+    """Reserve a sharded location for a generated file.
+
+    Returns (output_name relative to media_dir, absolute path). The shard directory is
+    created; nothing is registered until register_output is called after a successful write.
+    """
+    digest = hashlib.md5(filename.encode(), usedforsecurity=False).hexdigest()
+    output_name = f"{OUTPUT_ROOT}/{digest[:2]}/{digest[2:4]}/{filename}"
+    output_path = Path(media_dir) / output_name
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    return output_name, output_path
+
+
+def _registry():
+    """Redis connection holding output expiry times, or None when unavailable."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+def default_ttl() -> int:
+    return int(getattr(settings, 'MEDIA_OUTPUT_TTL', 60 * 60 * 24))
+
+
+def register_output(output_name: str, ttl: Optional[int] = None) -> bool:
+    """Record a generated file with its expiry time (now + ttl).
+
+    Re-registering an existing file extends its lifetime. Returns False when the registry is
+    unreachable; the sweeper then falls back to the file's mtime and MEDIA_OUTPUT_TTL.
+    """
+    conn = _registry()
+    if conn is None:
+        return False
+    try:
+        conn.zadd(EXPIRY_KEY, {output_name: time.time() + (ttl or default_ttl())})
+        return True
+    except Exception as e:
+        logger.warning("Could not register media output %s: %s", output_name, e)
+        return False
+
+
+def _candidate_files(media_dir: Path):
+    """Yield generated files: the sharded output tree plus legacy flat outputs."""
+    root = media_dir / OUTPUT_ROOT
+    if root.is_dir():
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                yield Path(dirpath) / name
+    if media_dir.is_dir():
+        for entry in os.scandir(media_dir):
+            if entry.is_file() and entry.name.startswith(LEGACY_PREFIX):
+                yield Path(entry.path)
+
+
+def _remove(path: Path, dry_run: bool) -> int:
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return 0
+    if not dry_run:
+        try:
+            path.unlink()
+        except OSError:
+            return 0
+    return size
+
+
+def _prune_empty_dirs(root: Path):
+    if not root.is_dir():
+        return
+    for dirpath, _dirnames, _filenames in os.walk(root, topdown=False):
+        if Path(dirpath) != root and not os.listdir(dirpath):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+
+def sweep(media_dir: Optional[Path] = None, dry_run: bool = False, now: Optional[float] = None) -> Dict:
+    """Delete generated files past their TTL and report disk usage.
+
+    Registered files expire at their recorded time; unregistered ones (registry down at
+    write time, or legacy outputs) expire MEDIA_OUTPUT_TTL after their mtime.
+    """
+    media_dir = Path(media_dir or settings.MEDIA_ROOT)
+    now = now or time.time()
+    report = {
+        'deleted_files': 0,
+        'reclaimed_bytes': 0,
+        'remaining_files': 0,
+        'remaining_bytes': 0,
+        'registry_available': False,
+        'dry_run': dry_run,
+    }
+
+    registered = {}
+    conn = _registry()
+    if conn is not None:
+        try:
+            registered = {
+                (m.decode() if isinstance(m, bytes) else m): score
+                for m, score in conn.zrange(EXPIRY_KEY, 0, -1, withscores=True)
+            }
+            report['registry_available'] = True
+        except Exception as e:
+            logger.warning("Media registry unavailable, sweeping by mtime only: %s", e)
+
+    ttl = default_ttl()
+    expired_members = []
+    for path in _candidate_files(media_dir):
+        output_name = path.relative_to(media_dir).as_posix()
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        expires_at = registered.get(output_name, stat.st_mtime + ttl)
+        if expires_at <= now:
+            reclaimed = _remove(path, dry_run)
+            report['deleted_files'] += 1
+            report['reclaimed_bytes'] += reclaimed
+            if output_name in registered:
+                expired_members.append(output_name)
+        else:
+            report['remaining_files'] += 1
+            report['remaining_bytes'] += stat.st_size
+
+    # Drop registry entries whose files were removed, plus entries for files already gone
+    if conn is not None and report['registry_available'] and not dry_run:
+        stale = [m for m, score in registered.items() if score <= now and m not in expired_members]
+        members = expired_members + stale
+        if members:
+            try:
+                conn.zrem(EXPIRY_KEY, *members)
+            except Exception:
+                pass
+
+    if not dry_run:
+        _prune_empty_dirs(media_dir / OUTPUT_ROOT)
+
+    try:
+        usage = os.statvfs(media_dir)
+        report['volume_free_bytes'] = usage.f_bavail * usage.f_frsize
+        report['volume_total_bytes'] = usage.f_blocks * usage.f_frsize
+    except (OSError, AttributeError):
+        pass
+    return report
@@ -0,0 +1,329 @@
+import os
+import struct
+from typing import BinaryIO, Dict, List, Optional
+
+from PIL import Image
+from PIL.ExifTags import GPSTAGS, TAGS
+
+from .uploads import Source, open_binary, source_name
+
+# Container-level metadata removal: segments/chunks are copied or skipped by their headers,
+# so the compressed image data is passed through byte for byte and nothing is decoded.
+
+# Output extension per detected format
+EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'webp': 'webp'}
+
+# JPEG APPn segments that carry metadata: APP1 (EXIF, XMP) and APP13 (Photoshop IRB / IPTC).
+# APP0 (JFIF), APP2 (ICC profile) and APP14 (Adobe colour transform) affect decoding and are kept.
+JPEG_STRIP_MARKERS = (0xE1, 0xED)
+# PNG textual and EXIF chunks; colour chunks (iCCP, gAMA, cHRM, sRGB) are kept
+PNG_STRIP_CHUNKS = (b'tEXt', b'iTXt', b'zTXt', b'eXIf')
+# WebP metadata chunks and the VP8X feature flags announcing them
+WEBP_STRIP_CHUNKS = (b'EXIF', b'XMP ')
+VP8X_XMP_FLAG = 0x04
+VP8X_EXIF_FLAG = 0x08
+
+COPY_BUFFER = 1024 * 1024
+
+# EXIF is only looked for among the segments in this many leading bytes
+EXIF_SCAN_LIMIT = 4 * 1024 * 1024
+# Binary tag values (MakerNote, PrintIM, ...) are rendered as at most this many bytes of hex
+EXIF_BLOB_PREVIEW = 64
+# Pointer tags to sub-IFDs; their contents are listed instead of their offsets
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+INTEROP_IFD_POINTER = 0xA005
+
+
+class MetadataError(ValueError):
+    """The file is not a well-formed JPEG, PNG or WebP container."""
+
+
+def detect_format(head: bytes) -> Optional[str]:
+    """'jpeg', 'png' or 'webp' from the first 12 bytes of a file, else None."""
+    if head[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _read_exact(src: BinaryIO, n: int) -> bytes:
+    data = src.read(n)
+    if len(data) != n:
+        raise MetadataError("Unexpected end of file")
+    return data
+
+
+def _copy(src: BinaryIO, dst: BinaryIO, n: int):
+    """Copy exactly n bytes in bounded pieces."""
+    while n > 0:
+        data = src.read(min(n, COPY_BUFFER))
+        if not data:
+            raise MetadataError("Unexpected end of file")
+        dst.write(data)
+        n -= len(data)
+
+
+def _copy_rest(src: BinaryIO, dst: BinaryIO):
+    for data in iter(lambda: src.read(COPY_BUFFER), b''):
+        dst.write(data)
+
+
+def _jpeg_segment_name(marker: int, payload: bytes) -> str:
+    if marker == 0xE1:
+        if payload.startswith(b'Exif\x00'):
+            return 'EXIF'
+        if payload.startswith(b'http://ns.adobe.com/'):
+            return 'XMP'
+        return 'APP1'
+    return 'IPTC' if payload.startswith(b'Photoshop 3.0') else 'APP13'
+
+
+def strip_jpeg(src: BinaryIO, dst: BinaryIO) -> List[str]:
+    """Copy a JPEG without its APP1/APP13 segments; everything from the first SOS on is copied as is."""
+    if _read_exact(src, 2) != b'\xff\xd8':
+        raise MetadataError("Not a JPEG file")
+    dst.write(b'\xff\xd8')
+    removed = []
+    while True:
+        byte = _read_exact(src, 1)
+        if byte != b'\xff':
+            raise MetadataError("Malformed JPEG segment")
+        marker = _read_exact(src, 1)[0]
+        while marker == 0xFF:  # fill bytes
+            marker = _read_exact(src, 1)[0]
+        if marker == 0xD9 or marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # EOI, TEM and RSTn have no length field
+            dst.write(bytes((0xFF, marker)))
+            if marker == 0xD9:
+                break
+            continue
+        length_bytes = _read_exact(src, 2)
+        length = struct.unpack('>H', length_bytes)[0]
+        if length < 2:
+            raise MetadataError("Malformed JPEG segment length")
+        if marker in JPEG_STRIP_MARKERS:
+            removed.append(_jpeg_segment_name(marker, _read_exact(src, length - 2)))
+            continue
+        dst.write(bytes((0xFF, marker)) + length_bytes)
+        _copy(src, dst, length - 2)
+        if marker == 0xDA:
+            # Start of scan: the entropy-coded data and the rest of the file follow unchanged
+            break
+    _copy_rest(src, dst)
+    return removed
+
+
+def strip_png(src: BinaryIO, dst: BinaryIO) -> List[str]:
+    """Copy a PNG without its tEXt/iTXt/zTXt/eXIf chunks."""
+    signature = _read_exact(src, 8)
+    if detect_format(signature) != 'png':
+        raise MetadataError("Not a PNG file")
+    dst.write(signature)
+    removed = []
+    while True:
+        header = src.read(8)
+        if not header:
+            break
+        if len(header) != 8:
+            raise MetadataError("Unexpected end of file")
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type in PNG_STRIP_CHUNKS:
+            _read_exact(src, length + 4)  # data + CRC
+            removed.append(chunk_type.decode('ascii'))
+            continue
+        dst.write(header)
+        _copy(src, dst, length + 4)
+        if chunk_type == b'IEND':
+            break
+    return removed
+
+
+def strip_webp(src: BinaryIO, dst: BinaryIO) -> List[str]:
+    """Copy a WebP without its EXIF/XMP chunks, clearing their VP8X flags and fixing the RIFF size.
+
+    The chunk table is read first (the RIFF size precedes the chunks), so src must be seekable.
+    """
+    header = _read_exact(src, 12)
+    if detect_format(header) != 'webp':
+        raise MetadataError("Not a WebP file")
+    riff_end = 8 + struct.unpack('<I', header[4:8])[0]
+
+    chunks = []  # (fourcc, offset of the payload, payload size incl. padding)
+    pos = 12
+    while pos + 8 <= riff_end:
+        src.seek(pos)
+        chunk_header = src.read(8)
+        if len(chunk_header) != 8:
+            break
+        fourcc, size = struct.unpack('<4sI', chunk_header)
+        padded = size + (size & 1)
+        chunks.append((fourcc, pos + 8, padded))
+        pos += 8 + padded
+
+    kept = [c for c in chunks if c[0] not in WEBP_STRIP_CHUNKS]
+    removed = [c[0].decode('ascii').strip() for c in chunks if c[0] in WEBP_STRIP_CHUNKS]
+    dst.write(b'RIFF' + struct.pack('<I', 4 + sum(8 + padded for _, _, padded in kept)) + b'WEBP')
+    for fourcc, offset, padded in kept:
+        src.seek(offset - 8)
+        dst.write(_read_exact(src, 8))
+        if fourcc == b'VP8X' and padded >= 1:
+            flags = _read_exact(src, 1)[0] & ~(VP8X_EXIF_FLAG | VP8X_XMP_FLAG)
+            dst.write(bytes((flags,)))
+            _copy(src, dst, padded - 1)
+        else:
+            _copy(src, dst, padded)
+    return removed
+
+
+_STRIPPERS = {'jpeg': strip_jpeg, 'png': strip_png, 'webp': strip_webp}
+
+
+def strip_metadata(src: BinaryIO, dst: BinaryIO) -> Dict:
+    """Write src to dst without EXIF/XMP/IPTC/text metadata, keeping the format and image data.
+
+    src must be positioned at the start of the file. Returns {"format": ..., "removed": [...]}
+    with the names of the dropped segments. Raises MetadataError for other formats or
+    malformed containers.
+    """
+    fmt = detect_format(src.read(12))
+    src.seek(0, os.SEEK_SET)
+    if fmt is None:
+        raise MetadataError("Only JPEG, PNG and WebP metadata can be removed without re-encoding")
+    return {"format": fmt, "removed": _STRIPPERS[fmt](src, dst)}
+
+
+def read_exif_block(src: BinaryIO) -> Optional[bytes]:
+    """Raw EXIF (TIFF structure) of a JPEG, PNG or WebP, or None.
+
+    Only segment headers are read and the image data is skipped with seeks; the search stops
+    at the first scan (JPEG), at IDAT (PNG), at the end of the chunks (WebP, where EXIF follows
+    the image data) or after EXIF_SCAN_LIMIT bytes.
+    """
+    src.seek(0)
+    fmt = detect_format(src.read(12))
+    if fmt == 'jpeg':
+        pos = 2
+        while pos < EXIF_SCAN_LIMIT:
+            src.seek(pos)
+            header = src.read(4)
+            if len(header) < 2 or header[0] != 0xFF:
+                return None
+            marker = header[1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            if marker in (0xDA, 0xD9) or len(header) < 4:
+                return None
+            length = struct.unpack('>H', header[2:4])[0]
+            if marker == 0xE1 and length > 8:
+                payload = src.read(length - 2)
+                if payload.startswith(b'Exif\x00\x00'):
+                    return payload[6:]
+            pos += 2 + length
+    elif fmt == 'png':
+        pos = 8
+        while pos < EXIF_SCAN_LIMIT:
+            src.seek(pos)
+            header = src.read(8)
+            if len(header) < 8:
+                return None
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type == b'eXIf':
+                return src.read(length)
+            if chunk_type in (b'IDAT', b'IEND'):
+                return None
+            pos += 12 + length
+    elif fmt == 'webp':
+        pos = 12
+        while pos < EXIF_SCAN_LIMIT:
+            src.seek(pos)
+            header = src.read(8)
+            if len(header) < 8:
+                return None
+            fourcc, size = struct.unpack('<4sI', header)
+            if fourcc == b'EXIF':
+                data = src.read(size)
+                return data[6:] if data.startswith(b'Exif\x00\x00') else data
+            pos += 8 + size + (size & 1)
+    return None
+
+
+def format_exif_value(name: str, value, blob_limit: int = EXIF_BLOB_PREVIEW) -> str:
+    """Human-readable string for an EXIF value; binary blobs are cut to blob_limit bytes of hex."""
+    if isinstance(value, bytes):
+        if name == 'ComponentsConfiguration' and len(value) == 4:
+            comp_map = {0: 'None', 1: 'Y', 2: 'Cb', 3: 'Cr', 4: 'R', 5: 'G', 6: 'B'}
+            return ' '.join(comp_map.get(b, str(b)) for b in value)
+        if name in ('ExifVersion', 'FlashPixVersion') and len(value) == 4:
+            # Versions are ASCII digits like b'0232' → '2.32'
+            s = value.decode('ascii', errors='ignore')
+            if s.isdigit() and len(s) == 4:
+                return f"{int(s[:2])}.{s[2:]}"
+            return s or f"bytes[{len(value)}]"
+        text = value.rstrip(b'\x00')
+        # If all printable ASCII, show as string; otherwise compact hex
+        if text and len(text) <= blob_limit * 4 and all(32 <= b < 127 for b in text):
+            return text.decode('ascii')
+        preview = value[:blob_limit].hex()
+        return f"bytes[{len(value)}]: {preview}{'…' if len(value) > blob_limit else ''}"
+    if isinstance(value, (list, tuple)):
+        return ', '.join(format_exif_value(name, v, blob_limit) for v in value)
+    if isinstance(value, str):
+        return value.rstrip('\x00')
+    return str(value)
+
+
+def extract_exif(image_path: Source, blob_limit: int = EXIF_BLOB_PREVIEW):
+    """EXIF tags of an image without decoding it.
+
+    JPEG, PNG and WebP are handled by read_exif_block (metadata segments only); for other
+    formats Pillow reads the header lazily. Returns (result: dict, success: bool) with result
+    keys format, exif (IFD0 and Exif IFD tags by name) and gps (GPS tags by name).
+    """
+    try:
+        exif = Image.Exif()
+        with open_binary(image_path) as src:
+            fmt = detect_format(src.read(12))
+            if fmt:
+                block = read_exif_block(src)
+                if block:
+                    exif.load(block)
+            else:
+                src.seek(0)
+                with Image.open(src) as img:
+                    fmt = (img.format or '').lower() or None
+                    exif = img.getexif()
+
+        tags = {}
+        for ifd in (exif, exif.get_ifd(EXIF_IFD_POINTER)):
+            for tag, value in ifd.items():
+                if tag in (EXIF_IFD_POINTER, GPS_IFD_POINTER, INTEROP_IFD_POINTER):
+                    continue
+                name = TAGS.get(tag, str(tag))
+                try:
+                    tags[name] = format_exif_value(name, value, blob_limit)
+                except Exception:
+                    tags[name] = repr(value)[:blob_limit * 2]
+        gps = {}
+        for tag, value in exif.get_ifd(GPS_IFD_POINTER).items():
+            name = GPSTAGS.get(tag, str(tag))
+            gps[name] = format_exif_value(name, value, blob_limit)
+        return ({"format": fmt, "exif": tags, "gps": gps}, True)
+    except Exception as e:
+        return ({"errors": [f"Failed to read EXIF: {e}"]}, False)
+
+
+def extract_exif_batch(sources: List[Source], blob_limit: int = EXIF_BLOB_PREVIEW) -> List[Dict]:
+    """extract_exif for several files; one {"name", ...result} entry per source, in order."""
+    results = []
+    for src in sources:
+        result, success = extract_exif(src, blob_limit)
+        results.append(dict(result, name=os.path.basename(source_name(src)), ok=success))
+    return results
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+
+
+# Short names accepted in settings, mapped to rembg session names
+MODEL_ALIASES = {
+    'isnet': 'isnet-general-use',
+}
+SUPPORTED_MODELS = ('u2net', 'u2netp', 'isnet-general-use')
+
+_lock = threading.Lock()
+_sessions = {}
+_metrics: Dict[str, Dict] = {}
+
+
+def resolve_model_name(model_name: Optional[str] = None) -> str:
+    """Normalize a model name from the caller or settings.REMBG_MODEL; unknown names fall back to u2net."""
+    name = (model_name or getattr(settings, 'REMBG_MODEL', 'u2net') or 'u2net').strip().lower()
+    name = MODEL_ALIASES.get(name, name)
+    return name if name in SUPPORTED_MODELS else 'u2net'
+
+
+def _build_session(model_name: str):
+    import onnxruntime as ort
+    from rembg.sessions import sessions_class
+    from rembg.sessions.u2net import U2netSession
+
+    session_class = U2netSession
+    for sc in sessions_class:
+        if sc.name() == model_name:
+            session_class = sc
+            break
+
+    sess_opts = ort.SessionOptions()
+    intra = int(getattr(settings, 'REMBG_INTRA_OP_THREADS', 0) or 0)
+    inter = int(getattr(settings, 'REMBG_INTER_OP_THREADS', 0) or 0)
+    # 0 keeps the ONNX Runtime default (one thread per physical core)
+    if intra > 0:
+        sess_opts.intra_op_num_threads = intra
+    if inter > 0:
+        sess_opts.inter_op_num_threads = inter
+    return session_class(model_name, sess_opts, None)
+
+
+def get_rembg_session(model_name: Optional[str] = None):
+    """Return the process-wide rembg session for a model, creating it on first use."""
+    name = resolve_model_name(model_name)
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            start = time.perf_counter()
+            session = _build_session(name)
+            _sessions[name] = session
+            _metrics[name] = {
+                'model': name,
+                'load_seconds': round(time.perf_counter() - start, 4),
+                'loaded_at': time.time(),
+                'inferences': 0,
+                'inference_total_seconds': 0.0,
+                'inference_last_seconds': None,
+                'inference_max_seconds': 0.0,
+            }
+    return session
+
+
+def _record_inference(name: str, seconds: float):
+    with _lock:
+        m = _metrics.get(name)
+        if m is None:
+            return
+        m['inferences'] += 1
+        m['inference_total_seconds'] += seconds
+        m['inference_last_seconds'] = round(seconds, 4)
+        m['inference_max_seconds'] = max(m['inference_max_seconds'], round(seconds, 4))
+
+
+def remove_background(data, model_name: Optional[str] = None):
+    """Run rembg with the shared session. Returns (output, model_name, inference_seconds)."""
+    from rembg import remove
+
+    name = resolve_model_name(model_name)
+    session = get_rembg_session(name)
+    start = time.perf_counter()
+    out = remove(data, session=session)
+    elapsed = time.perf_counter() - start
+    _record_inference(name, elapsed)
+    return out, name, elapsed
+
+
+def warm_up(model_name: Optional[str] = None) -> Dict:
+    """Load the session and run one tiny inference so graph initialization happens before the first request."""
+    from PIL import Image
+
+    name = resolve_model_name(model_name)
+    get_rembg_session(name)
+    remove_background(Image.new('RGB', (32, 32), (255, 255, 255)), name)
+    return session_metrics().get(name, {})
+
+
+def session_metrics() -> Dict[str, Dict]:
+    """Load time and inference timings for every session loaded in this process."""
+    with _lock:
+        out = {}
+        for name, m in _metrics.items():
+            item = dict(m)
+            count = item['inferences']
+            item['inference_total_seconds'] = round(item['inference_total_seconds'], 4)
+            item['inference_avg_seconds'] = round(m['inference_total_seconds'] / count, 4) if count else None
+            out[name] = item
+        return out
@@ -1,26 +1,213 @@
 from PIL import Image
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import os
+import tempfile
+import threading
 import time
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
+from django.conf import settings
+from .media_store import allocate_output, register_output
 try:
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    from pdf2image.exceptions import PDFPageCountError
     PDF2IMAGE_AVAILABLE = True
 except ImportError:
     PDF2IMAGE_AVAILABLE = False
 
+_pool = None
+_pool_lock = threading.Lock()
 
-def pdf_to_images(media_dir: Path, pdf_path: str, max_pages: int = 10, dpi: int = 200, output_format: str = "png") -> tuple:
+
+def _render_page(media_dir: Path, pdf_path: str, page_num: int, dpi: int, fmt: str, work_dir: str) -> Dict:
+    """
+    Rasterize a single page and write it to media_dir.
+
+    poppler renders only this page into work_dir; the page is encoded and the
+    intermediate file removed before returning, so memory is bounded by one page.
+
+    Returns:
+        Dict with filename, page and size_kb
+    """
+    paths = convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        first_page=page_num,
+        last_page=page_num,
+        output_folder=work_dir,
+        paths_only=True,
+    )
+    if not paths:
+        raise ValueError('poppler produced no output')
+
+    pdf_stem = Path(pdf_path).stem
+    output_name, output_path = allocate_output(media_dir, f"app-shubraj-com-{pdf_stem}-page-{page_num}-{time.time_ns()}.{fmt}")
+
+    try:
+        with Image.open(paths[0]) as img:
+            # Prepare for saving
+            if fmt in ('jpg', 'jpeg'):
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    # Create white background for JPEG
+                    bg = Image.new('RGB', img.size, (255, 255, 255))
+                    src = img.convert('RGBA') if img.mode == 'P' else img
+                    bg.paste(src, mask=src.split()[-1])
+                    out = bg
+                elif img.mode != 'RGB':
+                    out = img.convert('RGB')
+                else:
+                    out = img
+                out.save(output_path, format='JPEG', quality=95, optimize=True)
+            else:
+                img.save(output_path, format='PNG', optimize=True)
+    finally:
+        for p in paths:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    return {
+        'filename': output_name,
+        'page': page_num,
+        'size_kb': round(os.path.getsize(output_path) / 1024.0, 2),
+    }
+
+
+def _render_range(media_dir: Path, pdf_path: str, first_page: int, last_page: int, dpi: int, fmt: str) -> tuple:
+    """
+    Render a contiguous page range in a worker process.
+
+    Returns:
+        Tuple of (output_files, errors)
+    """
+    output_files = []
+    errors = []
+    with tempfile.TemporaryDirectory(prefix='pdf-pages-') as work_dir:
+        for page_num in range(first_page, last_page + 1):
+            try:
+                output_files.append(_render_page(media_dir, pdf_path, page_num, dpi, fmt, work_dir))
+            except Exception as e:
+                errors.append(f'Failed to save page {page_num}: {str(e)}')
+    return output_files, errors
+
+
+def _split_pages(pages: int, chunks: int) -> List[tuple]:
+    """Split pages 1..pages into at most ``chunks`` contiguous (first, last) ranges."""
+    chunks = max(1, min(chunks, pages))
+    size, extra = divmod(pages, chunks)
+    ranges = []
+    first = 1
+    for i in range(chunks):
+        last = first + size - 1 + (1 if i < extra else 0)
+        ranges.append((first, last))
+        first = last + 1
+    return ranges
+
+
+def render_workers() -> int:
+    """Processes in this process's shared render pool (settings.PDF_RENDER_WORKERS, capped by CPU count)."""
+    return max(1, min(int(getattr(settings, 'PDF_RENDER_WORKERS', 2)), os.cpu_count() or 1))
+
+
+def max_per_request() -> int:
+    """Pool processes one conversion may use (settings.PDF_RENDER_MAX_PER_REQUEST), at most render_workers()."""
+    return max(1, min(int(getattr(settings, 'PDF_RENDER_MAX_PER_REQUEST', 1)), render_workers()))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Job and request threads may be running in this process, so do not fork it directly
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _pool = ProcessPoolExecutor(max_workers=render_workers(), mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next conversion starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_parallel(media_dir: Path, pdf_path: str, pages_to_convert: int, dpi: int, fmt: str, workers: int,
+                     progress: Optional[Callable[[int, int], None]] = None) -> tuple:
+    """
+    Render page ranges on the shared process pool; each process runs its own poppler render and Pillow encode.
+
+    The pool is created once per process and sized by render_workers(), so concurrent
+    conversions queue for the same processes instead of each starting their own.
+
+    Returns:
+        Tuple of (output_files sorted by page, errors)
+    """
+    ranges = _split_pages(pages_to_convert, workers)
+    output_files = []
+    errors_by_range = {}
+    done = 0
+
+    def submit(pool):
+        return {
+            pool.submit(_render_range, media_dir, pdf_path, first, last, dpi, fmt): (first, last)
+            for first, last in ranges
+        }
+
+    pool = _get_pool()
+    try:
+        futures = submit(pool)
+    except BrokenProcessPool:
+        # A worker died during an earlier conversion: start a fresh pool once
+        _discard_pool(pool)
+        pool = _get_pool()
+        futures = submit(pool)
+    try:
+        for future in as_completed(futures):
+            first, last = futures[future]
+            try:
+                files, errors_by_range[first] = future.result()
+                output_files.extend(files)
+            except BrokenProcessPool as e:
+                _discard_pool(pool)
+                errors_by_range[first] = [f'Failed to render pages {first}-{last}: worker process died: {e}']
+            except Exception as e:
+                errors_by_range[first] = [f'Failed to render pages {first}-{last}: {str(e)}']
+            done += last - first + 1
+            if progress:
+                progress(done, pages_to_convert)
+    finally:
+        # A conversion that stops early must not leave its queued ranges occupying the shared pool
+        for future in futures:
+            future.cancel()
+
+    output_files.sort(key=lambda f: f['page'])
+    errors = [e for first in sorted(errors_by_range) for e in errors_by_range[first]]
+    return output_files, errors
+
+
+def pdf_to_images(media_dir: Path, pdf_path: str, max_pages: int = 10, dpi: int = 200, output_format: str = "png",
+                  progress: Optional[Callable[[int, int], None]] = None, workers: int = 1) -> tuple:
     """
     Convert PDF pages to images.
-    
+
+    Only the pages that will be kept are rendered, one at a time, so a large
+    document never has more than one rasterized page in memory.
+
     Args:
         media_dir: Directory to save output images
         pdf_path: Path to PDF file
         max_pages: Maximum number of pages to convert (default: 10)
         dpi: Resolution for image conversion (default: 200)
         output_format: Output image format - 'png' or 'jpg' (default: 'png')
-        
+        progress: Optional callback called as progress(pages_done, pages_to_convert)
+        workers: Page ranges to split the render into (default: 1, sequential); capped by max_per_request() and page count
+
     Returns:
         Tuple of (result_dict, success_bool)
     """
@@ -28,80 +215,58 @@ def pdf_to_images(media_dir: Path, pdf_path: str, max_pages: int = 10, dpi: int
         return {
             'errors': ['PDF to image conversion requires pdf2image library. Please install it with: pip install pdf2image']
         }, False
-    
+
     errors = []
-    
+
     # Validate output format
     fmt = output_format.lower()
     if fmt not in ('png', 'jpg', 'jpeg'):
         fmt = 'png'
-    
+
     try:
-        # Convert PDF to images
+        # Read the page count from the PDF header instead of rendering the document
         # Note: This requires poppler-utils to be installed on the system
-        images = convert_from_path(pdf_path, dpi=dpi)
-        
-        total_pages = len(images)
-        
+        try:
+            total_pages = int(pdfinfo_from_path(pdf_path).get('Pages', 0))
+        except PDFPageCountError:
+            return {'errors': ['Invalid PDF file or file is corrupted']}, False
+
         if total_pages == 0:
             return {'errors': ['PDF file contains no pages']}, False
-        
+
         # Check page limit
         if total_pages > max_pages:
             errors.append(f'PDF has {total_pages} pages, but maximum allowed is {max_pages}. Only first {max_pages} pages will be converted.')
             pages_to_convert = max_pages
         else:
             pages_to_convert = total_pages
-        
-        # Get PDF filename stem for naming
-        pdf_stem = Path(pdf_path).stem
-        
+
         # Convert pages to images
         output_files = []
-        total_size = 0
-        
-        for page_num in range(pages_to_convert):
-            img = images[page_num]
-            
-            # Prepare for saving
-            if fmt in ('jpg', 'jpeg'):
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Create white background for JPEG
-                    bg = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    bg.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                    img = bg
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-            
-            # Generate output filename
-            output_name = f"app-shubraj-com-{pdf_stem}-page-{page_num + 1}-{time.time_ns()}.{fmt}"
-            output_path = media_dir / output_name
-            
-            # Save image
-            save_kwargs = {}
-            if fmt in ('jpg', 'jpeg'):
-                save_kwargs = {'format': 'JPEG', 'quality': 95, 'optimize': True}
-            else:
-                save_kwargs = {'format': 'PNG', 'optimize': True}
-            
-            try:
-                img.save(output_path, **save_kwargs)
-                file_size = os.path.getsize(output_path) / 1024.0  # Size in KB
-                total_size += file_size
-                
-                output_files.append({
-                    'filename': output_name,
-                    'page': page_num + 1,
-                    'size_kb': round(file_size, 2)
-                })
-            except Exception as e:
-                errors.append(f'Failed to save page {page_num + 1}: {str(e)}')
-        
+        workers = max(1, min(int(workers or 1), max_per_request(), pages_to_convert))
+
+        if workers > 1:
+            output_files, render_errors = _render_parallel(media_dir, pdf_path, pages_to_convert, dpi, fmt, workers, progress)
+            errors.extend(render_errors)
+        else:
+            with tempfile.TemporaryDirectory(prefix='pdf-pages-') as work_dir:
+                for page_num in range(1, pages_to_convert + 1):
+                    try:
+                        output_files.append(_render_page(media_dir, pdf_path, page_num, dpi, fmt, work_dir))
+                    except Exception as e:
+                        errors.append(f'Failed to save page {page_num}: {str(e)}')
+
+                    if progress:
+                        progress(page_num, pages_to_convert)
+
+        total_size = sum(f['size_kb'] for f in output_files)
+        # Registered here rather than in _render_page, which may run in a pool process without Django
+        for f in output_files:
+            register_output(f['filename'])
+
         if not output_files:
             return {'errors': errors if errors else ['Failed to convert any pages']}, False
-        
+
         result = {
             'total_pages': total_pages,
             'converted_pages': len(output_files),
@@ -110,12 +275,12 @@ def pdf_to_images(media_dir: Path, pdf_path: str, max_pages: int = 10, dpi: int
             'format': fmt.upper(),
             'dpi': dpi
         }
-        
+
         if errors:
             result['warnings'] = errors
-        
+
         return result, True
-        
+
     except Exception as e:
         error_msg = str(e).lower()
         if 'poppler' in error_msg or 'pdf2image' in error_msg:
@@ -130,4 +295,3 @@ def pdf_to_images(media_dir: Path, pdf_path: str, max_pages: int = 10, dpi: int
             return {
                 'errors': [f'Failed to convert PDF: {str(e)}']
             }, False
-
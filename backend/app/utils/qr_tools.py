@@ -5,6 +5,8 @@ import cv2
 import numpy as np
 from barcode import Code128, EAN13
 from barcode.writer import ImageWriter
+from .media_store import allocate_output, register_output
+from .uploads import read_source_bytes
 
 
 def generate_qr_png(media_dir: Path, data: str, version: int | None = None, error_correction: str = 'M', box_size: int = 10, border: int = 4):
@@ -34,9 +36,9 @@ def generate_qr_png(media_dir: Path, data: str, version: int | None = None, erro
     qr.make(fit=True)
     img = qr.make_image(fill_color="black", back_color="white")
 
-    name = f"app-shubraj-com-qr-{time.time_ns()}.png"
-    out_path = media_dir / name
+    name, out_path = allocate_output(media_dir, f"app-shubraj-com-qr-{time.time_ns()}.png")
     img.save(out_path)
+    register_output(name)
     return ({"output_name": name}, True)
 
 def decode_qr_image(image_path: str):
@@ -45,7 +47,9 @@ def decode_qr_image(image_path: str):
     Uses OpenCV QRCodeDetector; supports multiple codes when available.
     """
     try:
-        img = cv2.imread(image_path)
+        # Decode from memory so in-memory uploads need no temporary file
+        buf = np.frombuffer(read_source_bytes(image_path), dtype=np.uint8)
+        img = cv2.imdecode(buf, cv2.IMREAD_COLOR) if buf.size else None
         if img is None:
             return {"errors": ["Failed to read image"]}, False
     except Exception as e:
@@ -101,11 +105,12 @@ def generate_barcode_png(media_dir: Path, data: str, kind: str = 'code128'):
             cls = Code128
             payload = data
 
-        name = f"app-shubraj-com-barcode-{kind}-{time.time_ns()}"
-        out_path = media_dir / f"{name}.png"
+        name, out_path = allocate_output(media_dir, f"app-shubraj-com-barcode-{kind}-{time.time_ns()}.png")
         bc = cls(payload, writer=ImageWriter())
-        bc.write(open(out_path, 'wb'))
-        return ({"output_name": f"{name}.png"}, True)
+        with open(out_path, 'wb') as f:
+            bc.write(f)
+        register_output(name)
+        return ({"output_name": name}, True)
     except Exception as e:
         return {"errors": [f"Barcode error: {e}"]}, False
 
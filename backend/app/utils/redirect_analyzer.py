@@ -1,10 +1,16 @@
 import requests
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from urllib.parse import urlparse, urljoin
 import time
+from .http_client import get_session
+from .checker_cache import cached_checker
 
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
 
-def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10) -> Dict:
+
+@cached_checker('redirects')
+def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10,
+                           fetch: Optional[Callable[[str], requests.Response]] = None) -> Dict:
     """
     Analyze HTTP redirect chain for a given URL.
     
@@ -12,6 +18,8 @@ def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10)
         url: URL to analyze (can include or exclude protocol)
         max_redirects: Maximum number of redirects to follow
         timeout: Request timeout in seconds
+        fetch: Requests one hop without following redirects (default: a HEAD on the
+            shared session); site_audit passes a GET that also captures the page
         
     Returns:
         Dictionary containing redirect chain information
@@ -51,6 +59,16 @@ def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10)
             'User-Agent': 'Mozilla/5.0 (compatible; Redirect-Chain-Analyzer/1.0)'
         }
         
+        if fetch is None:
+            def fetch(target):
+                return get_session().head(
+                    target,
+                    headers=headers,
+                    timeout=timeout,
+                    allow_redirects=False,  # Manually follow redirects
+                    verify=True
+                )
+        
         for step in range(max_redirects + 1):
             if current_url in seen_urls:
                 result['issues'].append(f'Redirect loop detected: {current_url}')
@@ -60,13 +78,7 @@ def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10)
             seen_urls.add(current_url)
             
             try:
-                response = requests.head(
-                    current_url,
-                    headers=headers,
-                    timeout=timeout,
-                    allow_redirects=False,  # Manually follow redirects
-                    verify=True
-                )
+                response = fetch(current_url)
                 
                 redirect_info = {
                     'step': step + 1,
@@ -79,7 +91,7 @@ def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10)
                 }
                 
                 # Check if it's a redirect
-                if response.status_code in [301, 302, 303, 307, 308]:
+                if response.status_code in REDIRECT_STATUSES:
                     location = response.headers.get('Location')
                     if location:
                         # Handle relative URLs
@@ -87,11 +99,7 @@ def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10)
                         redirect_info['redirect_type'] = get_redirect_type(response.status_code)
                         
                         # Get absolute URL for next request
-                        if location.startswith('http://') or location.startswith('https://'):
-                            next_url = location
-                        else:
-                            parsed = urlparse(current_url)
-                            next_url = urljoin(f"{parsed.scheme}://{parsed.netloc}", location)
+                        next_url = redirect_target(current_url, location)
                         
                         redirect_chain.append(redirect_info)
                         current_url = next_url
@@ -175,6 +183,14 @@ def analyze_redirect_chain(url: str, max_redirects: int = 20, timeout: int = 10)
     return result
 
 
+def redirect_target(current_url: str, location: str) -> str:
+    """Absolute URL for the next hop of a redirect from current_url to Location."""
+    if location.startswith('http://') or location.startswith('https://'):
+        return location
+    parsed = urlparse(current_url)
+    return urljoin(f"{parsed.scheme}://{parsed.netloc}", location)
+
+
 def get_redirect_type(status_code: int) -> str:
     """Get human-readable redirect type."""
     redirect_types = {
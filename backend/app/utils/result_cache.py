@@ -0,0 +1,107 @@
+import functools
+import hashlib
+import inspect
+import json
+from pathlib import Path
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .media_store import register_output
+from .uploads import is_path, rewind
+
+
+# Bump when an image transform changes its output so stale entries are not reused
+CACHE_VERSION = 2
+KEY_PREFIX = 'imgresult'
+
+
+def hash_file(src, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, read in chunks. ``src`` is a path or a seekable file-like object."""
+    h = hashlib.sha256()
+    if is_path(src):
+        with open(src, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                h.update(chunk)
+    else:
+        rewind(src)
+        for chunk in iter(lambda: src.read(chunk_size), b''):
+            h.update(chunk)
+        rewind(src)
+    return h.hexdigest()
+
+
+def _normalize(name: str, value):
+    if isinstance(value, str):
+        value = value.strip()
+        if name.endswith('format') or name in ('mode', 'position'):
+            value = value.lower()
+            if value == 'jpeg':
+                value = 'jpg'
+        return value
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, (tuple, list)):
+        return [_normalize(name, v) for v in value]
+    return value
+
+
+def make_key(namespace: str, arguments: dict, file_params: Iterable[str], ignore: Iterable[str]) -> str:
+    """Cache key from the input file hashes plus the normalized remaining parameters."""
+    payload = {}
+    for name, value in arguments.items():
+        if name in ignore:
+            continue
+        if name in file_params:
+            payload[name] = hash_file(value) if value else None
+        else:
+            payload[name] = _normalize(name, value)
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{KEY_PREFIX}:{CACHE_VERSION}:{namespace}:{digest}"
+
+
+def content_cached(namespace: str, file_params: Iterable[str] = ('image_path',), ignore: Iterable[str] = ('media_dir',)):
+    """Reuse the output of a deterministic image transform for identical input bytes and parameters.
+
+    The wrapped function must take ``media_dir`` and return (result, success) with
+    ``result['output_name']`` relative to media_dir. Only successful results without
+    ``warnings`` are cached: a warning marks a degraded output (e.g. a fallback used because
+    rembg failed to load) that must not be served once the cause is gone. An entry whose
+    output file is gone is treated as a miss.
+    Hits are returned with ``cached: True``; ``func.uncached`` bypasses the cache.
+    """
+    file_params = tuple(file_params)
+    ignore = tuple(ignore)
+
+    def decorator(func):
+        sig = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not getattr(settings, 'RESULT_CACHE_ENABLED', True):
+                return func(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            try:
+                key = make_key(namespace, bound.arguments, file_params, ignore)
+            except OSError:
+                # Unreadable input: let the transform report the error itself
+                return func(*args, **kwargs)
+
+            media_dir = Path(bound.arguments['media_dir'])
+            hit = cache.get(key)
+            if hit and (media_dir / hit['output_name']).exists():
+                # Push the shared output's expiry out so the sweeper does not remove it under this user
+                register_output(hit['output_name'])
+                return dict(hit, cached=True), True
+
+            result, success = func(*args, **kwargs)
+            if success and result.get('output_name') and not result.get('warnings'):
+                cache.set(key, result, timeout=getattr(settings, 'RESULT_CACHE_TTL', 60 * 60 * 24))
+            return result, success
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
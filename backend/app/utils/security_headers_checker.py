@@ -4,8 +4,97 @@ import re
 import ssl
 import socket
 from urllib.parse import urlparse
+from .http_client import fetch_headers, request_error
+from .checker_cache import cached_checker
 
 
+# Security headers to check
+SECURITY_HEADERS = {
+    'Strict-Transport-Security': {
+        'name': 'HSTS',
+        'recommended': True,
+        'description': 'Forces HTTPS connections',
+        'score': 20
+    },
+    'Content-Security-Policy': {
+        'name': 'CSP',
+        'recommended': True,
+        'description': 'Prevents XSS attacks',
+        'score': 20
+    },
+    'X-Frame-Options': {
+        'name': 'X-Frame-Options',
+        'recommended': True,
+        'description': 'Prevents clickjacking',
+        'score': 15
+    },
+    'X-Content-Type-Options': {
+        'name': 'X-Content-Type-Options',
+        'recommended': True,
+        'description': 'Prevents MIME-type sniffing',
+        'score': 15
+    },
+    'Referrer-Policy': {
+        'name': 'Referrer-Policy',
+        'recommended': True,
+        'description': 'Controls referrer information',
+        'score': 10
+    },
+    'Permissions-Policy': {
+        'name': 'Permissions-Policy',
+        'recommended': True,
+        'description': 'Controls browser features',
+        'score': 10
+    },
+    'Cross-Origin-Embedder-Policy': {
+        'name': 'COEP',
+        'recommended': True,
+        'description': 'Prevents document from loading cross-origin resources',
+        'score': 5
+    },
+    'Cross-Origin-Opener-Policy': {
+        'name': 'COOP',
+        'recommended': True,
+        'description': 'Isolates browsing context',
+        'score': 5
+    },
+    'Cross-Origin-Resource-Policy': {
+        'name': 'CORP',
+        'recommended': True,
+        'description': 'Controls resource embedding',
+        'score': 5
+    },
+    'X-DNS-Prefetch-Control': {
+        'name': 'DNS Prefetch Control',
+        'recommended': True,
+        'description': 'Controls DNS prefetching',
+        'score': 3
+    },
+    'X-XSS-Protection': {
+        'name': 'X-XSS-Protection',
+        'recommended': False,
+        'description': 'Legacy XSS protection (deprecated)',
+        'score': 5,
+        'note': 'Deprecated but still used by some sites'
+    },
+    'Expect-CT': {
+        'name': 'Expect-CT',
+        'recommended': False,
+        'description': 'Certificate Transparency (deprecated)',
+        'score': 0,
+        'note': 'Deprecated in favor of TLS 1.3'
+    },
+    'Public-Key-Pins': {
+        'name': 'HPKP',
+        'recommended': False,
+        'description': 'HTTP Public Key Pinning (deprecated)',
+        'score': 0,
+        'note': 'Deprecated - can cause site lockout'
+    }
+}
+
+
+@cached_checker('headers')
 def check_security_headers(domain: str, timeout: int = 10) -> Dict:
     """
     Check security headers for a domain.
@@ -26,7 +115,36 @@ def check_security_headers(domain: str, timeout: int = 10) -> Dict:
             'status': 'error'
         }
     
-    result = {
+    result = empty_result(domain)
+    
+    try:
+        # Try HTTPS first
+        url = f'https://{domain}'
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (compatible; Security-Headers-Checker/1.0)'
+        }
+        
+        try:
+            # Only the headers are read; the page body is never downloaded
+            response = fetch_headers(url, headers['User-Agent'], timeout=timeout)
+            # The first hop is the TLS connection to the domain, so no separate probe is needed
+            tls_info = describe_tls_version(response.tls_version) if response.tls_version else check_tls_version(domain)
+            analyze_security_headers(result, response, tls_info)
+            result['timings'] = response.timings
+            
+        except requests.exceptions.RequestException as e:
+            result['status'], result['error'] = request_error(e)
+    
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f'Unexpected error: {str(e)}'
+    
+    return result
+
+
+def empty_result(domain: str) -> Dict:
+    """Result skeleton filled in by analyze_security_headers (or given an error)."""
+    return {
         'domain': domain,
         'status': 'success',
         'headers_found': [],
@@ -35,233 +153,125 @@ def check_security_headers(domain: str, timeout: int = 10) -> Dict:
         'details': {},
         'recommendations': []
     }
+
+
+def analyze_security_headers(result: Dict, response: requests.Response, tls_info: Optional[Dict] = None) -> Dict:
+    """Score the security headers of an already fetched response into result (see empty_result).
+
+    tls_info is check_tls_version's dict for the domain, if known.
+    """
+    # Check each security header
+    found_count = 0
+    total_score = 0
     
-    # Define security headers to check
-    security_headers = {
-        'Strict-Transport-Security': {
-            'name': 'HSTS',
-            'recommended': True,
-            'description': 'Forces HTTPS connections',
-            'score': 20
-        },
-        'Content-Security-Policy': {
-            'name': 'CSP',
-            'recommended': True,
-            'description': 'Prevents XSS attacks',
-            'score': 20
-        },
-        'X-Frame-Options': {
-            'name': 'X-Frame-Options',
-            'recommended': True,
-            'description': 'Prevents clickjacking',
-            'score': 15
-        },
-        'X-Content-Type-Options': {
-            'name': 'X-Content-Type-Options',
-            'recommended': True,
-            'description': 'Prevents MIME-type sniffing',
-            'score': 15
-        },
-        'Referrer-Policy': {
-            'name': 'Referrer-Policy',
-            'recommended': True,
-            'description': 'Controls referrer information',
-            'score': 10
-        },
-        'Permissions-Policy': {
-            'name': 'Permissions-Policy',
-            'recommended': True,
-            'description': 'Controls browser features',
-            'score': 10
-        },
-        'Cross-Origin-Embedder-Policy': {
-            'name': 'COEP',
-            'recommended': True,
-            'description': 'Prevents document from loading cross-origin resources',
-            'score': 5
-        },
-        'Cross-Origin-Opener-Policy': {
-            'name': 'COOP',
-            'recommended': True,
-            'description': 'Isolates browsing context',
-            'score': 5
-        },
-        'Cross-Origin-Resource-Policy': {
-            'name': 'CORP',
-            'recommended': True,
-            'description': 'Controls resource embedding',
-            'score': 5
-        },
-        'X-DNS-Prefetch-Control': {
-            'name': 'DNS Prefetch Control',
-            'recommended': True,
-            'description': 'Controls DNS prefetching',
-            'score': 3
-        },
-        'X-XSS-Protection': {
-            'name': 'X-XSS-Protection',
-            'recommended': False,
-            'description': 'Legacy XSS protection (deprecated)',
-            'score': 5,
-            'note': 'Deprecated but still used by some sites'
-        },
-        'Expect-CT': {
-            'name': 'Expect-CT',
-            'recommended': False,
-            'description': 'Certificate Transparency (deprecated)',
-            'score': 0,
-            'note': 'Deprecated in favor of TLS 1.3'
-        },
-        'Public-Key-Pins': {
-            'name': 'HPKP',
-            'recommended': False,
-            'description': 'HTTP Public Key Pinning (deprecated)',
-            'score': 0,
-            'note': 'Deprecated - can cause site lockout'
-        }
-    }
-    
-    try:
-        # Try HTTPS first
-        url = f'https://{domain}'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (compatible; Security-Headers-Checker/1.0)'
+    for header_name, header_info in SECURITY_HEADERS.items():
+        header_value = response.headers.get(header_name, '')
+        
+        header_result = {
+            'name': header_info['name'],
+            'full_name': header_name,
+            'present': bool(header_value),
+            'value': header_value if header_value else None,
+            'recommended': header_info['recommended'],
+            'description': header_info['description'],
+            'score': header_info['score'] if header_value else 0
         }
         
-        try:
-            response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True, verify=True)
-            
-            # Check each security header
-            found_count = 0
-            total_score = 0
-            
-            for header_name, header_info in security_headers.items():
-                header_value = response.headers.get(header_name, '')
-                
-                header_result = {
-                    'name': header_info['name'],
-                    'full_name': header_name,
-                    'present': bool(header_value),
-                    'value': header_value if header_value else None,
-                    'recommended': header_info['recommended'],
-                    'description': header_info['description'],
-                    'score': header_info['score'] if header_value else 0
-                }
-                
-                if 'note' in header_info:
-                    header_result['note'] = header_info['note']
-                
-                # Analyze header values for recommendations
-                if header_value:
-                    found_count += 1
-                    total_score += header_info['score']
-                    
-                    # Analyze HSTS
-                    if header_name == 'Strict-Transport-Security':
-                        max_age_match = re.search(r'max-age=(\d+)', header_value, re.IGNORECASE)
-                        if max_age_match:
-                            max_age = int(max_age_match.group(1))
-                            if max_age < 31536000:  # Less than 1 year
-                                header_result['recommendation'] = 'Consider increasing max-age to at least 1 year (31536000 seconds)'
-                            if 'includeSubDomains' not in header_value:
-                                header_result['recommendation'] = 'Consider adding includeSubDomains directive'
-                    
-                    # Analyze CSP
-                    elif header_name == 'Content-Security-Policy':
-                        if "unsafe-inline" in header_value or "unsafe-eval" in header_value:
-                            header_result['warning'] = 'Contains unsafe directives (unsafe-inline or unsafe-eval)'
-                    
-                    # Analyze X-Frame-Options
-                    elif header_name == 'X-Frame-Options':
-                        if header_value.upper() not in ['DENY', 'SAMEORIGIN']:
-                            header_result['warning'] = 'Should be DENY or SAMEORIGIN'
-                    
-                    # Analyze X-Content-Type-Options
-                    elif header_name == 'X-Content-Type-Options':
-                        if header_value.upper() != 'NOSNIFF':
-                            header_result['warning'] = 'Should be nosniff'
-                
-                result['details'][header_name] = header_result
-                
-                if header_value:
-                    result['headers_found'].append(header_name)
-                elif header_info['recommended']:
-                    result['headers_missing'].append(header_name)
-                    result['recommendations'].append(f"Add {header_name} header for better security")
-            
-            result['security_score'] = total_score
-            result['max_score'] = sum([h['score'] for h in security_headers.values() if h['recommended']])
-            result['headers_found_count'] = found_count
-            result['total_headers_checked'] = len(security_headers)
-            
-            # Determine overall security level
-            score_percentage = (total_score / result['max_score'] * 100) if result['max_score'] > 0 else 0
-            if score_percentage >= 80:
-                result['security_level'] = 'excellent'
-                result['security_level_text'] = 'Excellent'
-            elif score_percentage >= 60:
-                result['security_level'] = 'good'
-                result['security_level_text'] = 'Good'
-            elif score_percentage >= 40:
-                result['security_level'] = 'fair'
-                result['security_level_text'] = 'Fair'
-            else:
-                result['security_level'] = 'poor'
-                result['security_level_text'] = 'Poor'
-            
-            # Store response info
-            result['final_url'] = response.url
-            result['status_code'] = response.status_code
-            result['server'] = response.headers.get('Server', 'Unknown')
-            
-            # Analyze cookies for security flags
-            result['cookie_security'] = analyze_cookies(response)
-            
-            # Check TLS version
-            tls_info = check_tls_version(domain)
-            if tls_info:
-                result['tls_info'] = tls_info
-            
-            # Check CORS policy
-            cors_info = analyze_cors_headers(response.headers)
-            if cors_info:
-                result['cors_info'] = cors_info
-            
-            # Check for information disclosure
-            info_disclosure = check_information_disclosure(response.headers)
-            if info_disclosure:
-                result['information_disclosure'] = info_disclosure
+        if 'note' in header_info:
+            header_result['note'] = header_info['note']
+        
+        # Analyze header values for recommendations
+        if header_value:
+            found_count += 1
+            total_score += header_info['score']
             
-            # Check for additional security-related headers
-            result['additional_headers'] = {}
-            security_related = ['Cache-Control', 'X-Powered-By', 'Server', 'Via', 'X-AspNet-Version']
-            for header in security_related:
-                if header in response.headers:
-                    result['additional_headers'][header] = response.headers[header]
+            # Analyze HSTS
+            if header_name == 'Strict-Transport-Security':
+                max_age_match = re.search(r'max-age=(\d+)', header_value, re.IGNORECASE)
+                if max_age_match:
+                    max_age = int(max_age_match.group(1))
+                    if max_age < 31536000:  # Less than 1 year
+                        header_result['recommendation'] = 'Consider increasing max-age to at least 1 year (31536000 seconds)'
+                    if 'includeSubDomains' not in header_value:
+                        header_result['recommendation'] = 'Consider adding includeSubDomains directive'
             
-            # Recommendation about X-Powered-By
-            if 'X-Powered-By' in response.headers:
-                result['recommendations'].append('Remove X-Powered-By header to hide server technology')
+            # Analyze CSP
+            elif header_name == 'Content-Security-Policy':
+                if "unsafe-inline" in header_value or "unsafe-eval" in header_value:
+                    header_result['warning'] = 'Contains unsafe directives (unsafe-inline or unsafe-eval)'
             
-            if 'Server' in response.headers and len(response.headers['Server']) > 0:
-                result['recommendations'].append('Consider removing or minimizing Server header to hide server version')
+            # Analyze X-Frame-Options
+            elif header_name == 'X-Frame-Options':
+                if header_value.upper() not in ['DENY', 'SAMEORIGIN']:
+                    header_result['warning'] = 'Should be DENY or SAMEORIGIN'
             
-        except requests.exceptions.SSLError:
-            result['status'] = 'ssl_error'
-            result['error'] = 'SSL/TLS error - domain may not support HTTPS or has certificate issues'
-        except requests.exceptions.ConnectionError:
-            result['status'] = 'connection_error'
-            result['error'] = 'Could not connect to the domain'
-        except requests.exceptions.Timeout:
-            result['status'] = 'timeout'
-            result['error'] = 'Connection timeout'
-        except requests.exceptions.RequestException as e:
-            result['status'] = 'error'
-            result['error'] = f'Request failed: {str(e)}'
+            # Analyze X-Content-Type-Options
+            elif header_name == 'X-Content-Type-Options':
+                if header_value.upper() != 'NOSNIFF':
+                    header_result['warning'] = 'Should be nosniff'
+        
+        result['details'][header_name] = header_result
+        
+        if header_value:
+            result['headers_found'].append(header_name)
+        elif header_info['recommended']:
+            result['headers_missing'].append(header_name)
+            result['recommendations'].append(f"Add {header_name} header for better security")
     
-    except Exception as e:
-        result['status'] = 'error'
-        result['error'] = f'Unexpected error: {str(e)}'
+    result['security_score'] = total_score
+    result['max_score'] = sum([h['score'] for h in SECURITY_HEADERS.values() if h['recommended']])
+    result['headers_found_count'] = found_count
+    result['total_headers_checked'] = len(SECURITY_HEADERS)
+    
+    # Determine overall security level
+    score_percentage = (total_score / result['max_score'] * 100) if result['max_score'] > 0 else 0
+    if score_percentage >= 80:
+        result['security_level'] = 'excellent'
+        result['security_level_text'] = 'Excellent'
+    elif score_percentage >= 60:
+        result['security_level'] = 'good'
+        result['security_level_text'] = 'Good'
+    elif score_percentage >= 40:
+        result['security_level'] = 'fair'
+        result['security_level_text'] = 'Fair'
+    else:
+        result['security_level'] = 'poor'
+        result['security_level_text'] = 'Poor'
+    
+    # Store response info
+    result['final_url'] = response.url
+    result['status_code'] = response.status_code
+    result['server'] = response.headers.get('Server', 'Unknown')
+    
+    # Analyze cookies for security flags
+    result['cookie_security'] = analyze_cookies(response)
+    
+    if tls_info:
+        result['tls_info'] = tls_info
+    
+    # Check CORS policy
+    cors_info = analyze_cors_headers(response.headers)
+    if cors_info:
+        result['cors_info'] = cors_info
+    
+    # Check for information disclosure
+    info_disclosure = check_information_disclosure(response.headers)
+    if info_disclosure:
+        result['information_disclosure'] = info_disclosure
+    
+    # Check for additional security-related headers
+    result['additional_headers'] = {}
+    security_related = ['Cache-Control', 'X-Powered-By', 'Server', 'Via', 'X-AspNet-Version']
+    for header in security_related:
+        if header in response.headers:
+            result['additional_headers'][header] = response.headers[header]
+    
+    # Recommendation about X-Powered-By
+    if 'X-Powered-By' in response.headers:
+        result['recommendations'].append('Remove X-Powered-By header to hide server technology')
+    
+    if 'Server' in response.headers and len(response.headers['Server']) > 0:
+        result['recommendations'].append('Consider removing or minimizing Server header to hide server version')
     
     return result
 
@@ -356,36 +366,39 @@ def check_tls_version(domain: str) -> Optional[Dict]:
         context = ssl.create_default_context()
         with socket.create_connection((domain, 443), timeout=5) as sock:
             with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                tls_version = ssock.version()
-                
-                info = {
-                    'version': tls_version,
-                    'version_name': tls_version.replace('TLS', 'TLS ').replace('PROTOCOL', '').strip(),
-                    'is_secure': False,
-                    'recommendation': None
-                }
-                
-                # TLS 1.3 is the latest and most secure
-                if 'TLSv1.3' in tls_version:
-                    info['is_secure'] = True
-                    info['security_level'] = 'excellent'
-                elif 'TLSv1.2' in tls_version:
-                    info['is_secure'] = True
-                    info['security_level'] = 'good'
-                    info['recommendation'] = 'Consider upgrading to TLS 1.3 for better security'
-                elif 'TLSv1.1' in tls_version or 'TLSv1.0' in tls_version:
-                    info['is_secure'] = True
-                    info['security_level'] = 'weak'
-                    info['recommendation'] = 'TLS 1.0/1.1 are deprecated - upgrade to TLS 1.2 or 1.3'
-                elif 'SSL' in tls_version:
-                    info['security_level'] = 'insecure'
-                    info['recommendation'] = 'SSL is deprecated and insecure - use TLS 1.2 or 1.3'
-                
-                return info
+                return describe_tls_version(ssock.version())
     except:
         return None
 
 
+def describe_tls_version(tls_version: str) -> Dict:
+    """Rate a negotiated protocol version (as returned by SSLSocket.version())."""
+    info = {
+        'version': tls_version,
+        'version_name': tls_version.replace('TLS', 'TLS ').replace('PROTOCOL', '').strip(),
+        'is_secure': False,
+        'recommendation': None
+    }
+    
+    # TLS 1.3 is the latest and most secure
+    if 'TLSv1.3' in tls_version:
+        info['is_secure'] = True
+        info['security_level'] = 'excellent'
+    elif 'TLSv1.2' in tls_version:
+        info['is_secure'] = True
+        info['security_level'] = 'good'
+        info['recommendation'] = 'Consider upgrading to TLS 1.3 for better security'
+    elif 'TLSv1.1' in tls_version or 'TLSv1.0' in tls_version:
+        info['is_secure'] = True
+        info['security_level'] = 'weak'
+        info['recommendation'] = 'TLS 1.0/1.1 are deprecated - upgrade to TLS 1.2 or 1.3'
+    elif 'SSL' in tls_version:
+        info['security_level'] = 'insecure'
+        info['recommendation'] = 'SSL is deprecated and insecure - use TLS 1.2 or 1.3'
+    
+    return info
+
+
 def analyze_cors_headers(headers: Dict) -> Optional[Dict]:
     """Analyze CORS (Cross-Origin Resource Sharing) headers."""
     cors_headers = {
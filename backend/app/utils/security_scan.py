@@ -0,0 +1,164 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .hsts_checker import check_hsts
+from .redirect_analyzer import analyze_redirect_chain
+from .security_headers_checker import check_security_headers
+from .ssl_checker import get_ssl_certificate_info
+
+logger = logging.getLogger(__name__)
+
+# Check name -> checker taking a domain; the HTTP ones share http_client's connection pool
+SCAN_CHECKS = {
+    'headers': check_security_headers,
+    'hsts': check_hsts,
+    'ssl': get_ssl_certificate_info,
+    'redirects': analyze_redirect_chain,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, int(getattr(settings, 'SECURITY_SCAN_WORKERS', 16)))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='app-scan')
+    return _executor
+
+
+def scan_concurrency() -> int:
+    """Checks one scan may have submitted at once (settings.SECURITY_SCAN_PER_SCAN), at most the pool size."""
+    workers = max(1, int(getattr(settings, 'SECURITY_SCAN_WORKERS', 16)))
+    return max(1, min(int(getattr(settings, 'SECURITY_SCAN_PER_SCAN', workers // 4)), workers))
+
+
+def normalize_domains(domains: Iterable[str]) -> List[str]:
+    """Strip scheme, path and whitespace; drop blanks and duplicates, keeping order."""
+    seen = {}
+    for domain in domains:
+        domain = (domain or '').strip().replace('https://', '').replace('http://', '').split('/')[0].lower()
+        if domain:
+            seen.setdefault(domain, None)
+    return list(seen)
+
+
+def blocked_address(domain: str) -> Optional[str]:
+    """The first non-public (private, loopback, link-local, reserved) address domain resolves to, or None.
+
+    A domain that does not resolve is not blocked: its checks report the lookup error.
+    settings.SECURITY_SCAN_ALLOW_PRIVATE turns the check off.
+    """
+    if getattr(settings, 'SECURITY_SCAN_ALLOW_PRIVATE', False):
+        return None
+    try:
+        host = urlsplit(f'//{domain}').hostname
+        addresses = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM) if host else []
+    except (OSError, UnicodeError, ValueError):
+        return None
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if not address.is_global or address.is_multicast:
+            return str(address)
+    return None
+
+
+def allow_scan(client: str) -> bool:
+    """Count a scan for ``client``; False once it has started settings.SECURITY_SCAN_RATE_LIMIT
+    scans in the current SECURITY_SCAN_RATE_WINDOW seconds. Allows the scan if the cache is down."""
+    limit = int(getattr(settings, 'SECURITY_SCAN_RATE_LIMIT', 20))
+    if limit <= 0:
+        return True
+    window = int(getattr(settings, 'SECURITY_SCAN_RATE_WINDOW', 3600))
+    key = f'security-scan:rate:{client}'
+    cache.add(key, 0, window)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # The window expired between add() and incr()
+        cache.set(key, 1, window)
+        count = 1
+    return not count or count <= limit
+
+
+def _run_check(name: str, domain: str) -> Dict:
+    try:
+        return SCAN_CHECKS[name](domain)
+    except Exception as e:
+        logger.exception("Security scan check %s failed for %s", name, domain)
+        return {'status': 'error', 'error': f'Unexpected error: {e}'}
+
+
+def scan_domains(domains: List[str], checks: List[str]) -> Iterator[Dict]:
+    """Run ``checks`` (SCAN_CHECKS keys) against every domain and yield one result per domain.
+
+    Each domain is first resolved (see blocked_address); one that points at a non-public
+    address gets an error for every check and is not contacted. Then each (domain, check)
+    pair is a task on the shared scan thread pool (settings.SECURITY_SCAN_WORKERS). A scan
+    has at most scan_concurrency() tasks submitted at a time, a fraction of the pool, so one
+    big scan leaves threads for the others; checks of resolved domains go before new lookups.
+    A domain is yielded, as {"domain", "results", "elapsed_ms"}, as soon as its last check
+    finishes. Closing the generator cancels the queued tasks.
+    """
+    executor = _get_executor()
+    limit = scan_concurrency()
+    lookups = iter(domains)
+    ready = deque()  # (domain, check) of domains that passed the lookup
+    remaining = {domain: len(checks) for domain in domains}
+    results = {domain: {} for domain in domains}
+    started = {}
+    pending = {}
+
+    def finished(domain):
+        return {
+            'domain': domain,
+            'results': results.pop(domain),
+            'elapsed_ms': round((time.perf_counter() - started.pop(domain)) * 1000.0, 1),
+        }
+
+    try:
+        while True:
+            while len(pending) < limit:
+                if ready:
+                    domain, name = ready.popleft()
+                    pending[executor.submit(_run_check, name, domain)] = (domain, name)
+                    continue
+                domain = next(lookups, None)
+                if domain is None:
+                    break
+                started[domain] = time.perf_counter()
+                pending[executor.submit(blocked_address, domain)] = (domain, None)
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                domain, name = pending.pop(future)
+                if name is None:
+                    address = future.result()
+                    if address is None:
+                        ready.extend((domain, check) for check in checks)
+                    else:
+                        error = {'status': 'error', 'error': f'{domain} resolves to {address}, which is not a public address.'}
+                        results[domain] = {check: error for check in checks}
+                        yield finished(domain)
+                    continue
+                results[domain][name] = future.result()
+                remaining[domain] -= 1
+                if remaining[domain] == 0:
+                    yield finished(domain)
+    finally:
+        for future in pending:
+            future.cancel()
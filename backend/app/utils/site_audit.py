@@ -0,0 +1,123 @@
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from . import hsts_checker, security_headers_checker
+from .checker_cache import cached_checker
+from .http_client import get_session, release_response, request_error
+from .redirect_analyzer import REDIRECT_STATUSES, analyze_redirect_chain
+from .ssl_checker import parse_certificate
+
+USER_AGENT = 'Mozilla/5.0 (compatible; Site-Audit/1.0)'
+
+# Body bytes read before a hop's response is released: a redirect body is usually a few hundred
+# bytes, and reading it lets the next hop reuse the connection. Larger bodies close it instead.
+REDIRECT_BODY_LIMIT = 16 * 1024
+FINAL_BODY_LIMIT = 256 * 1024
+
+
+class SiteCapture:
+    """Everything the analyzers need about a domain, from one redirect walk.
+
+    Each hop is a GET on the shared session without following redirects. The hop to
+    https://<domain> records its connection's certificate, protocol and cipher, so no
+    separate handshake is made; the last hop's response is the final page the header and
+    HSTS analyzers read. The analyzers only read headers, so a hop's body is read up to
+    REDIRECT_BODY_LIMIT (FINAL_BODY_LIMIT for the final page) and the response closed.
+    """
+
+    def __init__(self, domain: str, timeout: int):
+        self.domain = domain
+        self.timeout = timeout
+        self.requests = 0
+        self.response: Optional[requests.Response] = None
+        self.error: Optional[requests.exceptions.RequestException] = None
+        self.tls: Optional[Dict] = None
+
+    def fetch(self, url: str) -> requests.Response:
+        self.requests += 1
+        try:
+            response = get_session().get(url, headers={'User-Agent': USER_AGENT}, timeout=self.timeout,
+                                         allow_redirects=False, verify=True, stream=True)
+        except requests.exceptions.RequestException as e:
+            self.error = e
+            raise
+        if self.tls is None and urlparse(url).scheme == 'https' and urlparse(url).hostname == self.domain:
+            self.tls = self._peer_tls(response)
+        final = response.status_code not in REDIRECT_STATUSES or not response.headers.get('Location')
+        release_response(response, FINAL_BODY_LIMIT if final else REDIRECT_BODY_LIMIT)
+        self.response = response
+        return response
+
+    @staticmethod
+    def _peer_tls(response: requests.Response) -> Optional[Dict]:
+        connection = getattr(response.raw, 'connection', None)
+        sock = getattr(connection, 'sock', None)
+        if sock is None or not hasattr(sock, 'getpeercert'):
+            return None
+        return {'cert': sock.getpeercert(), 'version': sock.version(), 'cipher': sock.cipher()}
+
+
+def _fetch_failed(result: Dict, capture: SiteCapture, redirects: Dict) -> Dict:
+    if capture.error is not None:
+        result['status'], result['error'] = request_error(capture.error)
+    else:
+        result['status'] = 'error'
+        result['error'] = redirects.get('error') or 'Redirect chain did not reach a final page'
+    return result
+
+
+def _ssl_result(capture: SiteCapture) -> Dict:
+    if capture.tls is None:
+        if isinstance(capture.error, requests.exceptions.SSLError):
+            return {'error': f'SSL error: {capture.error}', 'status': 'error'}
+        if capture.error is not None:
+            return {'error': f'Error checking certificate: {request_error(capture.error)[1]}', 'status': 'error'}
+        return {'error': 'No TLS connection was made to the domain', 'status': 'error'}
+    info = parse_certificate(capture.domain, capture.tls['cert'])
+    name, protocol, bits = capture.tls['cipher'] or (None, None, None)
+    info['protocol'] = capture.tls['version']
+    info['cipher'] = {'name': name, 'protocol': protocol, 'bits': bits}
+    return info
+
+
+@cached_checker('audit')
+def audit_site(domain: str, timeout: int = 10, max_redirects: int = 20) -> Dict:
+    """SSL certificate, HSTS, security headers and redirect chain of a domain from one capture.
+
+    The separate checkers each fetch the site themselves (three GET chains, a HEAD chain and
+    two extra TLS handshakes); here the redirect walk is the only network traffic and its
+    connections are kept alive between hops. Returns {"domain", "ssl", "hsts", "headers",
+    "redirects", "requests", "elapsed_ms"}, each section shaped like its checker's result.
+    """
+    domain = domain.replace('https://', '').replace('http://', '').strip().strip('/').lower()
+    if not domain:
+        return {'error': 'Domain is required', 'status': 'error'}
+
+    start = time.perf_counter()
+    capture = SiteCapture(domain, timeout)
+    redirects = analyze_redirect_chain.uncached(f'https://{domain}', max_redirects=max_redirects, timeout=timeout,
+                                                fetch=capture.fetch)
+    reached_final = capture.response is not None and redirects.get('final_url') is not None
+
+    headers = security_headers_checker.empty_result(domain)
+    hsts = hsts_checker.empty_result(domain)
+    if reached_final:
+        tls_info = security_headers_checker.describe_tls_version(capture.tls['version']) if capture.tls else None
+        security_headers_checker.analyze_security_headers(headers, capture.response, tls_info)
+        hsts_checker.analyze_hsts(hsts, capture.response)
+    else:
+        _fetch_failed(headers, capture, redirects)
+        _fetch_failed(hsts, capture, redirects)
+
+    return {
+        'domain': domain,
+        'ssl': _ssl_result(capture),
+        'hsts': hsts,
+        'headers': headers,
+        'redirects': redirects,
+        'requests': capture.requests,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000.0, 1),
+    }
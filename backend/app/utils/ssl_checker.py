@@ -3,8 +3,10 @@ import socket
 from datetime import datetime
 from typing import Dict, Optional, List
 import certifi
+from .checker_cache import cached_checker
 
 
+@cached_checker('ssl')
 def get_ssl_certificate_info(domain: str, port: int = 443, timeout: int = 10) -> Dict:
     """
     Retrieve SSL certificate information for a given domain.
@@ -40,84 +42,7 @@ def get_ssl_certificate_info(domain: str, port: int = 443, timeout: int = 10) ->
                 except:
                     cert_der = None
                 
-                # Get certificate information
-                info = {}
-                
-                # Parse subject
-                subject = dict(x[0] for x in cert.get('subject', []))
-                info['subject'] = subject.get('commonName', '') or subject.get('CN', '')
-                if not info['subject']:
-                    info['subject'] = ', '.join([f"{k}={v}" for k, v in subject.items()])
-                
-                # Parse issuer
-                issuer = dict(x[0] for x in cert.get('issuer', []))
-                issuer_parts = []
-                if issuer.get('organizationName'):
-                    issuer_parts.append(issuer['organizationName'])
-                if issuer.get('organizationalUnitName'):
-                    issuer_parts.append(issuer['organizationalUnitName'])
-                if issuer.get('commonName'):
-                    issuer_parts.append(issuer['commonName'])
-                info['issuer'] = ', '.join(issuer_parts) if issuer_parts else ', '.join([f"{k}={v}" for k, v in issuer.items()])
-                
-                # Validity dates
-                valid_from_str = cert.get('notBefore', '')
-                valid_until_str = cert.get('notAfter', '')
-                
-                if valid_from_str:
-                    try:
-                        valid_from = datetime.strptime(valid_from_str, '%b %d %H:%M:%S %Y %Z')
-                        info['valid_from'] = valid_from.strftime('%Y-%m-%d %H:%M:%S UTC')
-                    except:
-                        info['valid_from'] = valid_from_str
-                
-                if valid_until_str:
-                    try:
-                        valid_until = datetime.strptime(valid_until_str, '%b %d %H:%M:%S %Y %Z')
-                        info['valid_until'] = valid_until.strftime('%Y-%m-%d %H:%M:%S UTC')
-                        
-                        # Calculate days until expiry
-                        now = datetime.utcnow()
-                        days_left = (valid_until - now).days
-                        info['days_until_expiry'] = days_left
-                        
-                        # Determine status
-                        if days_left < 0:
-                            info['status'] = 'expired'
-                        elif days_left <= 30:
-                            info['status'] = 'expiring_soon'
-                        else:
-                            info['status'] = 'valid'
-                    except:
-                        info['valid_until'] = valid_until_str
-                        info['status'] = 'unknown'
-                
-                # Serial number - get from certificate dict if available
-                if 'serialNumber' in cert:
-                    info['serial_number'] = str(cert['serialNumber'])
-                
-                # Version
-                if 'version' in cert:
-                    info['version'] = f"v{cert['version'] + 1}"
-                
-                # Subject Alternative Names
-                sans = []
-                for ext in cert.get('subjectAltName', []):
-                    if isinstance(ext, tuple) and len(ext) >= 2:
-                        sans.append(ext[1])
-                if sans:
-                    info['sans'] = sans
-                
-                # Domain matches
-                domain_match = False
-                if domain.lower() in info['subject'].lower():
-                    domain_match = True
-                elif sans and any(domain.lower() in san.lower() for san in sans):
-                    domain_match = True
-                
-                info['domain_match'] = domain_match
-                
-                return info
+                return parse_certificate(domain, cert)
                 
     except socket.gaierror as e:
         return {
@@ -140,3 +65,84 @@ def get_ssl_certificate_info(domain: str, port: int = 443, timeout: int = 10) ->
             'status': 'error'
         }
 
+
+def parse_certificate(domain: str, cert: Dict) -> Dict:
+    """Summarize a verified peer certificate (SSLSocket.getpeercert()) for domain."""
+    # Get certificate information
+    info = {}
+    
+    # Parse subject
+    subject = dict(x[0] for x in cert.get('subject', []))
+    info['subject'] = subject.get('commonName', '') or subject.get('CN', '')
+    if not info['subject']:
+        info['subject'] = ', '.join([f"{k}={v}" for k, v in subject.items()])
+    
+    # Parse issuer
+    issuer = dict(x[0] for x in cert.get('issuer', []))
+    issuer_parts = []
+    if issuer.get('organizationName'):
+        issuer_parts.append(issuer['organizationName'])
+    if issuer.get('organizationalUnitName'):
+        issuer_parts.append(issuer['organizationalUnitName'])
+    if issuer.get('commonName'):
+        issuer_parts.append(issuer['commonName'])
+    info['issuer'] = ', '.join(issuer_parts) if issuer_parts else ', '.join([f"{k}={v}" for k, v in issuer.items()])
+    
+    # Validity dates
+    valid_from_str = cert.get('notBefore', '')
+    valid_until_str = cert.get('notAfter', '')
+    
+    if valid_from_str:
+        try:
+            valid_from = datetime.strptime(valid_from_str, '%b %d %H:%M:%S %Y %Z')
+            info['valid_from'] = valid_from.strftime('%Y-%m-%d %H:%M:%S UTC')
+        except:
+            info['valid_from'] = valid_from_str
+    
+    if valid_until_str:
+        try:
+            valid_until = datetime.strptime(valid_until_str, '%b %d %H:%M:%S %Y %Z')
+            info['valid_until'] = valid_until.strftime('%Y-%m-%d %H:%M:%S UTC')
+            
+            # Calculate days until expiry
+            now = datetime.utcnow()
+            days_left = (valid_until - now).days
+            info['days_until_expiry'] = days_left
+            
+            # Determine status
+            if days_left < 0:
+                info['status'] = 'expired'
+            elif days_left <= 30:
+                info['status'] = 'expiring_soon'
+            else:
+                info['status'] = 'valid'
+        except:
+            info['valid_until'] = valid_until_str
+            info['status'] = 'unknown'
+    
+    # Serial number - get from certificate dict if available
+    if 'serialNumber' in cert:
+        info['serial_number'] = str(cert['serialNumber'])
+    
+    # Version
+    if 'version' in cert:
+        info['version'] = f"v{cert['version'] + 1}"
+    
+    # Subject Alternative Names
+    sans = []
+    for ext in cert.get('subjectAltName', []):
+        if isinstance(ext, tuple) and len(ext) >= 2:
+            sans.append(ext[1])
+    if sans:
+        info['sans'] = sans
+    
+    # Domain matches
+    domain_match = False
+    if domain.lower() in info['subject'].lower():
+        domain_match = True
+    elif sans and any(domain.lower() in san.lower() for san in sans):
+        domain_match = True
+    
+    info['domain_match'] = domain_match
+    
+    return info
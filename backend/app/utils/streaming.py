@@ -0,0 +1,47 @@
+import threading
+from typing import Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_DONE = object()
+
+
+class ThreadedAsyncIterator:
+    """Async iterator over a blocking one: each next() runs on a worker thread.
+
+    Under ASGI, StreamingHttpResponse buffers a sync iterator whole (sync_to_async(list))
+    before sending anything; this hands it one chunk at a time instead. close() closes the
+    wrapped iterator, after any next() still running on its thread, so cleanup the
+    iterator does on close (see batch.BatchZipStream) also runs under ASGI.
+    """
+
+    def __init__(self, iterable: Iterable[bytes]):
+        self._iterator = iter(iterable)
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            return next(self._iterator, _DONE)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await sync_to_async(self._next, thread_sensitive=False)()
+        if chunk is _DONE:
+            raise StopAsyncIteration
+        return chunk
+
+    def close(self):
+        with self._lock:
+            close = getattr(self._iterator, 'close', None)
+            if close is not None:
+                close()
+
+
+def streaming_content(request, iterable: Iterable[bytes]):
+    """StreamingHttpResponse content for ``iterable`` suited to the handler serving ``request``."""
+    if isinstance(request, ASGIRequest):
+        return ThreadedAsyncIterator(iterable)
+    return iterable
@@ -0,0 +1,182 @@
+import struct
+import zlib
+from typing import Iterator, Tuple
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+# Operations with a strip-by-strip implementation (see image_tools), with the name used in
+# errors; everything else needs the whole decoded image plus its own full-size working copies
+TILED_OPERATIONS = {
+    'exif_strip': 'EXIF removal',
+    'watermark': 'Watermarking',
+    'bg_remove': 'Background removal',
+    'format': 'Format conversion',
+}
+
+# Size of the working buffer a strip is read into, regardless of image size
+TILE_BUFFER_BYTES = 16 * 1024 * 1024
+
+# Bytes per pixel of Pillow's in-memory storage (RGB and LA are padded to 4 bytes)
+_PIXEL_BYTES = {'1': 1, 'L': 1, 'P': 1, 'I;16': 2}
+
+_PNG_COLOR_TYPES = {'L': 0, 'RGB': 2, 'LA': 4, 'RGBA': 6}
+
+
+class TilingError(Exception):
+    """An image operation cannot run within the per-request memory ceiling."""
+
+
+def memory_limit() -> int:
+    """Per-request memory ceiling for image processing, in bytes."""
+    return int(getattr(settings, 'IMAGE_MEMORY_LIMIT_MB', 1024)) * 1024 * 1024
+
+
+def decoded_bytes(size: Tuple[int, int], mode: str) -> int:
+    """Memory Pillow needs for a decoded image of this size and mode."""
+    return size[0] * size[1] * _PIXEL_BYTES.get(mode, 4)
+
+
+def should_tile(img: Image.Image) -> bool:
+    """Whether img is large enough for the strip-by-strip path (settings.IMAGE_TILING_MIN_MEGAPIXELS)."""
+    threshold = float(getattr(settings, 'IMAGE_TILING_MIN_MEGAPIXELS', 16))
+    return img.width * img.height >= threshold * 1_000_000
+
+
+def check_budget(img: Image.Image, operation: str, extra_bytes_per_pixel: float = 0) -> int:
+    """Raise TilingError unless ``operation`` on img fits the per-request memory ceiling.
+
+    ``operation`` is a key of TILED_OPERATIONS, or a description of an operation that cannot
+    be tiled (the error then says so).
+
+    Call it on an opened but not yet loaded image, so nothing is decoded when the request is
+    refused. The estimate is the decoded source, plus ``extra_bytes_per_pixel`` for any
+    full-size buffer the operation keeps (a mask, a converted copy), plus the strip buffers.
+    Returns the estimate in bytes.
+    """
+    pixels = img.width * img.height
+    needed = decoded_bytes(img.size, img.mode) + int(pixels * extra_bytes_per_pixel) + 2 * TILE_BUFFER_BYTES
+    limit = memory_limit()
+    if needed > limit:
+        size = f"{img.width}x{img.height} ({pixels / 1_000_000:.1f} MP)"
+        if operation in TILED_OPERATIONS:
+            raise TilingError(
+                f"{TILED_OPERATIONS[operation]} of this {size} image needs about {needed // 2**20} MB even when "
+                f"processed in strips, over the {limit // 2**20} MB per-request limit."
+            )
+        raise TilingError(
+            f"{operation} cannot be processed in tiles and the {size} image needs about {needed // 2**20} MB, "
+            f"over the {limit // 2**20} MB per-request limit."
+        )
+    return needed
+
+
+def strip_rows(width: int, bytes_per_pixel: int = 4) -> int:
+    """Rows per strip so one strip fills TILE_BUFFER_BYTES."""
+    return max(1, TILE_BUFFER_BYTES // max(1, width * bytes_per_pixel))
+
+
+def iter_strips(img: Image.Image, mode: str = None, rows: int = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (top, pixels) for consecutive horizontal strips of img, converted to ``mode``."""
+    rows = rows or strip_rows(img.width)
+    for top in range(0, img.height, rows):
+        strip = img.crop((0, top, img.width, min(img.height, top + rows)))
+        if mode and strip.mode != mode:
+            strip = strip.convert(mode)
+        yield top, np.asarray(strip)
+
+
+def png_mode_for(img: Image.Image) -> str:
+    """Mode PngStripWriter should write img in (its own mode when PNG supports it directly)."""
+    if img.mode in _PNG_COLOR_TYPES:
+        return img.mode
+    has_alpha = img.mode in ('PA', 'RGBa', 'La') or 'transparency' in img.info
+    return 'RGBA' if has_alpha else 'RGB'
+
+
+def convert_strips(img: Image.Image, mode: str) -> Image.Image:
+    """img.convert(mode) done strip by strip, so only the result is allocated at full size."""
+    out = Image.new(mode, img.size)
+    rows = strip_rows(img.width)
+    for top in range(0, img.height, rows):
+        out.paste(img.crop((0, top, img.width, min(img.height, top + rows))).convert(mode), (0, top))
+    return out
+
+
+def flatten_on_white_strips(img: Image.Image) -> Image.Image:
+    """flatten_on_white without full-size temporaries: strips are composited onto one RGB image."""
+    out = Image.new('RGB', img.size, (255, 255, 255))
+    rows = strip_rows(img.width)
+    for top in range(0, img.height, rows):
+        strip = img.crop((0, top, img.width, min(img.height, top + rows)))
+        if strip.mode != 'RGBA':
+            strip = strip.convert('RGBA')
+        out.paste(strip, (0, top), strip)
+    return out
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+
+class PngStripWriter:
+    """Write an 8-bit PNG from horizontal strips, so the full image never exists in memory.
+
+    Rows use the Sub filter (computed with numpy, into one reused buffer) and are deflated as
+    they arrive. Only the pixel data is written: no EXIF, text or colour-profile chunks.
+
+        with PngStripWriter(path, (width, height), 'RGBA') as png:
+            for top, strip in strips:
+                png.write(strip)
+    """
+
+    def __init__(self, path, size: Tuple[int, int], mode: str, compress_level: int = 6):
+        if mode not in _PNG_COLOR_TYPES:
+            raise ValueError(f"PngStripWriter does not support mode {mode}")
+        self.width, self.height = size
+        self.bands = len(mode)
+        self.rows_written = 0
+        self._buffer = None
+        self._deflate = zlib.compressobj(compress_level)
+        self._file = open(path, 'wb')
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        self._file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, _PNG_COLOR_TYPES[mode], 0, 0, 0)))
+
+    def write(self, pixels: np.ndarray):
+        """Append rows; ``pixels`` is a (rows, width[, bands]) uint8 array."""
+        rows = pixels.shape[0]
+        flat = pixels.reshape(rows, self.width * self.bands)
+        if self._buffer is None or self._buffer.shape[0] < rows:
+            self._buffer = np.empty((rows, 1 + self.width * self.bands), np.uint8)
+        out = self._buffer[:rows]
+        out[:, 0] = 1  # Sub filter: each byte minus the same channel of the pixel to its left
+        out[:, 1:1 + self.bands] = flat[:, :self.bands]
+        np.subtract(flat[:, self.bands:], flat[:, :-self.bands], out=out[:, 1 + self.bands:])
+        self._emit(self._deflate.compress(out))
+        self.rows_written += rows
+
+    def _emit(self, data: bytes):
+        if data:
+            self._file.write(_chunk(b'IDAT', data))
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"PNG expects {self.height} rows, got {self.rows_written}")
+            self._emit(self._deflate.flush())
+            self._file.write(_chunk(b'IEND', b''))
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+        return False
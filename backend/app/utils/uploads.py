@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Union
+
+from django.utils.text import get_valid_filename
+from PIL import Image
+
+# Utils accept either a filesystem path or a readable, seekable file-like object
+# (a Django UploadedFile, BytesIO, ...). These helpers hide the difference.
+Source = Union[str, os.PathLike, object]
+
+
+def is_path(src: Source) -> bool:
+    return isinstance(src, (str, os.PathLike))
+
+
+def rewind(src: Source):
+    """Seek a file-like source back to the start so it can be read again."""
+    if not is_path(src) and hasattr(src, 'seek'):
+        src.seek(0)
+
+
+def source_name(src: Source) -> str:
+    if is_path(src):
+        return os.fspath(src)
+    return getattr(src, 'name', None) or 'upload'
+
+
+def source_stem(src: Source) -> str:
+    return Path(source_name(src)).stem
+
+
+def source_size(src: Source) -> int:
+    """Size in bytes without reading the content."""
+    if is_path(src):
+        return os.path.getsize(src)
+    size = getattr(src, 'size', None)
+    if size is not None:
+        return size
+    pos = src.tell()
+    src.seek(0, os.SEEK_END)
+    size = src.tell()
+    src.seek(pos)
+    return size
+
+
+def read_source_bytes(src: Source) -> bytes:
+    if is_path(src):
+        with open(src, 'rb') as f:
+            return f.read()
+    rewind(src)
+    return src.read()
+
+
+@contextmanager
+def open_binary(src: Source):
+    """Binary file object for a path (closed on exit) or a file-like source (rewound, left open)."""
+    if is_path(src):
+        with open(src, 'rb') as f:
+            yield f
+        return
+    rewind(src)
+    yield src
+
+
+def open_image(src: Source) -> Image.Image:
+    """Image.open for a path or a file-like source (rewound first, never closed here)."""
+    rewind(src)
+    return Image.open(src)
+
+
+def _materialize(uploaded_file) -> str:
+    """Put the upload on disk under its own (sanitized) name in a private temp directory.
+
+    Disk-backed uploads are hard-linked when possible, so no bytes are copied.
+    """
+    work_dir = tempfile.mkdtemp(prefix='upload-')
+    path = os.path.join(work_dir, get_valid_filename(Path(uploaded_file.name or '').name) or 'upload')
+    try:
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            try:
+                os.link(uploaded_file.temporary_file_path(), path)
+            except OSError:
+                shutil.copyfile(uploaded_file.temporary_file_path(), path)
+        else:
+            with open(path, 'wb') as f:
+                for chunk in uploaded_file.chunks():
+                    f.write(chunk)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return path
+
+
+@contextmanager
+def ingest_upload(uploaded_file, require_path: bool = False):
+    """Hand an uploaded file to the utils without a round-trip through /tmp.
+
+    By default the upload object itself is yielded: Django already holds it either in
+    memory or in its own temporary file, and Pillow/OpenCV read it directly. With
+    ``require_path`` (poppler needs a real file) a path is yielded instead and removed
+    on exit.
+    """
+    if not require_path:
+        uploaded_file.seek(0)
+        yield uploaded_file
+        return
+
+    path = _materialize(uploaded_file)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def persist_upload(uploaded_file) -> str:
+    """Return a path to the upload that outlives the request (for background jobs).
+
+    The file sits alone in a temporary directory; pass that directory
+    (``os.path.dirname(path)``) as the job's cleanup path.
+    """
+    return _materialize(uploaded_file)
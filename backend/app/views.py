@@ -1,24 +1,72 @@
 from django.shortcuts import render
+from django.http import JsonResponse, Http404, StreamingHttpResponse
+from django.core.exceptions import TooManyFilesSent
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.urls import reverse
 from django.views import View
 from django.views.generic import TemplateView
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.core.cache import cache
 from .utils.email_validator import EmailValidator,InvalidEmailSyntax,DomainDoesNotExist,NoMXRecordsFound,EmailNotFound,EmailValidationError
-from .utils.dv_tools import process_dv_image
 from django.conf import settings
 from pathlib import Path
-from .utils.image_tools import compress_image_to_target, resize_or_crop_image, remove_background_whiteish, remove_background_ai, extract_exif, remove_exif, add_watermark
-from .utils.qr_tools import generate_qr_png, decode_qr_image, generate_barcode_png
-from .utils.ssl_checker import get_ssl_certificate_info
+from .utils.lazy_imports import lazy_callable, import_times
+from .utils.model_sessions import session_metrics
+from .utils.jobs import submit_job, get_job
+from .utils.uploads import ingest_upload, persist_upload
+from .utils.metadata import extract_exif, extract_exif_batch
+from .utils.batch import stream_batch_zip
+from .utils.streaming import streaming_content
 from .utils.hash_identifier import identify_hash
-from .utils.hsts_checker import check_hsts
-from .utils.security_headers_checker import check_security_headers
-from .utils.redirect_analyzer import analyze_redirect_chain
-from .utils.domain_age_checker import get_domain_age
-from .utils.pdf_tools import pdf_to_images
-import json, time
+from .utils.async_checks import (get_ssl_certificate_info, check_hsts, check_security_headers,
+                                 analyze_redirect_chain, get_domain_age)
+from .utils.security_scan import SCAN_CHECKS, allow_scan, normalize_domains, scan_domains
+from .utils.site_audit import audit_site
+from .utils.checker_cache import checker_cache_metrics
+from abc import ABCMeta, abstractmethod
+import json, os, shutil, time
 import jwt
 
+# Image/PDF/QR utils pull in rembg, OpenCV, NumPy and pdf2image. They are resolved
+# on first use so template-only pages and the network checkers boot without them.
+process_dv_image = lazy_callable('app.utils.dv_tools', 'process_dv_image')
+compress_image_to_target = lazy_callable('app.utils.image_tools', 'compress_image_to_target')
+resize_or_crop_image = lazy_callable('app.utils.image_tools', 'resize_or_crop_image')
+remove_background_whiteish = lazy_callable('app.utils.image_tools', 'remove_background_whiteish')
+remove_background_ai = lazy_callable('app.utils.image_tools', 'remove_background_ai')
+remove_exif = lazy_callable('app.utils.image_tools', 'remove_exif')
+add_watermark = lazy_callable('app.utils.image_tools', 'add_watermark')
+generate_qr_png = lazy_callable('app.utils.qr_tools', 'generate_qr_png')
+decode_qr_image = lazy_callable('app.utils.qr_tools', 'decode_qr_image')
+generate_barcode_png = lazy_callable('app.utils.qr_tools', 'generate_barcode_png')
+pdf_to_images = lazy_callable('app.utils.pdf_tools', 'pdf_to_images')
+run_pipeline = lazy_callable('app.utils.image_pipeline', 'run_pipeline')
+validate_pipeline_steps = lazy_callable('app.utils.image_pipeline', 'validate_steps')
+
+class AsyncJobMixin:
+    """Optional background-job mode for heavy tools.
+
+    When settings.ASYNC_JOBS_ENABLED is on and the client asks for it (``async=1`` or an
+    ``Accept: application/json`` header), the work is queued on the local job pool and a
+    job id is returned straight away; progress and output URLs come from JobStatus.
+    """
+    job_kind = None
+
+    def wants_async(self, request):
+        if not getattr(settings, 'ASYNC_JOBS_ENABLED', False):
+            return False
+        return request.POST.get('async') == '1' or 'application/json' in request.headers.get('Accept', '')
+
+    def enqueue(self, func, *args, cleanup=(), **kwargs):
+        job_id = submit_job(self.job_kind, func, *args, cleanup=cleanup, **kwargs)
+        return JsonResponse({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': reverse('app_app:api_job_status', args=[job_id]),
+        }, status=202)
+
 class HomePageView(TemplateView):
     
     template_name = "app/index.html"
@@ -51,15 +99,15 @@ class EmailChecker(View):
     template_name = "app/email-checker.html"
     CACHE_TIMEOUT = 60 * 60 * 24 * 7
 
-    def get(self, request):
+    async def get(self, request):
         return render(request, self.template_name)
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         email = request.POST.get("email", "")
         cache_key = f'email_check_{email}'
 
         # Check if the result is already cached
-        cached_result = cache.get(cache_key)
+        cached_result = await cache.aget(cache_key)
         if cached_result is not None:
             # Display cached message based on type
             msg_type = cached_result['type']
@@ -68,28 +116,28 @@ class EmailChecker(View):
             return render(request, self.template_name)
 
         try:
-            _, msg = EmailValidator(email).validate()
+            _, msg = await EmailValidator(email).avalidate()
             # Cache the success message with its type
-            cache.set(cache_key, {'type': 'success', 'message': msg}, timeout=self.CACHE_TIMEOUT)
+            await cache.aset(cache_key, {'type': 'success', 'message': msg}, timeout=self.CACHE_TIMEOUT)
             messages.success(request, msg)
 
         except DomainDoesNotExist as e:
-            cache.set(cache_key, {'type': 'info', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
+            await cache.aset(cache_key, {'type': 'info', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
             messages.info(request, str(e))
         except NoMXRecordsFound as e:
-            cache.set(cache_key, {'type': 'info', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
+            await cache.aset(cache_key, {'type': 'info', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
             messages.info(request, str(e))
         except InvalidEmailSyntax as e:
-            cache.set(cache_key, {'type': 'error', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
+            await cache.aset(cache_key, {'type': 'error', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
             messages.error(request, str(e))
         except EmailNotFound as e:
-            cache.set(cache_key, {'type': 'error', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
+            await cache.aset(cache_key, {'type': 'error', 'message': str(e)}, timeout=self.CACHE_TIMEOUT)
             messages.error(request, str(e))
         except EmailValidationError as e:
-            cache.set(cache_key, {'type': 'error', 'message': f"The email '{email}' does not exist."}, timeout=self.CACHE_TIMEOUT)
+            await cache.aset(cache_key, {'type': 'error', 'message': f"The email '{email}' does not exist."}, timeout=self.CACHE_TIMEOUT)
             messages.error(request, f"The email '{email}' does not exist.")
         except Exception as e:
-            cache.set(cache_key, {'type': 'error', 'message': f"An unexpected error occurred: {str(e)}"}, timeout=self.CACHE_TIMEOUT)
+            await cache.aset(cache_key, {'type': 'error', 'message': f"An unexpected error occurred: {str(e)}"}, timeout=self.CACHE_TIMEOUT)
             messages.error(request, f"An unexpected error occurred: {str(e)}")
 
         return render(request, self.template_name)
@@ -138,22 +186,31 @@ class PrivacyPolicy(TemplateView):
 class TermsAndConditions(TemplateView):
     template_name = "app/terms-and-conditions.html"
 
-class DVPhotoTool(View):
+class DVPhotoTool(AsyncJobMixin, View):
     template_name = "app/dv-photo-tool.html"
     media_dir = Path(settings.MEDIA_ROOT).resolve()
+    job_kind = "dv_photo"
     
     def get(self,request):
         return render(request,self.template_name)
     
     def post(self,request,*args,**kwargs):
-        context = {}
         image_file = request.FILES["photo"]
-        image_path = f"/tmp/{image_file.name}"
-        with open(image_path, 'wb') as f:
-            for chunk in image_file.chunks():
-                f.write(chunk)
-        result, success = process_dv_image(self.media_dir,image_path)
+        if self.wants_async(request):
+            image_path = persist_upload(image_file)
+            return self.enqueue(self.process, image_path, cleanup=[os.path.dirname(image_path)])
+        with ingest_upload(image_file) as image_src:
+            context, _ = self.process(image_src)
+        return render(request,self.template_name,context)
+
+    @classmethod
+    def process(cls, image_path, progress=None):
+        context = {}
+        timings = {}
+        result, success = process_dv_image(cls.media_dir,image_path,timings=timings)
         context["success"] = success
+        # decode/detect/crop/encode milliseconds, returned with background-job results
+        context["timings"] = timings
 
         def _dedupe_preserve(seq):
             seen = set()
@@ -178,41 +235,69 @@ class DVPhotoTool(View):
                 "dv_actions": _dedupe_preserve(fixed),
                 "image": f'{settings.MEDIA_URL}{result[-1]}',
             })
-        return render(request,self.template_name,context)
+        # A DV check that finds issues is still a completed job; the issues are the result
+        return context, True
 
-class ImageCompressor(View):
+class ImageCompressor(AsyncJobMixin, View):
     template_name = "app/image-compressor.html"
     media_dir = Path(settings.MEDIA_ROOT).resolve()
+    job_kind = "image_compressor"
 
     def get(self, request):
         return render(request, self.template_name)
 
     def post(self, request, *args, **kwargs):
-        context = {}
         image_file = request.FILES.get("image")
         quality = int(request.POST.get("quality", 75))
         out_fmt = request.POST.get("format", "jpg").lower()
+        allow_scale = request.POST.get("allow_scale") == "on"
+        profile = request.POST.get("profile") or None
         if not image_file:
             return render(request, self.template_name, {"errors": ["Please select an image to compress."]})
+        try:
+            target_kb = float(request.POST.get("target_kb") or 0) or None
+        except ValueError:
+            return render(request, self.template_name, {"errors": ["Target size must be a number of KB."]})
+
+        if self.wants_async(request):
+            image_path = persist_upload(image_file)
+            return self.enqueue(self.process, image_path, quality, out_fmt, target_kb, allow_scale, profile,
+                                cleanup=[os.path.dirname(image_path)])
+        with ingest_upload(image_file) as image_src:
+            context, _ = self.process(image_src, quality, out_fmt, target_kb, allow_scale, profile)
+        return render(request, self.template_name, context)
 
-        tmp_path = f"/tmp/{image_file.name}"
-        with open(tmp_path, 'wb') as f:
-            for chunk in image_file.chunks():
-                f.write(chunk)
-
-        result, success = compress_image_to_target(self.media_dir, tmp_path, quality=quality, output_format=out_fmt)
+    @classmethod
+    def process(cls, image_src, quality, out_fmt, target_kb=None, allow_scale=False, profile=None, progress=None):
+        result, success = compress_image_to_target(cls.media_dir, image_src, quality=quality, output_format=out_fmt,
+                                                   target_kb=target_kb, allow_scale=allow_scale, profile=profile)
         if not success:
-            context["errors"] = result.get("errors", ["Compression failed."])
-        else:
+            return {"errors": result.get("errors", ["Compression failed."])}, False
+        context = {
+            "original_kb": f"{result['original_size_kb']:.2f}",
+            "compressed_kb": f"{result['compressed_size_kb']:.2f}",
+            "saved_percent": f"{result['saved_percent']:.1f}",
+            "image_url": f"{settings.MEDIA_URL}{result['output_name']}",
+            "format": result.get("format", out_fmt).upper(),
+            "quality": result.get("quality", quality),
+        }
+        if "auto" in result:
+            auto = result["auto"]
+            context["auto"] = dict(auto, search_ms=f"{auto['search_ms']:.0f}")
+            if not auto["met_floor"]:
+                context["warnings"] = [f"No encoder reached SSIM {auto['min_ssim']:g}; the closest result was kept."]
+        if target_kb:
             context.update({
-                "original_kb": f"{result['original_size_kb']:.2f}",
-                "compressed_kb": f"{result['compressed_size_kb']:.2f}",
-                "saved_percent": f"{result['saved_percent']:.1f}",
-                "image_url": f"{settings.MEDIA_URL}{result['output_name']}",
-                "format": out_fmt.upper(),
-                "quality": quality,
+                "target_kb": target_kb,
+                "met_target": result["met_target"],
+                "scale_percent": round(result["scale"] * 100),
+                "iterations": result["iterations"],
+                "search_ms": f"{result['search_ms']:.0f}",
+                "allow_scale": allow_scale,
             })
-        return render(request, self.template_name, context)
+            if not result["met_target"]:
+                context.setdefault("warnings", []).append(f"Could not reach {target_kb:g} KB; this is the smallest result found.")
+        return context, True
 
 class ImageResizer(View):
     template_name = "app/image-resizer.html"
@@ -236,12 +321,8 @@ class ImageResizer(View):
         fmt = request.POST.get("format", "jpg")
         quality = int(request.POST.get("quality", 85))
 
-        tmp_path = f"/tmp/{image_file.name}"
-        with open(tmp_path, 'wb') as f:
-            for chunk in image_file.chunks():
-                f.write(chunk)
-
-        result, success = resize_or_crop_image(self.media_dir, tmp_path, width, height, mode=mode, output_format=fmt, quality=quality)
+        with ingest_upload(image_file) as image_src:
+            result, success = resize_or_crop_image(self.media_dir, image_src, width, height, mode=mode, output_format=fmt, quality=quality)
         if not success:
             return render(request, self.template_name, {"errors": result.get("errors", ["Resize failed."])})
 
@@ -299,9 +380,10 @@ class QRCodeGenerator(View):
 class MarkdownHtmlConverter(TemplateView):
     template_name = "app/markdown-html-converter.html"
 
-class ImageBackgroundRemover(View):
+class ImageBackgroundRemover(AsyncJobMixin, View):
     template_name = "app/image-background-remover.html"
     media_dir = Path(settings.MEDIA_ROOT).resolve()
+    job_kind = "image_background_remover"
 
     def get(self, request):
         return render(request, self.template_name)
@@ -310,24 +392,32 @@ class ImageBackgroundRemover(View):
         imgf = request.FILES.get('image')
         tol = int(request.POST.get('tolerance', '20') or 20)
         smooth = request.POST.get('smooth', 'on') == 'on'
+        border_only = request.POST.get('border_only') == 'on'
         if not imgf:
             return render(request, self.template_name, {"errors": ["Please select an image."]})
-        tmp_path = f"/tmp/{imgf.name}"
-        with open(tmp_path, 'wb') as f:
-            for chunk in imgf.chunks():
-                f.write(chunk)
+        if self.wants_async(request):
+            image_path = persist_upload(imgf)
+            return self.enqueue(self.process, image_path, tol, smooth, border_only, cleanup=[os.path.dirname(image_path)])
+        with ingest_upload(imgf) as image_src:
+            context, _ = self.process(image_src, tol, smooth, border_only)
+        return render(request, self.template_name, context)
+
+    @classmethod
+    def process(cls, image_src, tol, smooth, border_only=False, progress=None):
         # Try AI remover first; fallback to near-white remover if unavailable or failed
-        result, success = remove_background_ai(self.media_dir, tmp_path)
+        result, success = remove_background_ai(cls.media_dir, image_src)
         if not success:
-            result, success = remove_background_whiteish(self.media_dir, tmp_path, tolerance=tol, smooth=smooth)
+            result, success = remove_background_whiteish(cls.media_dir, image_src, tolerance=tol, smooth=smooth,
+                                                         border_only=border_only)
         if not success:
-            return render(request, self.template_name, {"errors": result.get('errors', ["Background removal failed."])})
-        return render(request, self.template_name, {
+            return {"errors": result.get('errors', ["Background removal failed."])}, False
+        return {
             "image_url": f"{settings.MEDIA_URL}{result['output_name']}",
             "tolerance": tol,
             "smooth": smooth,
+            "border_only": border_only,
             "size_kb": f"{result.get('size_kb', 0):.2f}",
-        })
+        }, True
 
 class ImageWatermarker(View):
     template_name = "app/image-watermarker.html"
@@ -356,34 +446,23 @@ class ImageWatermarker(View):
         except:
             text_color = (255, 255, 255)
         
-        # Save uploaded files
-        tmp_image_path = f"/tmp/{image_file.name}"
-        with open(tmp_image_path, 'wb') as f:
-            for chunk in image_file.chunks():
-                f.write(chunk)
-        
-        watermark_image_path = None
-        if watermark_image_file:
-            watermark_image_path = f"/tmp/{watermark_image_file.name}"
-            with open(watermark_image_path, 'wb') as f:
-                for chunk in watermark_image_file.chunks():
-                    f.write(chunk)
-        
-        if not watermark_text and not watermark_image_path:
+        if not watermark_text and not watermark_image_file:
             return render(request, self.template_name, {"errors": ["Please provide either watermark text or watermark image."]})
         
-        result, success = add_watermark(
-            self.media_dir,
-            tmp_image_path,
-            watermark_text=watermark_text if watermark_text else None,
-            watermark_image_path=watermark_image_path,
-            position=position,
-            opacity=opacity,
-            font_size=font_size,
-            text_color=text_color,
-            output_format=output_format,
-            quality=quality
-        )
+        # Uploads are read in place (memory or Django's own temp file), not copied to /tmp
+        with ingest_upload(image_file) as image_src:
+            result, success = add_watermark(
+                self.media_dir,
+                image_src,
+                watermark_text=watermark_text if watermark_text else None,
+                watermark_image_path=watermark_image_file,
+                position=position,
+                opacity=opacity,
+                font_size=font_size,
+                text_color=text_color,
+                output_format=output_format,
+                quality=quality
+            )
         
         if not success:
             return render(request, self.template_name, {
@@ -428,11 +507,8 @@ class QRCodeScanner(View):
         image_file = request.FILES.get('image')
         if not image_file:
             return render(request, self.template_name, {"errors": ["Please select an image with a QR code."]})
-        tmp_path = f"/tmp/{image_file.name}"
-        with open(tmp_path, 'wb') as f:
-            for chunk in image_file.chunks():
-                f.write(chunk)
-        result, success = decode_qr_image(tmp_path)
+        with ingest_upload(image_file) as image_src:
+            result, success = decode_qr_image(image_src)
         if not success:
             return render(request, self.template_name, {"errors": result.get('errors', ["Failed to decode QR code."])})
         decoded = result.get('results', [])
@@ -473,20 +549,239 @@ class ExifTool(View):
         image_file = request.FILES.get('image')
         if not image_file:
             return render(request, self.template_name, {"errors": ["Please select an image."]})
-        tmp_path = f"/tmp/{image_file.name}"
-        with open(tmp_path, 'wb') as f:
-            for chunk in image_file.chunks():
-                f.write(chunk)
         if action == 'remove':
-            result, success = remove_exif(self.media_dir, tmp_path)
+            with ingest_upload(image_file) as image_src:
+                result, success = remove_exif(self.media_dir, image_src)
             if not success:
                 return render(request, self.template_name, {"errors": result.get('errors', ["Failed to remove EXIF"])})
-            return render(request, self.template_name, {"removed": True, "image_url": f"{settings.MEDIA_URL}{result['output_name']}"})
+            return render(request, self.template_name, {
+                "removed": True,
+                "image_url": f"{settings.MEDIA_URL}{result['output_name']}",
+                "format": result.get('format', 'png').upper(),
+                "removed_segments": result.get('removed', []),
+                "reencoded": result.get('reencoded', True),
+                "size_kb": f"{result.get('size_kb', 0):.2f}",
+            })
         else:
-            result, success = extract_exif(tmp_path)
+            with ingest_upload(image_file) as image_src:
+                result, success = extract_exif(image_src)
             if not success:
                 return render(request, self.template_name, {"errors": result.get('errors', ["Failed to extract EXIF"])})
-            return render(request, self.template_name, {"exif_checked": True, "exif": result.get('exif', {})})
+            exif = dict(result.get('exif', {}), **result.get('gps', {}))
+            return render(request, self.template_name, {"exif_checked": True, "exif": exif})
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExifAPI(View):
+    """EXIF of one or more images as JSON, read from the metadata segments only.
+
+    POST multipart with one or more ``images`` files (``image`` is accepted too). Each result
+    has name, ok, format, exif and gps, or errors.
+    """
+    max_files = 50
+
+    def post(self, request, *args, **kwargs):
+        files = request.FILES.getlist('images') + request.FILES.getlist('image')
+        if not files:
+            return JsonResponse({'errors': ['Please select at least one image.']}, status=400)
+        if len(files) > self.max_files:
+            return JsonResponse({'errors': [f'At most {self.max_files} images per request.']}, status=400)
+        return JsonResponse({'count': len(files), 'results': extract_exif_batch(files)})
+
+# The CSRF check reads the form, after which the upload handlers cannot change: it runs in
+# _post() (csrf_protect) once post() has switched to disk-backed uploads
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchImageAPI(View, metaclass=ABCMeta):
+    """Apply one image tool to many uploads and stream back a ZIP of the results.
+
+    POST multipart with one or more ``images`` files plus the tool's usual form fields. Files
+    are processed in parallel on the batch process pool (settings.BATCH_WORKERS) and the
+    archive is written while they finish, so memory does not grow with the number of images.
+    manifest.json, the last entry, has each file's result or errors. Requests need the CSRF token
+    (``csrftoken`` cookie and ``X-CSRFToken`` header). Subclasses set ``operation`` and implement get_params().
+    """
+    operation = None
+
+    @abstractmethod
+    def get_params(self, request):
+        """Tool parameters from the form; raise ValueError with a user-facing message."""
+
+    def post(self, request, *args, **kwargs):
+        # Spool every upload to disk instead of holding small ones in memory
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return self._post(request)
+
+    @method_decorator(csrf_protect)
+    def _post(self, request):
+        max_files = settings.BATCH_MAX_FILES
+        try:
+            files = request.FILES.getlist('images')
+        except TooManyFilesSent:
+            # settings.DATA_UPLOAD_MAX_NUMBER_FILES is derived from BATCH_MAX_FILES
+            return JsonResponse({'errors': [f'At most {max_files} images per request.']}, status=400)
+        if not files:
+            return JsonResponse({'errors': ['Please select at least one image.']}, status=400)
+        if len(files) > max_files:
+            return JsonResponse({'errors': [f'At most {max_files} images per request.']}, status=400)
+        try:
+            params = self.get_params(request)
+        except ValueError as e:
+            return JsonResponse({'errors': [str(e)]}, status=400)
+
+        # Each persisted upload gets its own directory; once the stream exists it removes them
+        cleanup = []
+        try:
+            sources = []
+            for image_file in files:
+                path = persist_upload(image_file)
+                cleanup.append(os.path.dirname(path))
+                sources.append({'name': image_file.name, 'path': path})
+            watermark_file = request.FILES.get('watermark_image')
+            if watermark_file:
+                params['watermark_image_path'] = persist_upload(watermark_file)
+                cleanup.append(os.path.dirname(params['watermark_image_path']))
+        except BaseException:
+            for path in cleanup:
+                shutil.rmtree(path, ignore_errors=True)
+            raise
+
+        stream = stream_batch_zip(self.operation, sources, params, cleanup=cleanup)
+        response = StreamingHttpResponse(streaming_content(request, stream), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{self.operation}-{len(sources)}-images.zip"'
+        return response
+
+class SecurityScanAPI(View):
+    """Run the security checkers against many domains, streaming one NDJSON line per domain.
+
+    POST JSON ``{"domains": [...], "checks": ["headers", "hsts", "ssl", "redirects"]}``, or a form
+    with ``domains`` (whitespace- or comma-separated) and optional repeated ``checks``; all checks
+    run by default. Lines arrive in completion order; the last one is ``{"done": true, ...}``.
+    Staff only, rate-limited per user (settings.SECURITY_SCAN_RATE_LIMIT), and domains that
+    resolve to non-public addresses are not contacted. Requests need the CSRF token
+    (``csrftoken`` cookie and ``X-CSRFToken`` header).
+    """
+
+    def post(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return JsonResponse({'errors': ['Forbidden']}, status=403)
+        if request.content_type == 'application/json':
+            try:
+                payload = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({'errors': ['Body must be a JSON object.']}, status=400)
+            if not isinstance(payload, dict):
+                return JsonResponse({'errors': ['Body must be a JSON object.']}, status=400)
+            domains, checks = payload.get('domains') or [], payload.get('checks') or []
+        else:
+            domains = request.POST.get('domains', '').replace(',', ' ').split()
+            checks = request.POST.getlist('checks')
+        if not isinstance(domains, list) or not isinstance(checks, list):
+            return JsonResponse({'errors': ['domains and checks must be lists.']}, status=400)
+        if not all(isinstance(item, str) for item in domains + checks):
+            return JsonResponse({'errors': ['domains and checks must be lists of strings.']}, status=400)
+
+        domains = normalize_domains(domains)
+        checks = list(dict.fromkeys(checks)) or list(SCAN_CHECKS)
+        unknown = [c for c in checks if c not in SCAN_CHECKS]
+        max_domains = getattr(settings, 'SECURITY_SCAN_MAX_DOMAINS', 500)
+        if unknown:
+            return JsonResponse({'errors': [f"Unknown checks: {', '.join(map(str, unknown))}. "
+                                            f"Choose from {', '.join(SCAN_CHECKS)}."]}, status=400)
+        if not domains:
+            return JsonResponse({'errors': ['Please provide at least one domain.']}, status=400)
+        if len(domains) > max_domains:
+            return JsonResponse({'errors': [f'At most {max_domains} domains per request.']}, status=400)
+        if not allow_scan(f'user:{request.user.pk}'):
+            response = JsonResponse({'errors': ['Too many scans; try again later.']}, status=429)
+            response['Retry-After'] = str(getattr(settings, 'SECURITY_SCAN_RATE_WINDOW', 3600))
+            return response
+
+        def lines():
+            start = time.perf_counter()
+            for result in scan_domains(domains, checks):
+                yield json.dumps(result, default=str) + '\n'
+            yield json.dumps({'done': True, 'count': len(domains), 'checks': checks,
+                              'elapsed_ms': round((time.perf_counter() - start) * 1000.0, 1)}) + '\n'
+
+        response = StreamingHttpResponse(streaming_content(request, lines()), content_type='application/x-ndjson')
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class SiteAuditAPI(View):
+    """SSL certificate, HSTS, security headers and redirect chain of one domain as JSON.
+
+    POST only: ``domain`` comes from the form, and the request needs the CSRF token.
+    Unlike calling the four checkers, the site is fetched once: one redirect walk whose TLS
+    handshake and final page feed every section.
+    """
+
+    def post(self, request, *args, **kwargs):
+        result = audit_site(request.POST.get('domain', ''))
+        if result.get('status') == 'error':
+            return JsonResponse({'errors': [result['error']]}, status=400)
+        return JsonResponse(result)
+
+class BatchCompressAPI(BatchImageAPI):
+    operation = 'compress'
+
+    def get_params(self, request):
+        try:
+            quality = int(request.POST.get('quality', 75))
+            target_kb = float(request.POST.get('target_kb') or 0) or None
+        except ValueError:
+            raise ValueError('Quality must be an integer and target size a number of KB.')
+        return {
+            'quality': quality,
+            'output_format': request.POST.get('format', 'jpg').lower(),
+            'target_kb': target_kb,
+            'allow_scale': request.POST.get('allow_scale') in ('on', '1', 'true'),
+            'profile': request.POST.get('profile') or None,
+        }
+
+class BatchResizeAPI(BatchImageAPI):
+    operation = 'resize'
+
+    def get_params(self, request):
+        try:
+            width = int(request.POST.get('width', 0))
+            height = int(request.POST.get('height', 0))
+            quality = int(request.POST.get('quality', 85))
+        except ValueError:
+            raise ValueError('Width, height and quality must be integers.')
+        return {
+            'width': width,
+            'height': height,
+            'mode': request.POST.get('mode', 'fit'),
+            'output_format': request.POST.get('format', 'jpg').lower(),
+            'quality': quality,
+        }
+
+class BatchWatermarkAPI(BatchImageAPI):
+    operation = 'watermark'
+
+    def get_params(self, request):
+        watermark_text = request.POST.get('watermark_text', '').strip()
+        if not watermark_text and not request.FILES.get('watermark_image'):
+            raise ValueError('Please provide either watermark text or watermark image.')
+        try:
+            opacity = float(request.POST.get('opacity', 0.7) or 0.7)
+            font_size = int(request.POST.get('font_size', 36) or 36)
+            quality = int(request.POST.get('quality', 85) or 85)
+        except ValueError:
+            raise ValueError('Opacity must be a number; font size and quality must be integers.')
+        text_color_str = request.POST.get('text_color', '#ffffff').strip().lstrip('#')
+        try:
+            text_color = tuple(int(text_color_str[i:i+2], 16) for i in (0, 2, 4))
+        except ValueError:
+            text_color = (255, 255, 255)
+        return {
+            'watermark_text': watermark_text or None,
+            'position': request.POST.get('position', 'bottom-right'),
+            'opacity': opacity,
+            'font_size': font_size,
+            'text_color': text_color,
+            'output_format': request.POST.get('format', 'jpg').lower(),
+            'quality': quality,
+        }
 
 class JWTGenerator(View):
     template_name = "app/jwt-generator.html"
@@ -550,10 +845,10 @@ class ASCIIArtGenerator(TemplateView):
 class SSLCertificateChecker(View):
     template_name = "app/ssl-certificate-checker.html"
     
-    def get(self, request):
+    async def get(self, request):
         return render(request, self.template_name)
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         domain = request.POST.get('domain', '').strip()
         
         if not domain:
@@ -563,7 +858,7 @@ class SSLCertificateChecker(View):
             })
         
         # Get SSL certificate information
-        cert_info = get_ssl_certificate_info(domain)
+        cert_info = await get_ssl_certificate_info(domain)
         
         if cert_info.get('status') == 'error':
             return render(request, self.template_name, {
@@ -608,10 +903,10 @@ class HashIdentifier(View):
 class HSTSChecker(View):
     template_name = "app/hsts-checker.html"
     
-    def get(self, request):
+    async def get(self, request):
         return render(request, self.template_name)
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         domain = request.POST.get('domain', '').strip()
         
         if not domain:
@@ -621,7 +916,7 @@ class HSTSChecker(View):
             })
         
         # Check HSTS configuration
-        hsts_info = check_hsts(domain)
+        hsts_info = await check_hsts(domain)
         
         if hsts_info.get('status') == 'error' and hsts_info.get('error'):
             return render(request, self.template_name, {
@@ -637,10 +932,10 @@ class HSTSChecker(View):
 class SecurityHeadersChecker(View):
     template_name = "app/security-headers-checker.html"
     
-    def get(self, request):
+    async def get(self, request):
         return render(request, self.template_name)
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         domain = request.POST.get('domain', '').strip()
         
         if not domain:
@@ -650,7 +945,7 @@ class SecurityHeadersChecker(View):
             })
         
         # Check security headers
-        headers_info = check_security_headers(domain)
+        headers_info = await check_security_headers(domain)
         
         if headers_info.get('status') == 'error' and headers_info.get('error'):
             return render(request, self.template_name, {
@@ -672,10 +967,10 @@ class LeetSpeakConverter(TemplateView):
 class RedirectChainAnalyzer(View):
     template_name = "app/redirect-chain-analyzer.html"
     
-    def get(self, request):
+    async def get(self, request):
         return render(request, self.template_name)
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         url = request.POST.get('url', '').strip()
         
         if not url:
@@ -685,7 +980,7 @@ class RedirectChainAnalyzer(View):
             })
         
         # Analyze redirect chain
-        redirect_info = analyze_redirect_chain(url)
+        redirect_info = await analyze_redirect_chain(url)
         
         if redirect_info.get('status') == 'error' and redirect_info.get('error'):
             return render(request, self.template_name, {
@@ -701,10 +996,10 @@ class RedirectChainAnalyzer(View):
 class DomainAgeChecker(View):
     template_name = "app/domain-age-checker.html"
     
-    def get(self, request):
+    async def get(self, request):
         return render(request, self.template_name)
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         domain = request.POST.get('domain', '').strip()
         
         if not domain:
@@ -714,7 +1009,7 @@ class DomainAgeChecker(View):
             })
         
         # Get domain age information
-        domain_info = get_domain_age(domain)
+        domain_info = await get_domain_age(domain)
         
         if domain_info.get('status') == 'error' and domain_info.get('error'):
             return render(request, self.template_name, {
@@ -727,10 +1022,11 @@ class DomainAgeChecker(View):
             'domain_info': domain_info
         })
 
-class PDFtoImages(View):
+class PDFtoImages(AsyncJobMixin, View):
     template_name = "app/pdf-to-images.html"
     media_dir = Path(settings.MEDIA_ROOT).resolve()
     MAX_PAGES = 10
+    job_kind = "pdf_to_images"
     
     def get(self, request):
         return render(request, self.template_name)
@@ -752,25 +1048,31 @@ class PDFtoImages(View):
         if dpi < 72 or dpi > 300:
             dpi = 200
         
-        # Save uploaded PDF
-        tmp_path = f"/tmp/{pdf_file.name}"
-        with open(tmp_path, 'wb') as f:
-            for chunk in pdf_file.chunks():
-                f.write(chunk)
-        
+        # poppler reads from a path; large uploads are linked rather than copied
+        if self.wants_async(request):
+            pdf_path = persist_upload(pdf_file)
+            return self.enqueue(self.process, pdf_path, dpi, output_format, cleanup=[os.path.dirname(pdf_path)])
+        with ingest_upload(pdf_file, require_path=True) as pdf_path:
+            context, _ = self.process(pdf_path, dpi, output_format)
+        return render(request, self.template_name, context)
+
+    @classmethod
+    def process(cls, pdf_path, dpi, output_format, progress=None):
         # Convert PDF to images
         result, success = pdf_to_images(
-            self.media_dir,
-            tmp_path,
-            max_pages=self.MAX_PAGES,
+            cls.media_dir,
+            pdf_path,
+            max_pages=cls.MAX_PAGES,
             dpi=dpi,
-            output_format=output_format
+            output_format=output_format,
+            progress=progress,
+            workers=settings.PDF_RENDER_MAX_PER_REQUEST,
         )
         
         if not success:
-            return render(request, self.template_name, {
+            return {
                 "errors": result.get('errors', ["Failed to convert PDF to images."])
-            })
+            }, False
         
         # Prepare image URLs
         image_urls = []
@@ -794,4 +1096,77 @@ class PDFtoImages(View):
         if result.get('warnings'):
             context['warnings'] = result['warnings']
         
-        return render(request, self.template_name, context)
\ No newline at end of file
+        return context, True
+
+class ImagePipelineAPI(AsyncJobMixin, View):
+    """Chain image operations on one upload: decoded once, encoded once.
+
+    POST multipart with ``image``, optional ``watermark_image`` and ``steps``, a JSON list such as
+    ``[{"op": "exif_strip"}, {"op": "resize", "width": 1200, "height": 1200}, {"op": "format", "format": "webp"}]``.
+    Like the site's forms, requests need the CSRF token (``csrftoken`` cookie and ``X-CSRFToken`` header).
+    """
+    media_dir = Path(settings.MEDIA_ROOT).resolve()
+    job_kind = "image_pipeline"
+
+    def wants_async(self, request):
+        # Every response here is JSON, so only an explicit async=1 queues a job
+        return getattr(settings, 'ASYNC_JOBS_ENABLED', False) and request.POST.get('async') == '1'
+
+    def post(self, request, *args, **kwargs):
+        image_file = request.FILES.get('image')
+        if not image_file:
+            return JsonResponse({'errors': ['Please select an image.']}, status=400)
+        try:
+            steps = json.loads(request.POST.get('steps', ''))
+        except ValueError:
+            return JsonResponse({'errors': ['steps must be a JSON list of operations.']}, status=400)
+        steps, errors = validate_pipeline_steps(steps)
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+        watermark_file = request.FILES.get('watermark_image')
+
+        if self.wants_async(request):
+            image_path = persist_upload(image_file)
+            cleanup = [os.path.dirname(image_path)]
+            watermark_path = None
+            if watermark_file:
+                watermark_path = persist_upload(watermark_file)
+                cleanup.append(os.path.dirname(watermark_path))
+            return self.enqueue(self.process, image_path, steps, watermark_path, cleanup=cleanup)
+
+        with ingest_upload(image_file) as image_src:
+            if watermark_file:
+                with ingest_upload(watermark_file) as watermark_src:
+                    context, success = self.process(image_src, steps, watermark_src)
+            else:
+                context, success = self.process(image_src, steps, None)
+        return JsonResponse(context, status=200 if success else 422)
+
+    @classmethod
+    def process(cls, image_src, steps, watermark_src, progress=None):
+        result, success = run_pipeline(cls.media_dir, image_src, steps, watermark_image_path=watermark_src, progress=progress)
+        if not success:
+            return {"errors": result.get('errors', ["Pipeline failed."])}, False
+        return dict(result, image_url=f"{settings.MEDIA_URL}{result['output_name']}"), True
+
+class RuntimeMetrics(View):
+    """Per-process performance counters as JSON (staff only)."""
+
+    def get(self, request):
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+        return JsonResponse({
+            'pid': os.getpid(),
+            'imports': import_times(),
+            'rembg': session_metrics(),
+            'checker_cache': checker_cache_metrics(),
+        })
+
+class JobStatus(View):
+    """JSON status of a background job queued by one of the heavy tools."""
+
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None:
+            raise Http404("Unknown or expired job")
+        return JsonResponse(job)
@@ -0,0 +1,29 @@
+import os
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+
+# SERVER_MODE=asgi serves the ASGI app on uvicorn workers: each worker runs one event loop, so the
+# async checker views (SSL, HSTS, headers, redirects, domain age, email) can wait on hundreds of
+# slow remote hosts per process. The default wsgi mode uses gunicorn's sync workers.
+if os.getenv("SERVER_MODE", "wsgi").lower() == "asgi":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "shubrajcom.asgi:application"
+else:
+    wsgi_app = "shubrajcom.wsgi:application"
+
+
+def post_fork(server, worker):
+    """Warm the rembg session in each worker (settings.REMBG_PRELOAD) so the first background removal does not pay model load."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shubrajcom.settings")
+    import django
+    django.setup()
+    from django.conf import settings
+    if not settings.REMBG_PRELOAD:
+        return
+    from app.utils.model_sessions import warm_up
+    try:
+        metrics = warm_up()
+        server.log.info("Worker %s: rembg %s loaded in %.2fs", worker.pid, metrics.get("model"), metrics.get("load_seconds", 0))
+    except Exception as e:
+        server.log.warning("Worker %s: rembg warm-up failed: %s", worker.pid, e)
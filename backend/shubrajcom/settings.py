@@ -131,6 +131,87 @@ CACHES = {
     }
 }
 
+# Optional background-job mode for the heavy image/PDF tools. Job state lives in the
+# cache above so any worker can answer a status poll; work runs on a local thread pool.
+ASYNC_JOBS_ENABLED = os.getenv("ASYNC_JOBS_ENABLED", "false").lower() == "true"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RESULT_TTL = 60 * 60
+
+# Generated media lifetime; expired outputs are removed by `manage.py sweep_media`
+MEDIA_OUTPUT_TTL = int(os.getenv("MEDIA_OUTPUT_TTL", str(60 * 60 * 24)))
+
+# Content-addressed reuse of image transform outputs (index kept in the cache)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_TTL = 60 * 60 * 24
+
+# PDF to images: processes in each server process's shared render pool, and how many of them a
+# single conversion may use (1 = render in the request thread); kept below the pool size so one
+# large PDF cannot queue every other conversion behind it
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "4"))
+PDF_RENDER_MAX_PER_REQUEST = int(os.getenv("PDF_RENDER_MAX_PER_REQUEST", str(max(1, PDF_RENDER_WORKERS // 2))))
+
+# Batch image APIs (api/batch/*): processes shared by all batches (0 = process in the request
+# thread) and the most files one request may upload
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+# Django rejects requests with more files than this; leave room for a full batch plus its watermark image
+DATA_UPLOAD_MAX_NUMBER_FILES = max(100, BATCH_MAX_FILES + 1)
+
+# Compressor format "auto": encoders are scored on a proxy of sampled tiles and the smallest one whose
+# SSIM is at least COMPRESS_AUTO_MIN_SSIM wins. Profile: fast | balanced | max (speed vs ratio)
+COMPRESS_AUTO_PROFILE = os.getenv("COMPRESS_AUTO_PROFILE", "balanced")
+COMPRESS_AUTO_MIN_SSIM = float(os.getenv("COMPRESS_AUTO_MIN_SSIM", "0.95"))
+
+# Network checkers share one keep-alive requests.Session (app/utils/http_client.py): hosts
+# kept in the pool and connections per host
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "64"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+# The HSTS and security header checkers read response headers (and at most 64 KB of body, to keep
+# the connection alive); this caps the wall-clock seconds for a whole fetch including redirects:
+# no hop starts after it and body reads stop at it (the async checkers also cut off headers)
+HEADER_FETCH_DEADLINE = float(os.getenv("HEADER_FETCH_DEADLINE", "15"))
+# The async checkers (app/utils/async_checks.py) use one httpx.AsyncClient per check:
+# open connections across all hosts; HTTP_POOL_CONNECTIONS of them are kept alive
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "200"))
+
+# Network checker results (SSL, HSTS, headers, redirects, WHOIS, site audit) are cached in the
+# cache above for a per-checker TTL in seconds, then served stale for as long again while
+# CHECKER_REFRESH_WORKERS threads refresh them; unlisted checkers use app/utils/checker_cache.py
+CHECKER_CACHE_ENABLED = os.getenv("CHECKER_CACHE_ENABLED", "true").lower() == "true"
+CHECKER_CACHE_TTLS = {
+    "ssl": int(os.getenv("CHECKER_TTL_SSL", str(6 * 60 * 60))),
+    "hsts": int(os.getenv("CHECKER_TTL_HSTS", str(60 * 60))),
+    "headers": int(os.getenv("CHECKER_TTL_HEADERS", str(15 * 60))),
+    "redirects": int(os.getenv("CHECKER_TTL_REDIRECTS", str(15 * 60))),
+    "whois": int(os.getenv("CHECKER_TTL_WHOIS", str(24 * 60 * 60))),
+}
+CHECKER_REFRESH_WORKERS = int(os.getenv("CHECKER_REFRESH_WORKERS", "4"))
+
+# Bulk security scan (api/security-scan/): threads shared by all scans, checks one scan may run
+# at once (a quarter of the pool, so four scans can run side by side), domains per request
+SECURITY_SCAN_WORKERS = int(os.getenv("SECURITY_SCAN_WORKERS", "16"))
+SECURITY_SCAN_PER_SCAN = int(os.getenv("SECURITY_SCAN_PER_SCAN", str(max(1, SECURITY_SCAN_WORKERS // 4))))
+SECURITY_SCAN_MAX_DOMAINS = int(os.getenv("SECURITY_SCAN_MAX_DOMAINS", "500"))
+# Scans one staff user may start per window (0 = unlimited); domains resolving to private,
+# loopback or link-local addresses are refused unless allowed (local development)
+SECURITY_SCAN_RATE_LIMIT = int(os.getenv("SECURITY_SCAN_RATE_LIMIT", "20"))
+SECURITY_SCAN_RATE_WINDOW = int(os.getenv("SECURITY_SCAN_RATE_WINDOW", "3600"))
+SECURITY_SCAN_ALLOW_PRIVATE = os.getenv("SECURITY_SCAN_ALLOW_PRIVATE", "false").lower() == "true"
+
+# Decode large JPEGs at reduced resolution (libjpeg DCT scaling) when the output is much smaller
+IMAGE_DRAFT_DECODE = os.getenv("IMAGE_DRAFT_DECODE", "true").lower() == "true"
+
+# Per-request memory ceiling for image tools; images of at least IMAGE_TILING_MIN_MEGAPIXELS
+# are processed in strips where the operation allows it (EXIF strip, watermark, near-white
+# background removal, format conversion)
+IMAGE_MEMORY_LIMIT_MB = int(os.getenv("IMAGE_MEMORY_LIMIT_MB", "1024"))
+IMAGE_TILING_MIN_MEGAPIXELS = float(os.getenv("IMAGE_TILING_MIN_MEGAPIXELS", "16"))
+
+# DV photo face detector: haar (OpenCV cascades) | yunet (OpenCV DNN, needs the ONNX model below;
+# the Docker image installs a pinned copy in /opt/models and sets FACE_DETECTOR_MODEL)
+FACE_DETECTOR = os.getenv("FACE_DETECTOR", "haar")
+FACE_DETECTOR_MODEL = os.getenv("FACE_DETECTOR_MODEL", os.path.join(BASE_DIR, "models", "face_detection_yunet_2023mar.onnx"))
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
@@ -141,6 +222,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'mediafiles')
+
+# Background removal (rembg / ONNX Runtime)
+# REMBG_MODEL: u2net | u2netp | isnet; thread counts of 0 keep the ONNX Runtime defaults
+REMBG_MODEL = os.getenv("REMBG_MODEL", "u2net")
+REMBG_INTRA_OP_THREADS = int(os.getenv("REMBG_INTRA_OP_THREADS", "0"))
+REMBG_INTER_OP_THREADS = int(os.getenv("REMBG_INTER_OP_THREADS", "0"))
+# Load the model in each gunicorn worker at boot (see gunicorn.conf.py)
+REMBG_PRELOAD = os.getenv("REMBG_PRELOAD", "false").lower() == "true"
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 